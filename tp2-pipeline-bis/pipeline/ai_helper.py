@@ -1,23 +1,299 @@
 """Helper pour les appels IA avec support multi-fournisseurs."""
+import asyncio
+import hashlib
+import json
 import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
 from typing import Optional
+
+import httpx
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:  # dépendance optionnelle
+    orjson = None
+
+from .config import CACHE_DIR
+
 load_dotenv()
 
+# Clés API lues une seule fois, au chargement du module
+_GROQ = os.getenv("GROQ_API_KEY")
+_GEMINI = os.getenv("GEMINI_API_KEY")
+_OPENAI = os.getenv("OPENAI_API_KEY")
+
+# Limites du pool de connexions HTTP (keep-alive partagé entre les requêtes)
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=10, max_connections=20)
+
+# Cache de détection des fournisseurs (partagé entre instances)
+PROVIDERS_TTL_SECONDS = 60
+OLLAMA_CACHE_FILE = Path.home() / ".cache" / "ai_helper_providers.json"
+OLLAMA_CACHE_TTL_SECONDS = 600
+
+# Cache des réponses LLM
+LLM_CACHE_PATH = CACHE_DIR / "llm_cache.sqlite"
+LLM_CACHE_TTL_SECONDS = 24 * 3600
+
+SYSTEM_PROMPT = (
+    "Tu es un expert en qualité des données. "
+    "Donne des recommandations concrètes, actionnables et professionnelles. "
+    "Formate en markdown avec des listes à puces."
+)
+
+# Messages réutilisés tels quels à chaque appel
+_SYSTEM_MSG = {"role": "system", "content": SYSTEM_PROMPT}
+_USER_TEMPLATE = (
+    "{context}\n\nQuelles sont tes 5 recommandations prioritaires pour améliorer ce dataset ?"
+)
+
+# Mise en concurrence des fournisseurs
+RACE_WIDTH = 2
+RACE_TIMEOUT_SECONDS = 60
+
+# Router litellm : retries, fallbacks et mise à l'écart des fournisseurs instables
+ROUTER_NUM_RETRIES = 1
+ROUTER_ALLOWED_FAILS = 3
+ROUTER_COOLDOWN_SECONDS = 30
+CLOUD_TIMEOUT_SECONDS = 30
+LOCAL_TIMEOUT_SECONDS = 60
+
+# Nombre maximal d'appels LLM simultanés par processus (Ollama est limité par le CPU/GPU)
+LLM_INFLIGHT_LIMIT = int(os.getenv("LLM_INFLIGHT_LIMIT", "4"))
+
+_litellm_sessions_configured = False
+_llm_loop: Optional[asyncio.AbstractEventLoop] = None
+_llm_loop_lock = threading.Lock()
+_llm_semaphore: Optional[asyncio.Semaphore] = None
+_providers_cache: dict[tuple, dict] = {}
+_routers: dict[tuple, object] = {}
+
+
+def _get_litellm():
+    """
+    Importe litellm à la demande et lui fournit des sessions HTTP poolées.
+    
+    Les appels Groq/Gemini/OpenAI réutilisent ainsi les connexions TCP/TLS
+    au lieu d'en ouvrir une nouvelle à chaque requête.
+    """
+    global _litellm_sessions_configured
+    import litellm
+
+    if not _litellm_sessions_configured:
+        litellm.client_session = httpx.Client(limits=HTTP_LIMITS)
+        litellm.aclient_session = httpx.AsyncClient(limits=HTTP_LIMITS)
+        _litellm_sessions_configured = True
+
+    return litellm
+
+
+def _get_llm_loop() -> asyncio.AbstractEventLoop:
+    """
+    Retourne la boucle d'événements dédiée aux appels LLM (thread démon).
+    
+    Une seule boucle pour tout le processus : la session HTTP asynchrone
+    installée dans litellm reste liée à la même boucle d'un appel à l'autre,
+    et get_recommendations fonctionne aussi depuis une boucle déjà active
+    (Jupyter, appelants async), où asyncio.run() lèverait RuntimeError.
+    """
+    global _llm_loop
+    with _llm_loop_lock:
+        if _llm_loop is None:
+            _llm_loop = asyncio.new_event_loop()
+            threading.Thread(target=_llm_loop.run_forever, name="llm-loop", daemon=True).start()
+    return _llm_loop
+
+
+def _get_llm_semaphore() -> asyncio.Semaphore:
+    """
+    Retourne le sémaphore d'appels LLM.
+    
+    Tous les appels passent par la boucle dédiée (_get_llm_loop) : un seul
+    sémaphore suffit, créé au premier appel depuis cette boucle.
+    """
+    global _llm_semaphore
+    if _llm_semaphore is None:
+        _llm_semaphore = asyncio.Semaphore(LLM_INFLIGHT_LIMIT)
+    return _llm_semaphore
+
+
+def _get_router(sorted_providers: list[tuple[str, dict]]):
+    """
+    Retourne un Router litellm pour cette liste ordonnée de fournisseurs.
+    
+    Le premier fournisseur bascule automatiquement sur ceux qui ne sont pas
+    mis en concurrence avec lui. Les routers sont conservés au niveau du
+    module pour que l'état de cooldown survive aux instances d'AIHelper.
+    """
+    key = tuple(
+        (provider_id, config['model'], config.get('api_key'))
+        for provider_id, config in sorted_providers
+    )
+    router = _routers.get(key)
+    if router is not None:
+        return router
+
+    litellm = _get_litellm()
+
+    model_list = []
+    for provider_id, config in sorted_providers:
+        litellm_params = {"model": config['model']}
+        if config.get('type') == 'local':
+            litellm_params["api_base"] = config.get('api_base', 'http://localhost:11434')
+            litellm_params["timeout"] = LOCAL_TIMEOUT_SECONDS
+        else:
+            litellm_params["api_key"] = config.get('api_key')
+            litellm_params["timeout"] = CLOUD_TIMEOUT_SECONDS
+        model_list.append({"model_name": provider_id, "litellm_params": litellm_params})
+
+    provider_ids = [provider_id for provider_id, _ in sorted_providers]
+    fallbacks = []
+    if len(provider_ids) > RACE_WIDTH:
+        fallbacks.append({provider_ids[0]: provider_ids[RACE_WIDTH:]})
+
+    router = litellm.Router(
+        model_list=model_list,
+        fallbacks=fallbacks,
+        num_retries=ROUTER_NUM_RETRIES,
+        timeout=CLOUD_TIMEOUT_SECONDS,
+        allowed_fails=ROUTER_ALLOWED_FAILS,
+        cooldown_time=ROUTER_COOLDOWN_SECONDS,
+    )
+    _routers[key] = router
+    return router
+
+
+def _load_cached_ollama_models() -> Optional[list]:
+    """Relit la liste des modèles Ollama persistée si elle est encore fraîche."""
+    try:
+        data = json.loads(OLLAMA_CACHE_FILE.read_text(encoding="utf-8"))
+        if time.time() - data["ts"] < OLLAMA_CACHE_TTL_SECONDS:
+            return list(data["models"])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def _save_cached_ollama_models(models: list):
+    """Persiste la liste des modèles Ollama pour les prochains processus."""
+    try:
+        OLLAMA_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        OLLAMA_CACHE_FILE.write_text(
+            json.dumps({"ts": time.time(), "models": models}),
+            encoding="utf-8"
+        )
+    except OSError:
+        pass
+
+
+class LLMCache:
+    """Cache disque (SQLite) des réponses LLM, indexé par hash du prompt."""
+
+    def __init__(self, path: Path = LLM_CACHE_PATH, ttl_seconds: int = LLM_CACHE_TTL_SECONDS):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache "
+            "(key TEXT PRIMARY KEY, response TEXT, ts INTEGER)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def cache_key(payload: dict) -> str:
+        """Calcule une clé stable (sha256) à partir des paramètres d'appel."""
+        if orjson is not None:
+            serialized = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+        else:
+            # Même sérialisation compacte qu'orjson
+            serialized = json.dumps(
+                payload, sort_keys=True, ensure_ascii=False, separators=(",", ":")
+            ).encode("utf-8")
+        return hashlib.sha256(serialized).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Retourne la réponse en cache si elle n'a pas expiré."""
+        row = self._conn.execute(
+            "SELECT response, ts FROM llm_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return row[0]
+
+    def set(self, key: str, response: str):
+        """Enregistre (ou remplace) une réponse."""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, response, ts) VALUES (?, ?, ?)",
+            (key, response, int(time.time()))
+        )
+        self._conn.commit()
+
+    def close(self):
+        """Ferme la connexion SQLite."""
+        self._conn.close()
+
 
 class AIHelper:
     """Gère les appels IA avec fallback et configuration flexible."""
     
-    def __init__(self, verbose: bool = True):
+    __slots__ = ("verbose", "available_providers", "_http", "_cache")
+    
+    def __init__(self, verbose: bool = True, use_cache: bool = True):
         self.verbose = verbose
+        # Client HTTP persistant (keep-alive) pour les sondes Ollama
+        self._http = httpx.Client(timeout=2.0, limits=HTTP_LIMITS)
+        # Cache des réponses : évite de repayer la latence LLM sur un contexte identique
+        self._cache = LLMCache(LLM_CACHE_PATH) if use_cache else None
         self.available_providers = self._detect_available_providers()
         
         if verbose:
             print(f"🤖 Fournisseurs IA détectés: {list(self.available_providers.keys())}")
     
+    def close(self):
+        """Ferme le client HTTP et le cache, libère les sockets."""
+        self._http.close()
+        if self._cache is not None:
+            self._cache.close()
+    
+    @property
+    def available(self) -> bool:
+        """Indique si au moins un fournisseur a été détecté (aucun appel réseau)."""
+        return bool(self.available_providers)
+    
+    def __enter__(self) -> 'AIHelper':
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+    
     def _detect_available_providers(self) -> dict:
-        """Détecte les fournisseurs IA disponibles."""
+        """
+        Détecte les fournisseurs IA disponibles.
+        
+        Le résultat est mis en cache au niveau du module, indexé par les clés
+        API et par tranche de PROVIDERS_TTL_SECONDS : les instanciations
+        répétées ne refont pas la sonde Ollama.
+        """
+        cache_key = (_GROQ, _GEMINI, _OPENAI, int(time.time() // PROVIDERS_TTL_SECONDS))
+        
+        providers = _providers_cache.get(cache_key)
+        if providers is None:
+            providers = self._build_providers()
+            _providers_cache.clear()
+            _providers_cache[cache_key] = providers
+        
+        return dict(providers)
+    
+    def _build_providers(self) -> dict:
+        """
+        Construit la table des fournisseurs (sonde réseau incluse).
+        
+        L'ordre d'insertion est l'ordre de priorité utilisé par get_recommendations.
+        """
         providers = {}
         
         # 1. Ollama (local - PRIORITAIRE)
@@ -32,30 +308,30 @@ class AIHelper:
                 }
         
         # 2. Groq (avec modèle mis à jour)
-        if os.getenv("GROQ_API_KEY"):
+        if _GROQ:
             # Utiliser un modèle Groq actuel
             providers['groq'] = {
                 'name': 'Groq',
                 'model': 'groq/llama-3.3-70b-versatile',
-                'api_key': os.getenv("GROQ_API_KEY"),
+                'api_key': _GROQ,
                 'type': 'cloud'
             }
         
         # 3. Gemini
-        if os.getenv("GEMINI_API_KEY"):
+        if _GEMINI:
             providers['gemini'] = {
                 'name': 'Gemini',
                 'model': 'gemini/gemini-2.0-flash-exp',
-                'api_key': os.getenv("GEMINI_API_KEY"),
+                'api_key': _GEMINI,
                 'type': 'cloud'
             }
         
         # 4. OpenAI
-        if os.getenv("OPENAI_API_KEY"):
+        if _OPENAI:
             providers['openai'] = {
                 'name': 'OpenAI',
                 'model': 'gpt-4o-mini',
-                'api_key': os.getenv("OPENAI_API_KEY"),
+                'api_key': _OPENAI,
                 'type': 'cloud'
             }
         
@@ -63,11 +339,22 @@ class AIHelper:
     
     def _check_ollama_available(self) -> list:
         """Vérifie quels modèles Ollama sont disponibles localement."""
+        cached = _load_cached_ollama_models()
+        if cached is not None:
+            return cached
+        
+        available = self._probe_ollama()
+        if available:
+            # Une liste vide n'est pas persistée : un Ollama démarré entre-temps
+            # sera détecté dès l'expiration du cache mémoire
+            _save_cached_ollama_models(available)
+        return available
+    
+    def _probe_ollama(self) -> list:
+        """Interroge l'API Ollama locale pour lister ses modèles."""
         try:
-            import httpx
-            
             # Tester la connexion à Ollama
-            response = httpx.get("http://localhost:11434/api/tags", timeout=2.0)
+            response = self._http.get("http://localhost:11434/api/tags")
             if response.status_code == 200:
                 models_data = response.json()
                 models = [model['name'] for model in models_data.get('models', [])]
@@ -97,6 +384,11 @@ class AIHelper:
         """
         Obtient des recommandations IA.
         
+        Les RACE_WIDTH premiers fournisseurs sont mis en concurrence : la
+        première réponse valide l'emporte et les appels perdants sont annulés.
+        Retries, backoff et bascule vers les fournisseurs restants sont
+        délégués au Router litellm.
+        
         Args:
             context: Contexte pour l'IA
             max_tokens: Nombre maximum de tokens
@@ -104,95 +396,142 @@ class AIHelper:
         Returns:
             Réponse de l'IA ou None
         """
-        if not self.available_providers:
+        if not self.available:
             if self.verbose:
                 print("⚠️ Aucun fournisseur IA disponible")
             return None
         
-        # Priorité: Ollama > Groq > Gemini > OpenAI
-        priority_order = [
-            ('ollama', 'local'),
-            ('groq', 'cloud'),
-            ('gemini', 'cloud'),
-            ('openai', 'cloud')
-        ]
+        # Déjà dans l'ordre de priorité (Ollama > Groq > Gemini > OpenAI) depuis la détection
+        sorted_providers = list(self.available_providers.items())
         
-        # Trier les fournisseurs par priorité
-        sorted_providers = []
-        for prefix, ptype in priority_order:
-            for provider_id, config in self.available_providers.items():
-                if (provider_id.startswith(prefix) or 
-                    (ptype == 'local' and config.get('type') == 'local')):
-                    sorted_providers.append((provider_id, config))
-        
-        # Essayer chaque fournisseur dans l'ordre de priorité
-        for provider_id, config in sorted_providers:
-            try:
-                if self.verbose:
-                    print(f"🤖 Tentative avec {config['name']} ({config['model']})...")
-                
-                result = self._call_provider(provider_id, config, context, max_tokens)
-                if result:
+        # Réponse déjà en cache pour l'un des fournisseurs ?
+        if self._cache is not None:
+            for provider_id, config in sorted_providers:
+                cached = self._cache.get(self._cache_key(config, context, max_tokens))
+                if cached:
                     if self.verbose:
-                        print(f"✅ Réponse reçue de {config['name']}")
-                    return result
-                    
-            except Exception as e:
-                if self.verbose:
-                    print(f"⚠️ Erreur avec {config['name']}: {str(e)[:100]}...")
-                continue
+                        print(f"💾 Réponse en cache ({config['name']})")
+                    return cached
         
-        if self.verbose:
-            print("❌ Tous les fournisseurs IA ont échoué")
-        return None
+        router = _get_router(sorted_providers)
+        winner = asyncio.run_coroutine_threadsafe(
+            self._race_providers(router, sorted_providers[:RACE_WIDTH], context, max_tokens),
+            _get_llm_loop()
+        ).result()
+        
+        if winner is None:
+            if self.verbose:
+                print("❌ Tous les fournisseurs IA ont échoué")
+            return None
+        
+        config, result = winner
+        if self._cache is not None:
+            self._cache.set(self._cache_key(config, context, max_tokens), result)
+        return result
+    
+    @staticmethod
+    def _cache_key(config: dict, context: str, max_tokens: int) -> str:
+        """Clé de cache d'un appel (modèle + prompt + paramètres)."""
+        return LLMCache.cache_key({
+            "model": config['model'],
+            "system": SYSTEM_PROMPT,
+            "context": context,
+            "max_tokens": max_tokens,
+            "temperature": 0.3,
+        })
     
-    def _call_provider(self, provider_id: str, config: dict, context: str, max_tokens: int) -> Optional[str]:
-        """Appelle un fournisseur IA spécifique."""
+    async def _race_providers(
+        self,
+        router,
+        group: list[tuple[str, dict]],
+        context: str,
+        max_tokens: int
+    ) -> Optional[tuple[dict, str]]:
+        """Lance un groupe de fournisseurs en parallèle et garde la première réponse."""
+        tasks = {}
+        for provider_id, config in group:
+            if self.verbose:
+                print(f"🤖 Tentative avec {config['name']} ({config['model']})...")
+            task = asyncio.create_task(
+                self._call_provider_async(router, provider_id, config, context, max_tokens)
+            )
+            tasks[task] = config
+        
+        # Échéance unique pour toute la course (pas de nouveau délai après chaque échec)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + RACE_TIMEOUT_SECONDS
+        pending = set(tasks)
         try:
-            from litellm import completion
-            
-            # Préparer les paramètres communs
-            params = {
-                "model": config['model'],
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": (
-                            "Tu es un expert en qualité des données. "
-                            "Donne des recommandations concrètes, actionnables et professionnelles. "
-                            "Formate en markdown avec des listes à puces."
-                        )
-                    },
-                    {
-                        "role": "user",
-                        "content": f"{context}\n\nQuelles sont tes 5 recommandations prioritaires pour améliorer ce dataset ?"
-                    }
-                ],
-                "max_tokens": max_tokens,
-                "temperature": 0.3,  # Moins créatif, plus factuel
-            }
-            
-            # Ajouter les paramètres spécifiques
-            if provider_id.startswith('ollama'):
-                params["api_base"] = config.get('api_base', 'http://localhost:11434')
-                params["timeout"] = 30.0  # Plus long pour les modèles locaux
-            elif 'api_key' in config:
-                params["api_key"] = config['api_key']
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=max(deadline - loop.time(), 0),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    if self.verbose:
+                        print(f"⚠️ Délai de {RACE_TIMEOUT_SECONDS}s dépassé")
+                    return None
+                
+                for task in done:
+                    config = tasks[task]
+                    if task.exception() is not None:
+                        if self.verbose:
+                            print(f"⚠️ Erreur avec {config['name']}: {str(task.exception())[:100]}...")
+                    elif task.result():
+                        if self.verbose:
+                            print(f"✅ Réponse reçue de {config['name']}")
+                        return config, task.result()
+            return None
+        finally:
+            # Annuler les appels perdants (ou encore en cours après un timeout)
+            for task in pending:
+                task.cancel()
+    
+    async def _call_provider_async(
+        self,
+        router,
+        provider_id: str,
+        config: dict,
+        context: str,
+        max_tokens: int
+    ) -> Optional[str]:
+        """Appelle un fournisseur IA via le Router (retries et fallbacks inclus)."""
+        params = {
+            "model": provider_id,
+            "messages": [
+                _SYSTEM_MSG,
+                {"role": "user", "content": _USER_TEMPLATE.format(context=context)},
+            ],
+            "max_tokens": max_tokens,
+            "temperature": 0.3,  # Moins créatif, plus factuel
+            "stream": True,
+        }
+        
+        # Appel API en streaming, borné par le sémaphore (libéré même en cas d'annulation)
+        async with _get_llm_semaphore():
+            start = time.perf_counter()
+            ttft_ms = None
+            parts = []
             
-            # Appel API
-            response = completion(**params)
+            response = await router.acompletion(**params)
+            async for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - start) * 1000
+                    if self.verbose:
+                        print(f"⏱️ {config['name']}: premier token en {ttft_ms:.0f} ms (ttft_ms)")
+                parts.append(delta)
             
-            # Extraire la réponse
-            if hasattr(response, 'choices') and response.choices:
-                return response.choices[0].message.content.strip()
-            elif hasattr(response, 'content'):
-                return response.content.strip()
-            else:
-                return str(response).strip()
-                
-        except Exception as e:
-            raise e
-
+            if self.verbose:
+                total_ms = (time.perf_counter() - start) * 1000
+                print(f"⏱️ {config['name']}: réponse complète en {total_ms:.0f} ms (total_ms)")
+        
+        return "".join(parts).strip()
 
 
 # # ---------- Solution  Groq avec litellm ----------
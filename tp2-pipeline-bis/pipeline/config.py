@@ -1,6 +1,8 @@
 """Configuration centralisée du pipeline."""
+from collections.abc import Mapping
 from pathlib import Path
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from types import MappingProxyType
 
 # === Chemins ===
 BASE_DIR = Path(__file__).parent.parent
@@ -8,22 +10,26 @@ DATA_DIR = BASE_DIR / "data"
 RAW_DIR = DATA_DIR / "raw"
 PROCESSED_DIR = DATA_DIR / "processed"
 REPORTS_DIR = DATA_DIR / "reports"
+CACHE_DIR = DATA_DIR / "cache"
 
-for dir_path in [RAW_DIR, PROCESSED_DIR, REPORTS_DIR]:
-    dir_path.mkdir(parents=True, exist_ok=True)
+# Un seul stat par dossier quand ils existent déjà (cas courant)
+for dir_path in (RAW_DIR, PROCESSED_DIR, REPORTS_DIR, CACHE_DIR):
+    if not dir_path.is_dir():
+        dir_path.mkdir(parents=True, exist_ok=True)
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class APIConfig:
-    """Configuration d'une API."""
+    """Configuration d'une API (immuable, partageable entre threads)."""
     name: str
     base_url: str
     timeout: int
     rate_limit: float
-    headers: dict = None
+    headers: Mapping[str, str] = field(default=None, hash=False)
 
     def __post_init__(self):
-        self.headers = self.headers or {}
+        # Copie en lecture seule : les en-têtes ne peuvent plus être modifiés après coup
+        object.__setattr__(self, "headers", MappingProxyType(dict(self.headers or {})))
 
 
 # === Configurations des APIs ===
@@ -1,22 +1,194 @@
 """Module d'enrichissement des données."""
+import asyncio
+import operator
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
 from typing import Optional
-from tqdm import tqdm
 
+from .config import CACHE_DIR
 from .fetchers.adresse import AdresseFetcher
 from .models import Product, GeocodingResult
 
+# Cache disque du géocodage (les adresses changent rarement entre deux exécutions)
+GEOCODING_CACHE_PATH = CACHE_DIR / "geocoding_cache.sqlite"
+GEOCODING_CACHE_TTL_SECONDS = 30 * 24 * 3600
+SQLITE_MAX_PARAMS = 500
+
+# Segment d'adresse entre virgules, sans espaces autour, d'au moins 4 caractères
+_ADDR_RE = re.compile(r"[^,\s][^,]{2,}[^,\s]")
+
+# Lecture groupée (en C) des champs d'un GeocodingResult
+_GET_GEO = operator.attrgetter(
+    "label", "latitude", "longitude", "city", "postal_code", "score", "is_valid"
+)
+
+# Champs ajoutés aux produits par le géocodage
+GEO_COLUMNS = ["store_address", "latitude", "longitude", "city", "postal_code", "geocoding_score"]
+
+
+@dataclass
+class GeocodingTable:
+    """
+    Cache de géocodage en colonnes (structure of arrays).
+    
+    Une ligne par adresse : index adresse -> position, puis des tableaux
+    contigus par champ, lus sans accès attribut par attribut.
+    """
+    index: pd.Index
+    store_address: pd.arrays.StringArray
+    latitude: np.ndarray
+    longitude: np.ndarray
+    city: pd.arrays.StringArray
+    postal_code: pd.arrays.StringArray
+    geocoding_score: np.ndarray
+    is_valid: np.ndarray
+
+    @classmethod
+    def from_cache(cls, cache: dict[str, GeocodingResult]) -> "GeocodingTable":
+        """Aplatit un dictionnaire adresse -> GeocodingResult."""
+        # Un tuple par résultat, puis transposition en colonnes
+        rows = list(map(_GET_GEO, cache.values()))
+        labels, latitude, longitude, cities, postal_codes, score, is_valid = (
+            zip(*rows) if rows else ((),) * 7
+        )
+
+        return cls(
+            index=pd.Index(list(cache.keys()), dtype="string"),
+            store_address=pd.array(labels, dtype="string"),
+            latitude=np.array(latitude, dtype=np.float64),  # None -> NaN
+            longitude=np.array(longitude, dtype=np.float64),
+            city=pd.array(cities, dtype="string"),
+            postal_code=pd.array(postal_codes, dtype="string"),
+            geocoding_score=np.array(score, dtype=np.float64),
+            is_valid=np.array(is_valid, dtype=np.bool_),
+        )
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def lookup(self, addresses: pd.Series) -> tuple[pd.DataFrame, np.ndarray]:
+        """
+        Jointure vectorisée sur la colonne d'adresses.
+        
+        Returns:
+            (champs géographiques alignés sur addresses, positions ; -1 si absente)
+        """
+        positions = self.index.get_indexer(addresses)
+        found = positions >= 0
+
+        if not len(self):
+            return pd.DataFrame(None, index=addresses.index, columns=GEO_COLUMNS), positions
+
+        take = np.where(found, positions, 0)
+        geo = pd.DataFrame(
+            {column: getattr(self, column)[take] for column in GEO_COLUMNS},
+            index=addresses.index,
+        )
+        return geo.where(pd.Series(found, index=addresses.index), axis=0), positions
+
+
+class PersistentGeocodingCache:
+    """Cache disque (SQLite) des résultats de géocodage, indexé par adresse normalisée."""
+
+    def __init__(
+        self,
+        path: Path = GEOCODING_CACHE_PATH,
+        ttl_seconds: int = GEOCODING_CACHE_TTL_SECONDS
+    ):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS geo "
+            "(addr TEXT PRIMARY KEY, label TEXT, lat REAL, lon REAL, city TEXT, "
+            "postal TEXT, city_code TEXT, score REAL, ts INTEGER)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def normalize(address: str) -> str:
+        """Clé de cache : espaces réduits, casse ignorée."""
+        return " ".join(address.split()).casefold()
+
+    def get_many(self, addresses: list[str]) -> dict[str, GeocodingResult]:
+        """Retourne les résultats en cache non expirés, indexés par adresse d'origine."""
+        by_key: dict[str, list[str]] = {}
+        for address in addresses:
+            by_key.setdefault(self.normalize(address), []).append(address)
+
+        keys = list(by_key)
+        min_ts = int(time.time()) - self.ttl_seconds
+        found = {}
+
+        for i in range(0, len(keys), SQLITE_MAX_PARAMS):
+            chunk = keys[i:i + SQLITE_MAX_PARAMS]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                "SELECT addr, label, lat, lon, city, postal, city_code, score FROM geo "
+                f"WHERE addr IN ({placeholders}) AND ts >= ?",
+                (*chunk, min_ts)
+            ).fetchall()
+
+            for key, label, lat, lon, city, postal, city_code, score in rows:
+                for address in by_key[key]:
+                    found[address] = GeocodingResult(
+                        original_address=address,
+                        label=label,
+                        latitude=lat,
+                        longitude=lon,
+                        city=city,
+                        postal_code=postal,
+                        city_code=city_code,
+                        score=score,
+                    )
+
+        return found
+
+    def set_many(self, results: list[GeocodingResult]):
+        """Enregistre (ou remplace) des résultats de géocodage."""
+        now = int(time.time())
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO geo "
+            "(addr, label, lat, lon, city, postal, city_code, score, ts) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    self.normalize(r.original_address), r.label, r.latitude, r.longitude,
+                    r.city, r.postal_code, r.city_code, r.score, now
+                )
+                for r in results
+            ]
+        )
+        self._conn.commit()
+
+    def close(self):
+        """Ferme la connexion SQLite."""
+        self._conn.close()
+
 
 class DataEnricher:
     """Enrichit les données en croisant plusieurs sources."""
 
-    def __init__(self):
+    def __init__(self, use_cache: bool = True):
         self.geocoder = AdresseFetcher()
-        self.enrichment_stats = {
-            "total_processed": 0,
-            "successfully_enriched": 0,
-            "failed_enrichment": 0,
-        }
+        # Cache disque : seules les adresses inconnues sont envoyées à l'API
+        self.persistent_cache = (
+            PersistentGeocodingCache(GEOCODING_CACHE_PATH) if use_cache else None
+        )
+        # Compteurs en attributs : le dictionnaire n'est construit qu'à la lecture
+        self._total_processed = 0
+        self._success = 0
+        self._fail = 0
+        self._geo_table: Optional[GeocodingTable] = None
+        self._geo_table_source: Optional[dict] = None
 
     def extract_addresses(
         self,
@@ -33,47 +205,100 @@ class DataEnricher:
         Returns:
             Liste d'adresses uniques
         """
-        addresses = set()
+        # Une seule colonne Arrow : découpage et nettoyage vectorisés
+        raw = pd.Series(
+            [
+                addr if isinstance(addr, str) else None
+                for addr in (product.get(address_field, "") for product in products)
+            ],
+            dtype="string[pyarrow]",
+        )
 
-        for product in products:
-            addr = product.get(address_field, "")
-            if addr and isinstance(addr, str) and addr.strip():
-                # Nettoyer et extraire les adresses (peuvent être séparées par virgules)
-                for part in addr.split(","):
-                    cleaned = part.strip()
-                    if len(cleaned) > 3:  # Ignorer les trop courts
-                        addresses.add(cleaned)
+        # Les adresses peuvent être séparées par des virgules : découpage,
+        # nettoyage et filtre des trop courts en un seul passage regex
+        parts = raw.dropna().str.findall(_ADDR_RE).explode().dropna()
 
-        return list(addresses)
+        return parts.unique().tolist()
 
     def build_geocoding_cache(
         self,
-        addresses: list[str]
+        addresses: list[str],
+        verbose: bool = True
     ) -> dict[str, GeocodingResult]:
         """
         Construit un cache de géocodage pour éviter les requêtes en double.
         
         Args:
             addresses: Liste d'adresses à géocoder
+            verbose: Afficher la progression
         
         Returns:
             Dictionnaire adresse -> résultat
         """
+        coro = self.build_geocoding_cache_async(addresses, verbose)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+        # Appel depuis une boucle active (Jupyter, appelant async) : asyncio.run()
+        # y lèverait RuntimeError, la coroutine tourne dans un thread à part
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(asyncio.run, coro).result()
+
+    async def build_geocoding_cache_async(
+        self,
+        addresses: list[str],
+        verbose: bool = True
+    ) -> dict[str, GeocodingResult]:
+        """
+        Version asynchrone de build_geocoding_cache.
+        
+        Pour géocoder plusieurs lots sur une même boucle d'événements
+        (une boucle par appel sinon).
+        """
         cache = {}
 
-        print(f"🌍 Géocodage de {len(addresses)} adresses uniques...")
+        if self.persistent_cache is not None:
+            cache.update(self.persistent_cache.get_many(addresses))
+            if cache and verbose:
+                print(f"💾 {len(cache)} adresses trouvées dans le cache disque")
 
-        for result in self.geocoder.fetch_all(addresses):
-            cache[result.original_address] = result
+        missing = [addr for addr in addresses if addr not in cache]
+        if verbose:
+            print(f"🌍 Géocodage de {len(missing)} adresses uniques...")
 
-        success_rate = (
-            sum(1 for r in cache.values() if r.is_valid) / len(cache) * 100
-            if cache else 0
-        )
-        print(f"✅ Taux de succès: {success_rate:.1f}%")
+        fetched = []
+        if missing:
+            # Requêtes concurrentes, débit limité par le fetcher
+            fetched = await self.geocoder.fetch_all_async(missing, verbose=verbose)
+            for result in fetched:
+                cache[result.original_address] = result
+
+        # Seuls les géocodages aboutis sont persistés : un score nul peut venir d'une erreur réseau
+        if self.persistent_cache is not None:
+            self.persistent_cache.set_many([r for r in fetched if r.latitude is not None])
+
+        # Version colonnes réutilisée par enrich_products
+        self._geo_table = GeocodingTable.from_cache(cache)
+        self._geo_table_source = cache
+
+        if verbose:
+            success_rate = self._geo_table.is_valid.mean() * 100 if cache else 0
+            print(f"✅ Taux de succès: {success_rate:.1f}%")
 
         return cache
 
+    def _get_geo_table(self, geocoding_cache: dict[str, GeocodingResult]) -> GeocodingTable:
+        """Retourne la table en colonnes du cache (construite une seule fois)."""
+        table = self._geo_table
+        if (
+            table is not None
+            and self._geo_table_source is geocoding_cache
+            and len(table) == len(geocoding_cache)
+        ):
+            return table
+        return GeocodingTable.from_cache(geocoding_cache)
+
     def enrich_products(
         self,
         products: list[dict],
@@ -91,45 +316,109 @@ class DataEnricher:
         Returns:
             Liste des produits enrichis
         """
-        enriched = []
+        if not products:
+            return []
 
-        for product in tqdm(products, desc="Enrichissement"):
-            self.enrichment_stats["total_processed"] += 1
+        # Seule la colonne d'adresses passe par la jointure : les produits restent des dicts
+        addresses = pd.Series([product.get(address_field) for product in products], dtype=object)
+        geo, matched = self._lookup_addresses(addresses, geocoding_cache)
 
-            # Copier le produit
-            enriched_product = product.copy()
+        # Produits sans résultat renvoyés tels quels (copie) ; les autres reçoivent les champs géo
+        enriched = [product.copy() for product in products]
+        rows = geo[matched].astype(object)
+        rows = rows.where(rows.notna(), None)
+        for position, fields in zip(np.flatnonzero(matched), rows.to_dict("records")):
+            enriched[position].update(fields)
 
-            # Chercher l'adresse
-            addr = product.get(address_field, "")
-            if addr and isinstance(addr, str):
-                # Prendre la première adresse si plusieurs
-                first_addr = addr.split(",")[0].strip()
+        return enriched
 
-                if first_addr in geocoding_cache:
-                    geo = geocoding_cache[first_addr]
+    def enrich_dataframe(
+        self,
+        df: pd.DataFrame,
+        geocoding_cache: dict[str, GeocodingResult],
+        address_field: str = "stores"
+    ) -> pd.DataFrame:
+        """
+        Enrichit un DataFrame de produits en une seule passe colonnes.
+        
+        Évite l'aller-retour liste de dicts -> DataFrame -> liste de dicts
+        quand la suite du pipeline travaille déjà sur un DataFrame.
+        
+        Args:
+            df: DataFrame des produits (non modifié)
+            geocoding_cache: Cache de géocodage
+            address_field: Colonne contenant l'adresse
+        
+        Returns:
+            Nouveau DataFrame avec les colonnes de géocodage
+        """
+        raw = df[address_field] if address_field in df.columns else pd.Series(None, index=df.index, dtype=object)
+        geo, matched = self._lookup_addresses(raw, geocoding_cache)
+
+        # Mêmes types que pd.DataFrame(produits enrichis) : flottants NaN, textes None
+        columns = {}
+        for column in GEO_COLUMNS:
+            values = geo[column]
+            if values.dtype == "string":
+                values = values.astype(object).where(values.notna(), None)
+            # Les champs géographiques ne sont écrasés que pour les produits trouvés
+            if column in df.columns:
+                values = values.where(matched, df[column])
+            columns[column] = values
+
+        return df.assign(**columns)
+
+    def _lookup_addresses(
+        self,
+        raw: pd.Series,
+        geocoding_cache: dict[str, GeocodingResult]
+    ) -> tuple[pd.DataFrame, np.ndarray]:
+        """
+        Cherche la première adresse de chaque produit dans le cache et met à jour les compteurs.
+        
+        Returns:
+            (champs géographiques alignés sur raw, masque des produits trouvés)
+        """
+        self._total_processed += len(raw)
 
-                    enriched_product["store_address"] = geo.label
-                    enriched_product["latitude"] = geo.latitude
-                    enriched_product["longitude"] = geo.longitude
-                    enriched_product["city"] = geo.city
-                    enriched_product["postal_code"] = geo.postal_code
-                    enriched_product["geocoding_score"] = geo.score
+        # Première adresse si plusieurs (les valeurs non textuelles sont ignorées)
+        has_address = raw.map(lambda addr: isinstance(addr, str) and addr != "")
+        first_addr = raw.where(has_address).astype("string").str.split(",").str[0].str.strip()
 
-                    if geo.is_valid:
-                        self.enrichment_stats["successfully_enriched"] += 1
-                    else:
-                        self.enrichment_stats["failed_enrichment"] += 1
-                else:
-                    # Adresse non trouvée dans le cache
-                    self.enrichment_stats["failed_enrichment"] += 1
+        # Jointure unique sur la table en colonnes au lieu d'une recherche par produit
+        table = self._get_geo_table(geocoding_cache)
+        geo, positions = table.lookup(first_addr)
+        matched = positions >= 0
 
-            enriched.append(enriched_product)
+        successes = int(table.is_valid[positions[matched]].sum())
+        self._success += successes
+        self._fail += int(has_address.sum()) - successes
 
-        return enriched
+        return geo, matched
+
+    def close(self):
+        """Ferme le cache disque de géocodage."""
+        if self.persistent_cache is not None:
+            self.persistent_cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def enrichment_stats(self) -> dict:
+        """Compteurs d'enrichissement (instantané)."""
+        return {
+            "total_processed": self._total_processed,
+            "successfully_enriched": self._success,
+            "failed_enrichment": self._fail,
+        }
 
     def get_stats(self) -> dict:
         """Retourne les statistiques d'enrichissement."""
-        stats = self.enrichment_stats.copy()
+        stats = self.enrichment_stats
         stats["geocoder_stats"] = self.geocoder.get_stats()
 
         if stats["total_processed"] > 0:
@@ -1,10 +1,12 @@
 """Fetcher pour l'API Adresse (géocodage)."""
+import asyncio
 from typing import Generator
 from datetime import datetime
 
+import httpx
 from tqdm import tqdm
 
-from .base import BaseFetcher
+from .base import AsyncRateLimiter, BaseFetcher
 from ..config import ADRESSE_CONFIG
 from ..models import GeocodingResult
 
@@ -25,31 +27,56 @@ class AdresseFetcher(BaseFetcher):
 
         try:
             data = self._make_request("/search/", params={"q": address, "limit": 1})
+            return self._parse_response(address, data)
 
-            if not data.get("features"):
-                return GeocodingResult(original_address=address, score=0.0)
-
-            feature = data["features"][0]
-            props = feature.get("properties", {})
-            coords = feature.get("geometry", {}).get("coordinates", [None, None])
+        except Exception as e:
+            self.stats["requests_failed"] += 1
+            return GeocodingResult(original_address=address, score=0.0)
 
-            self.stats["items_fetched"] += 1
+    async def geocode_single_async(
+        self,
+        client: httpx.AsyncClient,
+        limiter: AsyncRateLimiter,
+        address: str
+    ) -> GeocodingResult:
+        """
+        Version asynchrone de geocode_single.
+        """
+        if not address or address.strip() == "":
+            return GeocodingResult(original_address=address or "", score=0.0)
 
-            return GeocodingResult(
-                original_address=address,
-                label=props.get("label"),
-                latitude=coords[1] if len(coords) > 1 else None,
-                longitude=coords[0] if len(coords) > 0 else None,
-                score=props.get("score", 0.0),
-                postal_code=props.get("postcode"),
-                city_code=props.get("citycode"),
-                city=props.get("city"),
+        try:
+            data = await self._make_request_async(
+                client, limiter, "/search/", params={"q": address, "limit": 1}
             )
+            return self._parse_response(address, data)
 
         except Exception as e:
             self.stats["requests_failed"] += 1
             return GeocodingResult(original_address=address, score=0.0)
 
+    def _parse_response(self, address: str, data: dict) -> GeocodingResult:
+        """Convertit la réponse de /search/ en GeocodingResult."""
+        if not data.get("features"):
+            return GeocodingResult(original_address=address, score=0.0)
+
+        feature = data["features"][0]
+        props = feature.get("properties", {})
+        coords = feature.get("geometry", {}).get("coordinates", [None, None])
+
+        self.stats["items_fetched"] += 1
+
+        return GeocodingResult(
+            original_address=address,
+            label=props.get("label"),
+            latitude=coords[1] if len(coords) > 1 else None,
+            longitude=coords[0] if len(coords) > 0 else None,
+            score=props.get("score", 0.0),
+            postal_code=props.get("postcode"),
+            city_code=props.get("citycode"),
+            city=props.get("city"),
+        )
+
     def fetch_batch(self, addresses: list[str]) -> list[GeocodingResult]:
         """
         Géocode un lot d'adresses.
@@ -83,4 +110,41 @@ class AdresseFetcher(BaseFetcher):
 
         if verbose:
             success = sum(1 for _ in range(self.stats["items_fetched"]))
-            print(f"✅ {self.stats['items_fetched']} adresses géocodées")
\ No newline at end of file
+            print(f"✅ {self.stats['items_fetched']} adresses géocodées")
+
+    async def fetch_all_async(
+        self,
+        addresses: list[str],
+        verbose: bool = True,
+        max_concurrency: int = 10,
+    ) -> list[GeocodingResult]:
+        """
+        Géocode toutes les adresses en parallèle.
+        
+        Jusqu'à max_concurrency requêtes en vol, départs espacés de
+        config.rate_limit : le quota de l'API est exploité sans attendre
+        la réponse précédente. Les résultats suivent l'ordre des adresses.
+        """
+        self.stats["start_time"] = datetime.now()
+
+        limiter = AsyncRateLimiter(self.config.rate_limit)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        pbar = tqdm(total=len(addresses), desc="Géocodage", disable=not verbose)
+
+        async with self._async_client(max_concurrency) as client:
+
+            async def geocode(address: str) -> GeocodingResult:
+                async with semaphore:
+                    result = await self.geocode_single_async(client, limiter, address)
+                pbar.update(1)
+                return result
+
+            results = await asyncio.gather(*(geocode(address) for address in addresses))
+
+        pbar.close()
+        self.stats["end_time"] = datetime.now()
+
+        if verbose:
+            print(f"✅ {self.stats['items_fetched']} adresses géocodées")
+
+        return list(results)
@@ -1,4 +1,5 @@
 """Classe de base pour les fetchers."""
+import asyncio
 import time
 from abc import ABC, abstractmethod
 from typing import Generator
@@ -18,6 +19,33 @@ from ..config import APIConfig
 logger = logging.getLogger(__name__)
 
 
+class AsyncRateLimiter:
+    """
+    Limiteur de débit pour requêtes concurrentes.
+    
+    Espace le départ des requêtes d'au moins `interval` secondes, toutes
+    tâches confondues : le quota par seconde est respecté tout en laissant
+    plusieurs réponses en vol.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = asyncio.Lock()
+        self._next_slot = 0.0
+
+    async def __aenter__(self):
+        async with self._lock:
+            now = time.monotonic()
+            if self._next_slot > now:
+                await asyncio.sleep(self._next_slot - now)
+                now = self._next_slot
+            self._next_slot = now + self.interval
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
 class BaseFetcher(ABC):
     """Classe abstraite pour les fetchers d'API."""
 
@@ -57,6 +85,39 @@ class BaseFetcher(ABC):
             self.stats["requests_made"] += 1
             return response.json()
 
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=2, max=30),
+        retry=retry_if_exception_type((httpx.HTTPError, httpx.TimeoutException)),
+        before_sleep=before_sleep_log(logger, logging.WARNING)
+    )
+    async def _make_request_async(
+        self,
+        client: httpx.AsyncClient,
+        limiter: AsyncRateLimiter,
+        endpoint: str,
+        params: dict = None
+    ) -> dict:
+        """
+        Version asynchrone de _make_request (client partagé, débit limité).
+        """
+        url = f"{self.config.base_url}{endpoint}"
+
+        async with limiter:
+            response = await client.get(url, params=params)
+        response.raise_for_status()
+
+        self.stats["requests_made"] += 1
+        return response.json()
+
+    def _async_client(self, max_connections: int) -> httpx.AsyncClient:
+        """Client HTTP asynchrone configuré pour cette API."""
+        return httpx.AsyncClient(
+            timeout=self.config.timeout,
+            headers=self.config.headers,
+            limits=httpx.Limits(max_connections=max_connections),
+        )
+
     def _rate_limit(self):
         """Applique le rate limiting."""
         time.sleep(self.config.rate_limit)
@@ -68,10 +68,13 @@ class OpenFoodFactsFetcher(BaseFetcher):
         page = 1
         total_fetched = 0
 
+        # Rafraîchissement espacé : l'affichage ne doit pas coûter plus que la boucle
         pbar = tqdm(
             total=max_items,
             desc=f"OpenFoodFacts [{category}]",
             disable=not verbose,
+            miniters=max(1, max_items // 200),
+            mininterval=0.5,
         )
 
         while total_fetched < max_items:
@@ -83,14 +86,17 @@ class OpenFoodFactsFetcher(BaseFetcher):
             if not products:
                 break
 
+            batch_start = total_fetched
             for product in products:
                 yield product
                 total_fetched += 1
-                pbar.update(1)
 
                 if total_fetched >= max_items:
                     break
 
+            # Une mise à jour par page plutôt qu'une par produit
+            pbar.update(total_fetched - batch_start)
+
             page += 1
             self._rate_limit()
 
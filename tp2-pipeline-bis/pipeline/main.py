@@ -1,25 +1,72 @@
 #!/usr/bin/env python3
 """Script principal du pipeline."""
 import argparse
+import asyncio
+import logging
+import queue
 import sys
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
+from typing import Optional, Union
 import pandas as pd
-import traceback
 
 from .fetchers.openfoodfacts import OpenFoodFactsFetcher
 from .enricher import DataEnricher
 from .transformer import DataTransformer
-from .quality import QualityAnalyzer
+from .quality import QualityAnalyzer, analyze_partitions, weighted_completeness
 from .storage import save_raw_json, save_parquet
-from .config import MAX_ITEMS
+from .config import BATCH_SIZE, MAX_ITEMS
+
+# Limite de géocodage (quota de l'API Adresse)
+MAX_GEOCODED_ADDRESSES = 50
+# Pages de produits en attente entre l'acquisition et le géocodage
+PIPELINE_QUEUE_SIZE = 4
+
+# Niveaux du journal du pipeline : (niveau logging, préfixe affiché)
+LOG_LEVELS = {
+    "INFO": (logging.INFO, "ℹ️"),
+    "SUCCESS": (logging.INFO, "✅"),
+    "WARNING": (logging.WARNING, "⚠️"),
+    "ERROR": (logging.ERROR, "❌"),
+    "STEP": (logging.INFO, "🚀"),
+}
+
+logger = logging.getLogger(__name__)
+
+
+class _DefaultPrefixFilter(logging.Filter):
+    """Donne un préfixe par défaut aux messages émis sans extra={'prefix': ...}."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "prefix"):
+            record.prefix = "📝"
+        return True
+
+
+def _configure_logger():
+    """Configure une seule fois la sortie console du journal (horodatage par le formateur)."""
+    if logger.handlers:
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    # Filtre sur le handler : couvre aussi les messages des loggers enfants
+    handler.addFilter(_DefaultPrefixFilter())
+    handler.setFormatter(logging.Formatter("%(prefix)s [%(asctime)s] %(message)s", datefmt="%H:%M:%S"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
 
 
 class PipelineOrchestrator:
     """Orchestrateur du pipeline complet."""
     
-    def __init__(self, verbose: bool = True):
+    def __init__(self, verbose: bool = True, concurrent_io: bool = True):
         self.verbose = verbose
+        # Écriture du JSON brut en arrière-plan pendant les étapes 2 à 4
+        self.concurrent_io = concurrent_io
+        self._io_pool: Optional[ThreadPoolExecutor] = None
+        self._raw_json_future: Optional[Future] = None
+        _configure_logger()
         self.stats = {
             "start_time": None,
             "end_time": None,
@@ -29,18 +76,11 @@ class PipelineOrchestrator:
             "stages": {}
         }
     
-    def log(self, message: str, level: str = "INFO"):
-        """Journalisation conditionnelle."""
+    def log(self, message: str, level: str = "INFO", exc_info: bool = False):
+        """Journalisation conditionnelle (formatage différé par le module logging)."""
         if self.verbose:
-            timestamp = datetime.now().strftime("%H:%M:%S")
-            prefix = {
-                "INFO": "ℹ️",
-                "SUCCESS": "✅",
-                "WARNING": "⚠️",
-                "ERROR": "❌",
-                "STEP": "🚀"
-            }.get(level, "📝")
-            print(f"{prefix} [{timestamp}] {message}")
+            log_level, prefix = LOG_LEVELS.get(level, (logging.INFO, "📝"))
+            logger.log(log_level, "%s", message, extra={"prefix": prefix}, exc_info=exc_info)
     
     def run_pipeline(
         self,
@@ -66,26 +106,27 @@ class PipelineOrchestrator:
         self.stats["start_time"] = datetime.now()
         self.stats["category"] = category
         self.stats["max_items"] = max_items
+        if self.concurrent_io:
+            self._io_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pipeline-io")
         
         try:
             self._print_header(category)
             
-            # === ÉTAPE 1 : Acquisition ===
-            products = self._stage_1_acquisition(category, max_items)
-            if not products:
-                raise ValueError("Aucun produit récupéré")
-            
-            # === ÉTAPE 2 : Enrichissement ===
+            # === ÉTAPES 1 + 2 : Acquisition et enrichissement ===
             if not skip_enrichment:
-                products = self._stage_2_enrichment(products)
+                # Le géocodage démarre dès les premières pages récupérées
+                products = self._stages_1_2_pipelined(category, max_items)
             else:
+                products = self._stage_1_acquisition(category, max_items)
                 self.log("Enrichissement ignoré (option --skip-enrichment)", "WARNING")
+            if len(products) == 0:
+                raise ValueError("Aucun produit récupéré")
             
             # === ÉTAPE 3 : Transformation ===
             df_clean = self._stage_3_transformation(products)
             
             # === ÉTAPE 4 : Qualité ===
-            quality_grade = self._stage_4_quality(df_clean, skip_ai)
+            quality_grade = self._stage_4_quality(df_clean, skip_ai, partition_by)
             
             # === ÉTAPE 5 : Stockage ===
             output_path = self._stage_5_storage(df_clean, category, partition_by)
@@ -102,12 +143,15 @@ class PipelineOrchestrator:
         except Exception as e:
             self.stats["success"] = False
             self.stats["error"] = str(e)
-            self.log(f"Erreur du pipeline: {e}", "ERROR")
-            
-            if self.verbose:
-                traceback.print_exc()
+            self.log(f"Erreur du pipeline: {e}", "ERROR", exc_info=True)
             
             return self.stats
+        
+        finally:
+            if self._io_pool is not None:
+                self._io_pool.shutdown(wait=True)
+                self._io_pool = None
+            self._raw_json_future = None
     
     def _print_header(self, category: str):
         """Affiche l'en-tête du pipeline."""
@@ -125,62 +169,123 @@ class PipelineOrchestrator:
         fetcher = OpenFoodFactsFetcher()
         products = list(fetcher.fetch_all(category, max_items, self.verbose))
         
+        self._record_acquisition(fetcher, products, category)
+        
+        return products
+    
+    def _record_acquisition(self, fetcher: OpenFoodFactsFetcher, products: list[dict], category: str):
+        """Sauvegarde les données brutes et les statistiques d'acquisition."""
         if not products:
             raise ValueError(f"Aucun produit trouvé pour la catégorie '{category}'")
         
-        # Sauvegarde des données brutes
-        json_path = save_raw_json(products, f"{category}_raw")
-        
         self.stats["stages"]["acquisition"] = {
             "products_fetched": len(products),
-            "raw_json_path": str(json_path),
             "fetcher_stats": fetcher.get_stats()
         }
         
         self.log(f"✅ {len(products)} produits récupérés", "SUCCESS")
-        self.log(f"💾 Données brutes: {json_path.name}", "INFO")
         
-        return products
+        # Sauvegarde des données brutes (en arrière-plan si possible, attendue à l'étape 5)
+        if self._io_pool is not None:
+            self._raw_json_future = self._io_pool.submit(save_raw_json, products, f"{category}_raw")
+        else:
+            self._record_raw_json(save_raw_json(products, f"{category}_raw"))
     
-    def _stage_2_enrichment(self, products: list[dict]) -> list[dict]:
-        """Étape 2: Enrichissement par géocodage."""
-        self.log("ÉTAPE 2: Enrichissement (géocodage des magasins)", "STEP")
-        
-        enricher = DataEnricher()
-        
-        # Extraire les adresses uniques
-        addresses = enricher.extract_addresses(products, "stores")
-        
-        if not addresses:
-            self.log("⚠️ Aucune adresse trouvée dans les produits", "WARNING")
-            return products
-        
-        self.log(f"📍 {len(addresses)} adresses uniques extraites", "INFO")
-        
-        # Limiter à 50 adresses pour éviter les dépassements de quota
-        max_addresses = min(50, len(addresses))
-        if len(addresses) > max_addresses:
-            self.log(f"⚠️ Limité à {max_addresses} adresses (performance)", "WARNING")
-            addresses = addresses[:max_addresses]
+    def _record_raw_json(self, json_path: Path):
+        """Enregistre le chemin du JSON brut dans les statistiques d'acquisition."""
+        self.stats["stages"]["acquisition"]["raw_json_path"] = str(json_path)
+        self.log(f"💾 Données brutes: {json_path.name}", "INFO")
+    
+    def _stages_1_2_pipelined(self, category: str, max_items: int) -> pd.DataFrame:
+        """
+        Étapes 1 et 2 en producteur/consommateur.
         
-        # Construire le cache de géocodage
-        geo_cache = enricher.build_geocoding_cache(addresses)
+        Un thread récupère les pages OpenFoodFacts pendant qu'un second
+        géocode les nouvelles adresses de chaque page : la latence des deux
+        API se recouvre au lieu de s'additionner. Les produits sont ensuite
+        enrichis directement sous forme de DataFrame, prêt pour l'étape 3.
+        """
+        self.log("ÉTAPES 1+2: Acquisition et géocodage en parallèle", "STEP")
         
-        # Enrichir les produits
-        enriched_products = enricher.enrich_products(products, geo_cache, "stores")
+        fetcher = OpenFoodFactsFetcher()
+        pages: queue.Queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
         
-        self.stats["stages"]["enrichment"] = enricher.get_stats()
+        with DataEnricher() as enricher, ThreadPoolExecutor(max_workers=2) as pool:
+            fetch_future = pool.submit(self._produce_pages, fetcher, category, max_items, pages)
+            geo_future = pool.submit(self._consume_pages, enricher, pages)
+            products = fetch_future.result()
+            geo_cache = geo_future.result()
+            
+            self._record_acquisition(fetcher, products, category)
+            df = pd.DataFrame(products)
+            
+            if not geo_cache:
+                self.log("⚠️ Aucune adresse trouvée dans les produits", "WARNING")
+                return df
+            
+            self.log(f"📍 {len(geo_cache)} adresses uniques géocodées", "INFO")
+            
+            df_enriched = enricher.enrich_dataframe(df, geo_cache, "stores")
+            self.stats["stages"]["enrichment"] = enricher.get_stats()
         
         success_rate = self.stats["stages"]["enrichment"].get("success_rate", 0)
         self.log(f"✅ Enrichissement terminé (taux de succès: {success_rate:.1f}%)", "SUCCESS")
         
-        return enriched_products
+        return df_enriched
+    
+    def _produce_pages(
+        self,
+        fetcher: OpenFoodFactsFetcher,
+        category: str,
+        max_items: int,
+        pages: queue.Queue
+    ) -> list[dict]:
+        """Producteur : récupère les produits et publie des pages de BATCH_SIZE."""
+        products = []
+        page = []
+        try:
+            for product in fetcher.fetch_all(category, max_items, self.verbose):
+                products.append(product)
+                page.append(product)
+                if len(page) >= BATCH_SIZE:
+                    pages.put(page)
+                    page = []
+            if page:
+                pages.put(page)
+        finally:
+            # Fin de flux, même en cas d'erreur : le consommateur ne reste pas bloqué
+            pages.put(None)
+        return products
+    
+    def _consume_pages(self, enricher: DataEnricher, pages: queue.Queue) -> dict:
+        """Consommateur : géocode les nouvelles adresses de chaque page, sur une seule boucle d'événements."""
+        return asyncio.run(self._consume_pages_async(enricher, pages))
     
-    def _stage_3_transformation(self, products: list[dict]) -> pd.DataFrame:
+    async def _consume_pages_async(self, enricher: DataEnricher, pages: queue.Queue) -> dict:
+        """Boucle du consommateur (attente bloquante sur la file : aucune autre tâche sur cette boucle)."""
+        geo_cache = {}
+        page = pages.get()
+        try:
+            while page is not None:
+                remaining = MAX_GEOCODED_ADDRESSES - len(geo_cache)
+                new_addresses = [
+                    addr for addr in enricher.extract_addresses(page, "stores")
+                    if addr not in geo_cache
+                ][:remaining]
+                if new_addresses:
+                    geo_cache.update(await enricher.build_geocoding_cache_async(new_addresses, verbose=False))
+                page = pages.get()
+        finally:
+            # En cas d'erreur, vider la file pour ne pas bloquer le producteur
+            while page is not None:
+                page = pages.get()
+        return geo_cache
+    
+    def _stage_3_transformation(self, products: Union[list[dict], pd.DataFrame]) -> pd.DataFrame:
         """Étape 3: Transformation et nettoyage."""
         self.log("ÉTAPE 3: Transformation et nettoyage", "STEP")
         
-        df = pd.DataFrame(products)
+        df = products if isinstance(products, pd.DataFrame) else pd.DataFrame(products)
         
         transformer = DataTransformer(df, verbose=self.verbose)
         df_clean = (
@@ -193,9 +298,15 @@ class PipelineOrchestrator:
             .clean_address_column('stores', min_length=5)
             .normalize_text_columns(['product_name', 'brands', 'categories', 'stores'])
             .add_derived_columns()
+            .downcast_floats()
+            .compact_dtypes()
             .get_result()
         )
         
+        # Colonnes Arrow pour la suite : bitmaps de nulls et hachage en C pour l'analyse qualité
+        # (convert_integer=False : 48.0 reste un flottant et ne devient pas un entier)
+        df_clean = df_clean.convert_dtypes(dtype_backend='pyarrow', convert_integer=False)
+        
         self.stats["stages"]["transformation"] = {
             "initial_rows": len(df),
             "final_rows": len(df_clean),
@@ -217,8 +328,8 @@ class PipelineOrchestrator:
         
         return df_clean
     
-    def _stage_4_quality(self, df_clean: pd.DataFrame, skip_ai: bool) -> str:
-        """Étape 4: Analyse de qualité."""
+    def _stage_4_quality(self, df_clean: pd.DataFrame, skip_ai: bool, partition_by: str = None) -> str:
+        """Étape 4: Analyse de qualité (et par partition si partition_by est fourni)."""
         self.log("ÉTAPE 4: Analyse de qualité", "STEP")
         
         analyzer = QualityAnalyzer(df_clean)
@@ -236,6 +347,9 @@ class PipelineOrchestrator:
             "is_acceptable": metrics.is_acceptable
         }
         
+        if partition_by and partition_by in df_clean.columns:
+            self._quality_by_partition(df_clean, partition_by)
+        
         self.log(f"✅ Analyse de qualité terminée", "SUCCESS")
         self.log(f"   Note: {metrics.quality_grade}", "INFO")
         self.log(f"   Acceptable: {'✅ Oui' if metrics.is_acceptable else '❌ Non'}", "INFO")
@@ -243,6 +357,17 @@ class PipelineOrchestrator:
         
         return metrics.quality_grade
     
+    def _quality_by_partition(self, df_clean: pd.DataFrame, partition_by: str):
+        """Analyse chaque partition (une partition par processus sur les gros volumes)."""
+        partition_metrics = analyze_partitions(df_clean, partition_by)
+        
+        self.stats["stages"]["quality"]["partitions"] = {
+            str(key): metrics.quality_grade for key, metrics in partition_metrics.items()
+        }
+        self.stats["stages"]["quality"]["partition_completeness"] = weighted_completeness(partition_metrics)
+        
+        self.log(f"   Partitions analysées: {len(partition_metrics)}", "INFO")
+    
     def _stage_5_storage(
         self,
         df_clean: pd.DataFrame,
@@ -254,6 +379,11 @@ class PipelineOrchestrator:
         
         output_path = save_parquet(df_clean, category, partition_by=partition_by)
         
+        # Le JSON brut s'écrivait en parallèle : on l'attend avant de conclure
+        if self._raw_json_future is not None:
+            self._record_raw_json(self._raw_json_future.result())
+            self._raw_json_future = None
+        
         self.stats["stages"]["storage"] = {
             "output_path": str(output_path),
             "format": "parquet",
@@ -270,11 +400,10 @@ class PipelineOrchestrator:
     def _print_footer(self):
         """Affiche le pied de page avec les résultats."""
         self.stats["end_time"] = datetime.now()
-        self.stats["duration_seconds"] = (
-            self.stats["end_time"] - self.stats["start_time"]
-        ).seconds
+        # total_seconds() : .seconds ignore les jours et tronque les fractions
+        duration = (self.stats["end_time"] - self.stats["start_time"]).total_seconds()
+        self.stats["duration_seconds"] = duration
         
-        duration = self.stats["duration_seconds"]
         category = self.stats["category"]
         quality_grade = self.stats.get("quality_grade", "N/A")
         output_path = self.stats.get("output_path", "N/A")
@@ -284,7 +413,7 @@ class PipelineOrchestrator:
         print("="*70)
         print(f"📊 Résultats:")
         print(f"   • Catégorie: {category}")
-        print(f"   • Durée totale: {duration} secondes")
+        print(f"   • Durée totale: {duration:.1f} secondes")
         print(f"   • Note qualité: {quality_grade}")
         print(f"   • Fichier de sortie: {output_path}")
         
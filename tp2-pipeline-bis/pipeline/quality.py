@@ -1,5 +1,9 @@
 """Module de scoring et rapport de qualité."""
+import heapq
+import multiprocessing
+import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
 import json
@@ -10,83 +14,218 @@ from dotenv import load_dotenv
 from .config import QUALITY_THRESHOLDS, REPORTS_DIR
 from .models import QualityMetrics
 
+try:
+    from numba import njit
+except ImportError:  # dépendance optionnelle
+    njit = None
+
 load_dotenv()
 
 
+def _null_count(series: pd.Series) -> int:
+    """
+    Nombre de valeurs nulles d'une colonne.
+    
+    Les colonnes Arrow exposent directement le compteur de leur bitmap de
+    validité ; les autres passent par count() sans matérialiser de masque.
+    """
+    array = series.array
+    if isinstance(array, pd.arrays.ArrowExtensionArray):
+        return array.__arrow_array__().null_count
+    return len(series) - int(series.count())
+
+
+GRADES = "ABCDF"
+
+# En dessous, les partitions sont analysées dans le processus courant : lancer des
+# processus "spawn" (réimport de pandas, pyarrow, litellm) coûte plus que l'analyse
+PARALLEL_PARTITIONS_MIN_ROWS = 500_000
+
+
+def _grade(completeness: float, duplicates_pct: float, geo_rate: float, has_geo: bool) -> int:
+    """
+    Score sur 100 converti en indice de note dans GRADES (0 = A ... 4 = F).
+    
+    Fonction pure et purement numérique : compilée par numba si disponible,
+    pour noter de nombreuses partitions sans surcoût d'appel Python.
+    """
+    # Complétude (40 points max)
+    score = min(completeness * 40.0, 40.0)
+
+    # Doublons (30 points max ; > 10% : 0 point)
+    if duplicates_pct <= 1.0:
+        score += 30.0
+    elif duplicates_pct <= 5.0:
+        score += 20.0
+    elif duplicates_pct <= 10.0:
+        score += 10.0
+
+    # Géocodage (30 points max) - pas de pénalité si pas de géocodage
+    if has_geo:
+        score += min(geo_rate / 100.0 * 30.0, 30.0)
+    else:
+        score += 30.0
+
+    if score >= 90.0:
+        return 0
+    elif score >= 75.0:
+        return 1
+    elif score >= 60.0:
+        return 2
+    elif score >= 40.0:
+        return 3
+    return 4
+
+
+if njit is not None:
+    _grade = njit("int64(float64, float64, float64, boolean)", cache=True)(_grade)
+
+
+def _analyze_partition(df: pd.DataFrame) -> QualityMetrics:
+    """Analyse une partition (fonction de module : picklable pour les processus)."""
+    return QualityAnalyzer(df).analyze()
+
+
+def analyze_partitions(df: pd.DataFrame, partition_by: str, max_workers: Optional[int] = None) -> dict:
+    """
+    Analyse chaque partition indépendamment, en parallèle sur plusieurs processus.
+    
+    Les partitions sont des fragments indépendants : complétude et doublons
+    se calculent sans coordination, un cœur par partition. Sous
+    PARALLEL_PARTITIONS_MIN_ROWS lignes, l'analyse reste dans le processus courant.
+    
+    Returns:
+        Dictionnaire {valeur de partition: QualityMetrics}
+    """
+    groups = df.groupby(partition_by, sort=False, observed=True, dropna=False)
+    if len(df) < PARALLEL_PARTITIONS_MIN_ROWS:
+        return {key: _analyze_partition(group) for key, group in groups}
+
+    keys = [key for key, _ in groups]
+    # "spawn" : le pipeline a déjà lancé des threads, fork() pourrait bloquer les enfants
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+        metrics = executor.map(_analyze_partition, (group for _, group in groups), chunksize=8)
+        return dict(zip(keys, metrics))
+
+
+def weighted_completeness(partition_metrics: dict) -> float:
+    """Complétude globale : moyenne des partitions pondérée par leur nombre de lignes."""
+    total = sum(m.total_records for m in partition_metrics.values())
+    if total == 0:
+        return 0.0
+    return sum(m.completeness_score * m.total_records for m in partition_metrics.values()) / total
+
+
 class QualityAnalyzer:
     """Analyse et score la qualité des données."""
 
     def __init__(self, df: pd.DataFrame):
         self.df = df
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """DataFrame analysé."""
+        return self._df
+
+    @df.setter
+    def df(self, df: pd.DataFrame):
+        # Changer de DataFrame invalide les métriques mémorisées
+        self._df = df
+        self._col_set = frozenset(df.columns)
         self.metrics: Optional[QualityMetrics] = None
+        self._base_metrics: Optional[dict] = None
+
+    def _compute_all_metrics(self) -> dict:
+        """
+        Calcule en un seul passage complétude, nulls par colonne et doublons.
+        
+        Le résultat est mémorisé : les méthodes calculate_* ne sont plus que
+        des accès à ce cache.
+        """
+        if self._base_metrics is not None:
+            return self._base_metrics
+
+        if self.df.empty:
+            self._base_metrics = {
+                "completeness": 0.0,
+                "null_counts": {},
+                "duplicates": (0, 0.0),
+            }
+            return self._base_metrics
+
+        # Dénominateur commun à toutes les colonnes, calculé une fois
+        pct_per_row = 100.0 / len(self.df)
+
+        # Un compteur de nulls par colonne, sans DataFrame booléen intermédiaire
+        null_per_col = {col: _null_count(series) for col, series in self.df.items()}
+        null_cells = sum(null_per_col.values())
+
+        self._base_metrics = {
+            "completeness": (self.df.size - null_cells) / self.df.size,
+            "null_counts": {
+                col: {'count': count, 'pct': round(count * pct_per_row, 2)}
+                for col, count in null_per_col.items()
+            },
+            "duplicates": self._count_duplicates(self._default_id_columns()),
+        }
+        return self._base_metrics
 
     def calculate_completeness(self) -> float:
         """Calcule le score de complétude (% de valeurs non-nulles)."""
-        if self.df.empty:
-            return 0.0
+        return self._compute_all_metrics()["completeness"]
 
-        total_cells = self.df.size
-        non_null_cells = self.df.notna().sum().sum()
-        return non_null_cells / total_cells
+    def _default_id_columns(self) -> list[str]:
+        """Trouve automatiquement les colonnes d'ID."""
+        possible_ids = ['code', 'id', 'product_id', 'siret', 'uuid']
+        id_columns = [col for col in possible_ids if col in self._col_set]
+        
+        if not id_columns:
+            id_columns = [self.df.columns[0]]  # Fallback: première colonne
+        
+        return id_columns
 
     def count_duplicates(self, id_columns: Optional[list[str]] = None) -> tuple[int, float]:
         """Compte les doublons."""
-        if self.df.empty:
-            return 0, 0.0
-
         if id_columns is None:
-            # Trouver automatiquement les colonnes d'ID
-            possible_ids = ['code', 'id', 'product_id', 'siret', 'uuid']
-            id_columns = [col for col in possible_ids if col in self.df.columns]
-            
-            if not id_columns:
-                id_columns = [self.df.columns[0]]  # Fallback: première colonne
+            return self._compute_all_metrics()["duplicates"]
 
-        if not id_columns:
+        return self._count_duplicates(id_columns)
+
+    def _count_duplicates(self, id_columns: list[str]) -> tuple[int, float]:
+        """Compte les doublons sur les colonnes données."""
+        if len(self.df) < 2 or not id_columns:
             return 0, 0.0
 
-        # Compter les doublons
-        duplicates = self.df.duplicated(subset=id_columns).sum()
-        pct = (duplicates / len(self.df)) * 100 if len(self.df) > 0 else 0.0
+        if len(id_columns) == 1:
+            # Cas courant ('code') : chemin rapide sur un tableau 1D
+            duplicated = self.df[id_columns[0]].duplicated()
+        else:
+            # Une empreinte 64 bits par ligne, calculée en C, au lieu de tuples Python
+            duplicated = pd.util.hash_pandas_object(self.df[id_columns], index=False).duplicated()
+
+        duplicates = int(duplicated.sum())
+        pct = (duplicates / len(self.df)) * 100
 
         return duplicates, pct
 
     def calculate_geocoding_stats(self) -> tuple[float, float]:
         """Calcule les stats de géocodage si applicable."""
-        if self.df.empty or 'geocoding_score' not in self.df.columns:
+        if self.df.empty or 'geocoding_score' not in self._col_set:
             return 0.0, 0.0
 
-        valid_geo = self.df['geocoding_score'].notna() & (self.df['geocoding_score'] >= 0.5)
-        
-        if len(self.df) == 0:
-            return 0.0, 0.0
+        # Tableau float64 brut (nulls Arrow -> NaN) : NaN >= 0.5 est faux, un seul masque
+        scores = self.df['geocoding_score'].to_numpy(dtype=np.float64, na_value=np.nan)
+        valid_geo = scores >= 0.5
 
-        success_rate = (valid_geo.sum() / len(self.df)) * 100
-        
-        if valid_geo.any():
-            avg_score = self.df.loc[valid_geo, 'geocoding_score'].mean()
-        else:
-            avg_score = 0.0
+        success_rate = float(valid_geo.mean()) * 100
+        avg_score = float(scores[valid_geo].mean()) if valid_geo.any() else 0.0
 
         return success_rate, avg_score
 
     def calculate_null_counts(self) -> dict:
-        """Compte les valeurs nulles par colonne."""
-        if self.df.empty:
-            return {}
-
-        null_counts = self.df.isnull().sum().to_dict()
-        
-        # Ajouter les pourcentages
-        null_pct = {}
-        for col, count in null_counts.items():
-            pct = (count / len(self.df)) * 100 if len(self.df) > 0 else 0.0
-            null_pct[col] = {
-                'count': count,
-                'pct': round(pct, 2)
-            }
-        
-        return null_pct
+        """Compte les valeurs nulles par colonne (avec pourcentages)."""
+        return self._compute_all_metrics()["null_counts"]
 
     def determine_quality_grade(
         self,
@@ -95,48 +234,34 @@ class QualityAnalyzer:
         geo_rate: float
     ) -> str:
         """Détermine la note de qualité globale (A-F)."""
-        score = 0.0
-
-        # Complétude (40 points max)
-        score += min(completeness * 40, 40)
-
-        # Doublons (30 points max)
-        if duplicates_pct <= 1:
-            score += 30
-        elif duplicates_pct <= 5:
-            score += 20
-        elif duplicates_pct <= 10:
-            score += 10
-        # > 10: 0 points
-
-        # Géocodage (30 points max) - si applicable
-        if 'geocoding_score' in self.df.columns:
-            score += min(geo_rate / 100 * 30, 30)
-        else:
-            score += 30  # Pas de pénalité si pas de géocodage
-
-        # Note finale
-        if score >= 90:
-            return 'A'
-        elif score >= 75:
-            return 'B'
-        elif score >= 60:
-            return 'C'
-        elif score >= 40:
-            return 'D'
-        else:
-            return 'F'
+        has_geo = 'geocoding_score' in self._col_set
+        return GRADES[_grade(completeness, duplicates_pct, geo_rate, has_geo)]
         
     def generate_ai_recommendations(self) -> str:
         """
         Génère des recommandations via l'IA.
         Si l'IA n'est pas disponible, retourne des recommandations standard.
         """
-        if not self.metrics:
-            self.analyze()
+        with AIHelper() as ai_helper:
+            if not ai_helper.available:
+                return self._generate_standard_recommendations()
+            ai_response = ai_helper.get_recommendations(self._build_ai_context())
+        
+        if ai_response:
+            # Nettoyer la réponse si nécessaire
+            ai_response = ai_response.strip()
+            if not ai_response.startswith("#"):
+                ai_response = f"## 🤖 Recommandations IA\n\n{ai_response}"
+            return ai_response
+        else:
+            # Fallback aux recommandations standards
+            return self._generate_standard_recommendations()
+
+    def _build_ai_context(self) -> str:
+        """Construit le contexte envoyé à l'IA (uniquement si un fournisseur est disponible)."""
+        self.analyze()
         
-        # Créer le contexte
-        context = f"""
+        return f"""
         Analyse de qualité d'un dataset :
         - Total enregistrements: {self.metrics.total_records}
         - Enregistrements valides: {self.metrics.valid_records}
@@ -152,20 +277,6 @@ class QualityAnalyzer:
         Veuillez donner 5 recommandations concrètes et actionnables pour améliorer ce dataset.
         Formatez en Markdown avec des listes à puces.
         """
-        
-        # Essayer l'IA
-        ai_helper = AIHelper()
-        ai_response = ai_helper.get_recommendations(context)
-        
-        if ai_response:
-            # Nettoyer la réponse si nécessaire
-            ai_response = ai_response.strip()
-            if not ai_response.startswith("#"):
-                ai_response = f"## 🤖 Recommandations IA\n\n{ai_response}"
-            return ai_response
-        else:
-            # Fallback aux recommandations standards
-            return self._generate_standard_recommendations()
 
     # def generate_ai_recommendations(self) -> str:
     #     """
@@ -219,8 +330,7 @@ class QualityAnalyzer:
 
     def _generate_standard_recommendations(self) -> str:
         """Génère des recommandations standards sans IA."""
-        if not self.metrics:
-            self.analyze()
+        self.analyze()
 
         recommendations = []
         
@@ -239,21 +349,20 @@ class QualityAnalyzer:
             )
         
         # 3. Géocodage
-        if 'geocoding_score' in self.df.columns:
+        if 'geocoding_score' in self._col_set:
             if self.metrics.geocoding_success_rate < 50:
                 recommendations.append(
                     "**Améliorer le géocodage** : Le taux de succès est faible. "
                     "Nettoyer les adresses avant géocodage ou utiliser un service plus performant."
                 )
         
-        # 4. Colonnes avec trop de nulls
-        null_counts = self.calculate_null_counts()
-        for col, stats in null_counts.items():
-            if stats['pct'] > 30:  # > 30% de nulls
-                recommendations.append(
-                    f"**Colonne '{col}'** : {stats['pct']}% de valeurs manquantes. "
-                    "Évaluer si cette colonne est nécessaire ou si elle peut être enrichie."
-                )
+        # 4. Colonnes avec trop de nulls (> 30%) : seules les plus vides tiennent dans le top 5
+        sparse_columns = [(col, stats) for col, stats in self.metrics.null_counts.items() if stats['pct'] > 30]
+        for col, stats in heapq.nlargest(5 - len(recommendations), sparse_columns, key=lambda item: item[1]['pct']):
+            recommendations.append(
+                f"**Colonne '{col}'** : {stats['pct']}% de valeurs manquantes. "
+                "Évaluer si cette colonne est nécessaire ou si elle peut être enrichie."
+            )
         
         # 5. Recommandation générale
         if not recommendations:
@@ -270,12 +379,16 @@ class QualityAnalyzer:
         return markdown
 
     def analyze(self) -> QualityMetrics:
-        """Effectue l'analyse complète de qualité."""
-        # Calculer les métriques
-        completeness = self.calculate_completeness()
-        duplicates, duplicates_pct = self.count_duplicates()
+        """Effectue l'analyse complète de qualité (une seule fois par analyseur)."""
+        if self.metrics is not None:
+            return self.metrics
+        
+        # Calculer les métriques (complétude, nulls et doublons en un passage)
+        base = self._compute_all_metrics()
+        completeness = base["completeness"]
+        duplicates, duplicates_pct = base["duplicates"]
+        null_counts = base["null_counts"]
         geo_rate, geo_avg = self.calculate_geocoding_stats()
-        null_counts = self.calculate_null_counts()
         
         # Compter les enregistrements valides
         valid_records = len(self.df) - duplicates
@@ -317,8 +430,7 @@ class QualityAnalyzer:
         Returns:
             Chemin du fichier généré
         """
-        if not self.metrics:
-            self.analyze()
+        self.analyze()
 
         # Générer les recommandations
         if include_ai:
@@ -329,10 +441,33 @@ class QualityAnalyzer:
         else:
             recommendations = self._generate_standard_recommendations()
 
-        # Construire le rapport
+        # Lignes du tableau des valeurs manquantes, triées par pourcentage décroissant
+        sorted_nulls = sorted(
+            self.metrics.null_counts.items(),
+            key=lambda x: x[1]['pct'],
+            reverse=True
+        )
+        
+        rows = []
+        for col, stats in sorted_nulls:
+            pct = stats['pct']
+            priority = "🔴 Haute" if pct > 30 else "🟡 Moyenne" if pct > 10 else "🟢 Basse"
+            rows.append(f"| {col} | {stats['count']} | {pct:.1f}% | {priority} |")
+        null_table = "\n".join(rows)
+
+        # Une seule horloge pour l'en-tête, le pied de page et le nom du fichier
+        now = datetime.now()
+        generated_at = now.strftime('%Y-%m-%d %H:%M:%S')
+
+        # Seuils lus une fois, utilisés pour les colonnes "Seuil" et "Statut"
+        completeness_min = QUALITY_THRESHOLDS['completeness_min']
+        duplicates_max_pct = QUALITY_THRESHOLDS['duplicates_max_pct']
+        geocoding_score_min = QUALITY_THRESHOLDS['geocoding_score_min']
+
+        # Construire le rapport (un seul gabarit, pas de concaténations successives)
         report = f"""# 📊 Rapport de Qualité des Données
 
-**Généré le** : {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+**Généré le** : {generated_at}
 **Dataset** : {output_name}
 **Nombre d'enregistrements** : {self.metrics.total_records}
 
@@ -344,10 +479,10 @@ class QualityAnalyzer:
 |----------|--------|------------------|--------|
 | **Note globale** | **{self.metrics.quality_grade}** | A-B-C | {"✅ Acceptable" if self.metrics.is_acceptable else "⚠️ Nécessite attention"} |
 | Enregistrements valides | {self.metrics.valid_records} | - | - |
-| Score de complétude | {self.metrics.completeness_score * 100:.1f}% | ≥ 70% | {"✅" if self.metrics.completeness_score >= QUALITY_THRESHOLDS['completeness_min'] else "⚠️"} |
-| Taux de doublons | {self.metrics.duplicates_pct:.1f}% | ≤ 5% | {"✅" if self.metrics.duplicates_pct <= QUALITY_THRESHOLDS['duplicates_max_pct'] else "⚠️"} |
+| Score de complétude | {self.metrics.completeness_score * 100:.1f}% | ≥ {completeness_min * 100:.0f}% | {"✅" if self.metrics.completeness_score >= completeness_min else "⚠️"} |
+| Taux de doublons | {self.metrics.duplicates_pct:.1f}% | ≤ {duplicates_max_pct:g}% | {"✅" if self.metrics.duplicates_pct <= duplicates_max_pct else "⚠️"} |
 | Géocodage réussi | {self.metrics.geocoding_success_rate:.1f}% | ≥ 50% | {"✅" if self.metrics.geocoding_success_rate >= 50 else "⚠️"} |
-| Score géocodage moyen | {self.metrics.avg_geocoding_score:.2f} | ≥ 0.5 | {"✅" if self.metrics.avg_geocoding_score >= QUALITY_THRESHOLDS['geocoding_score_min'] else "⚠️"} |
+| Score géocodage moyen | {self.metrics.avg_geocoding_score:.2f} | ≥ {geocoding_score_min:g} | {"✅" if self.metrics.avg_geocoding_score >= geocoding_score_min else "⚠️"} |
 
 ---
 
@@ -355,21 +490,8 @@ class QualityAnalyzer:
 
 | Colonne | Valeurs nulles | % | Priorité |
 |---------|----------------|---|----------|
-"""
-        
-        # Trier par pourcentage décroissant
-        sorted_nulls = sorted(
-            self.metrics.null_counts.items(),
-            key=lambda x: x[1]['pct'],
-            reverse=True
-        )
-        
-        for col, stats in sorted_nulls:
-            pct = stats['pct']
-            priority = "🔴 Haute" if pct > 30 else "🟡 Moyenne" if pct > 10 else "🟢 Basse"
-            report += f"| {col} | {stats['count']} | {pct:.1f}% | {priority} |\n"
+{null_table}
 
-        report += f"""
 
 ---
 
@@ -386,11 +508,11 @@ class QualityAnalyzer:
 ---
 
 *Rapport généré automatiquement par le pipeline Open Data*
-*Date : {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*
+*Date : {generated_at}*
 """
         
         # Sauvegarder
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        timestamp = now.strftime("%Y%m%d_%H%M%S")
         filename = f"{output_name}_{timestamp}.md"
         filepath = REPORTS_DIR / filename
         
@@ -1,12 +1,51 @@
-"""Module de stockage des données."""
+"""
+Module de stockage des données.
+
+load_parquet renvoie des colonnes adossées à Arrow (pd.ArrowDtype) : les
+méthodes .str.* et les calculs pandas fonctionnent à l'identique, mais les
+types affichés sont par exemple double[pyarrow] au lieu de float64.
+"""
+import fnmatch
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Union
+from typing import Iterator, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # dépendance optionnelle
+    orjson = None
 
 from .config import RAW_DIR, PROCESSED_DIR
 
+# Écriture Parquet en flux. ROW_GROUP_SIZE fixe la taille des groupes de lignes ;
+# None : taille calculée pour viser ~64 Mo par groupe, bornée entre 64k et 256k lignes
+ROW_GROUP_SIZE: Optional[int] = None
+ROW_GROUP_TARGET_BYTES = 64 * 1024 * 1024
+MIN_ROW_GROUP_SIZE = 64 * 1024
+MAX_ROW_GROUP_SIZE = 256 * 1024
+WRITE_BATCH_SIZE = 1024
+
+# Tampon d'écriture du repli json.dump (qui émet de nombreux petits fragments)
+IO_BUFFER_SIZE = 1 << 20
+
+# Au-delà de ce nombre de colonnes, un dictionnaire par colonne et par groupe coûte plus qu'il ne rapporte
+WIDE_FRAME_COLUMNS = 200
+
+# Options d'écriture communes : pages v2, statistiques et index de pages (filtrage à la lecture)
+PARQUET_WRITE_OPTIONS = {
+    "data_page_version": "2.0",
+    "write_statistics": True,
+    "write_page_index": True,
+}
+
 
 def save_raw_json(data: list[dict], name: str) -> Path:
     """
@@ -26,9 +65,17 @@ def save_raw_json(data: list[dict], name: str) -> Path:
     # Assurer que le dossier existe
     RAW_DIR.mkdir(parents=True, exist_ok=True)
     
-    # Sauvegarder
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+    # Sauvegarder (orjson encode directement en UTF-8, en un seul write)
+    if orjson is not None:
+        with open(filepath, "wb") as f:
+            f.write(orjson.dumps(
+                data,
+                default=str,
+                option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            ))
+    else:
+        with open(filepath, "w", encoding="utf-8", buffering=IO_BUFFER_SIZE) as f:
+            json.dump(data, f, ensure_ascii=False, indent=2, default=str)
     
     # Calculer la taille
     size_kb = filepath.stat().st_size / 1024
@@ -37,20 +84,112 @@ def save_raw_json(data: list[dict], name: str) -> Path:
     return filepath
 
 
+def _parquet_layout(df: Union[pd.DataFrame, pa.Table]) -> tuple[int, bool]:
+    """
+    Choisit la taille des groupes de lignes et l'usage des dictionnaires.
+    
+    Returns:
+        (row_group_size, use_dictionary)
+    """
+    row_group_size = ROW_GROUP_SIZE
+    if row_group_size is None:
+        if isinstance(df, pa.Table):
+            total_bytes = df.nbytes
+        else:
+            total_bytes = df.memory_usage(deep=True, index=False).sum()
+        approx_row_bytes = total_bytes / max(len(df), 1)
+        row_group_size = int(ROW_GROUP_TARGET_BYTES / max(approx_row_bytes, 1))
+        row_group_size = min(max(row_group_size, MIN_ROW_GROUP_SIZE), MAX_ROW_GROUP_SIZE)
+    
+    return row_group_size, df.shape[1] <= WIDE_FRAME_COLUMNS
+
+
+def _column_options(schema: pa.Schema, use_dictionary: bool, exclude: tuple = ()) -> dict:
+    """
+    Encodage par colonne : BYTE_STREAM_SPLIT pour les flottants, dictionnaires pour le reste.
+    
+    BYTE_STREAM_SPLIT regroupe les octets de même rang des flottants, ce qui
+    compresse nettement mieux avec zstd ; il exclut le dictionnaire sur ces colonnes.
+    """
+    float_cols = [
+        f.name for f in schema
+        if pa.types.is_floating(f.type) and f.name not in exclude
+    ]
+    if not float_cols:
+        return {"use_dictionary": use_dictionary}
+    
+    other_cols = [f.name for f in schema if f.name not in float_cols and f.name not in exclude]
+    return {
+        "use_dictionary": other_cols if use_dictionary else False,
+        "column_encoding": dict.fromkeys(float_cols, "BYTE_STREAM_SPLIT"),
+    }
+
+
+def _write_parquet_streaming(
+    df: Union[pd.DataFrame, pa.Table],
+    filepath: Path,
+    compression: str,
+    compression_level: Optional[int] = None
+):
+    """
+    Écrit le DataFrame groupe de lignes par groupe de lignes.
+    
+    La conversion Arrow du groupe suivant (thread principal) se fait
+    pendant l'encodage/écriture du précédent (thread d'écriture). Une
+    Table déjà convertie est simplement découpée (sans copie).
+    """
+    row_group_size, use_dictionary = _parquet_layout(df)
+    is_table = isinstance(df, pa.Table)
+    schema = df.schema if is_table else pa.Schema.from_pandas(df, preserve_index=False)
+
+    with pq.ParquetWriter(
+        filepath,
+        schema,
+        compression=compression,
+        compression_level=compression_level,
+        write_batch_size=WRITE_BATCH_SIZE,
+        **_column_options(schema, use_dictionary),
+        **PARQUET_WRITE_OPTIONS
+    ) as writer, ThreadPoolExecutor(max_workers=1) as pool:
+        pending = None
+        # Au moins un groupe, même vide, pour écrire le schéma
+        for start in range(0, max(len(df), 1), row_group_size):
+            if is_table:
+                table = df.slice(start, row_group_size)
+            else:
+                table = pa.Table.from_pandas(
+                    df.iloc[start:start + row_group_size],
+                    schema=schema,
+                    preserve_index=False
+                )
+            if pending is not None:
+                pending.result()
+            pending = pool.submit(writer.write_table, table, row_group_size=row_group_size)
+
+        if pending is not None:
+            pending.result()
+
+
 def save_parquet(
-    df: pd.DataFrame,
+    df: Union[pd.DataFrame, pa.Table],
     name: str,
     partition_by: Optional[str] = None,
-    compression: str = "snappy"
+    compression: str = "zstd",
+    compression_level: Optional[int] = 1
 ) -> Path:
     """
     Sauvegarde le DataFrame en Parquet.
     
     Args:
-        df: DataFrame à sauvegarder
+        df: DataFrame à sauvegarder, ou Table Arrow déjà convertie (à réutiliser
+            entre plusieurs écritures pour ne convertir qu'une fois)
         name: Nom du dataset
         partition_by: Colonne pour partitionnement (optionnel)
-        compression: Compression à utiliser
+        compression: Compression à utiliser (zstd : plus compact que snappy pour un coût CPU comparable)
+        compression_level: Niveau de compression (None : défaut du codec)
+    
+    Les groupes de lignes visent ~64 Mo (voir ROW_GROUP_SIZE) et les
+    dictionnaires sont désactivés au-delà de WIDE_FRAME_COLUMNS colonnes.
     
     Returns:
         Chemin du dossier/fichier créé
@@ -61,19 +200,35 @@ def save_parquet(
     # Assurer que le dossier existe
     PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
     
-    if partition_by and partition_by in df.columns:
+    columns = df.column_names if isinstance(df, pa.Table) else df.columns
+    if partition_by and partition_by in columns:
         # Sauvegarde partitionnée
         output_dir = PROCESSED_DIR / filename
-        df.to_parquet(
+        table = df if isinstance(df, pa.Table) else pa.Table.from_pandas(df, preserve_index=False)
+        row_group_size, use_dictionary = _parquet_layout(df)
+        
+        # Fichiers créés relevés pendant l'écriture : pas de parcours du dossier ensuite
+        written = []
+        ds.write_dataset(
+            table,
             output_dir,
-            partition_cols=[partition_by],
-            compression=compression,
-            index=False
+            format="parquet",
+            partitioning=[partition_by],
+            partitioning_flavor="hive",
+            file_options=ds.ParquetFileFormat().make_write_options(
+                compression=compression,
+                compression_level=compression_level,
+                # La colonne de partition n'est pas écrite dans les fichiers
+                **_column_options(table.schema, use_dictionary, exclude=(partition_by,)),
+                **PARQUET_WRITE_OPTIONS
+            ),
+            max_rows_per_group=row_group_size,
+            existing_data_behavior="overwrite_or_ignore",
+            file_visitor=written.append
         )
         
-        # Compter les fichiers créés
-        parquet_files = list(output_dir.rglob("*.parquet"))
-        size_mb = sum(f.stat().st_size for f in parquet_files) / (1024 * 1024)
+        parquet_files = [f.path for f in written]
+        size_mb = sum(f.size or 0 for f in written) / (1024 * 1024)
         
         print(f"   💾 Parquet partitionné: {output_dir.name}/")
         print(f"      - Partitions: {partition_by}")
@@ -86,13 +241,13 @@ def save_parquet(
     else:
         # Sauvegarde simple
         filepath = PROCESSED_DIR / f"{filename}.parquet"
-        df.to_parquet(filepath, compression=compression, index=False)
+        _write_parquet_streaming(df, filepath, compression, compression_level)
         
         size_mb = filepath.stat().st_size / (1024 * 1024)
         print(f"   💾 Parquet: {filepath.name}")
         print(f"      - Taille: {size_mb:.1f} MB")
         print(f"      - Enregistrements: {len(df)}")
-        print(f"      - Colonnes: {len(df.columns)}")
+        print(f"      - Colonnes: {df.shape[1]}")
         
         return filepath
 
@@ -105,21 +260,25 @@ def load_parquet(filepath: Union[str, Path]) -> pd.DataFrame:
         filepath: Chemin vers le fichier/dossier Parquet
     
     Returns:
-        DataFrame chargé
+        DataFrame chargé (colonnes pd.ArrowDtype, ex: double[pyarrow], string[pyarrow])
     """
     filepath = Path(filepath)
     
     if not filepath.exists():
         raise FileNotFoundError(f"Fichier non trouvé: {filepath}")
     
+    # Une colonne par bloc, adossée aux buffers Arrow (sans copie) ; la table
+    # est libérée au fil de la conversion pour ne pas doubler la mémoire
+    df = pq.read_table(filepath).to_pandas(
+        split_blocks=True,
+        self_destruct=True,
+        types_mapper=pd.ArrowDtype
+    )
+    
     # Chargement simple ou partitionné
     if filepath.is_dir():
-        # Dossier partitionné
-        df = pd.read_parquet(filepath)
         print(f"📂 Chargement partitionné: {filepath.name} ({len(df)} enregistrements)")
     else:
-        # Fichier simple
-        df = pd.read_parquet(filepath)
         print(f"📂 Chargement: {filepath.name} ({len(df)} enregistrements)")
     
     return df
@@ -135,17 +294,40 @@ def get_latest_parquet(name_pattern: str) -> Optional[Path]:
     Returns:
         Chemin du fichier le plus récent ou None
     """
-    pattern = PROCESSED_DIR / name_pattern.replace("*", "*")
-    files = list(PROCESSED_DIR.glob(name_pattern))
-    
-    if not files:
+    if not PROCESSED_DIR.is_dir():
         return None
     
-    # Trier par date de modification (le plus récent en premier)
-    latest = max(files, key=lambda f: f.stat().st_mtime)
+    # Une lecture du dossier ; DirEntry.stat() réutilise les infos déjà obtenues
+    latest = None
+    latest_mtime = float("-inf")
+    with os.scandir(PROCESSED_DIR) as entries:
+        for entry in entries:
+            if fnmatch.fnmatch(entry.name, name_pattern):
+                mtime = entry.stat().st_mtime
+                if mtime > latest_mtime:
+                    latest, latest_mtime = Path(entry.path), mtime
+    
     return latest
 
 
+def _scan(root: Union[str, Path], suffix: str, recursive: bool = False) -> Iterator[os.DirEntry]:
+    """
+    Parcourt les fichiers d'un dossier se terminant par suffix.
+    
+    Les DirEntry mémorisent le résultat de stat() : un seul appel système
+    par fichier (aucun sous Windows, où readdir fournit déjà la taille).
+    """
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False):
+                    if entry.name.endswith(suffix):
+                        yield entry
+                elif recursive and entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+
+
 def get_storage_stats() -> dict:
     """
     Retourne des statistiques sur le stockage.
@@ -168,34 +350,34 @@ def get_storage_stats() -> dict:
     
     # Analyser raw
     if RAW_DIR.exists():
-        raw_files = list(RAW_DIR.glob("*.json"))
+        raw_files = list(_scan(RAW_DIR, ".json"))
         stats['raw']['count'] = len(raw_files)
-        stats['raw']['total_size_mb'] = sum(f.stat().st_size for f in raw_files) / (1024 * 1024)
-        stats['raw']['files'] = [f.name for f in raw_files[:5]]  # 5 premiers
+        stats['raw']['total_size_mb'] = sum(e.stat().st_size for e in raw_files) / (1024 * 1024)
+        stats['raw']['files'] = [e.name for e in raw_files[:5]]  # 5 premiers
     
     # Analyser processed
     if PROCESSED_DIR.exists():
-        # Fichiers .parquet
-        parquet_files = list(PROCESSED_DIR.glob("*.parquet"))
-        
-        # Dossiers partitionnés
-        parquet_dirs = [d for d in PROCESSED_DIR.iterdir() if d.is_dir()]
+        # Fichiers .parquet et dossiers partitionnés, en une seule lecture du dossier
+        parquet_files = []
+        parquet_dirs = []
+        with os.scandir(PROCESSED_DIR) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    parquet_dirs.append(entry)
+                elif entry.is_file(follow_symlinks=False) and entry.name.endswith(".parquet"):
+                    parquet_files.append(entry)
         
         stats['processed']['count'] = len(parquet_files) + len(parquet_dirs)
         
         # Calculer la taille
-        total_size = 0
-        for f in parquet_files:
-            total_size += f.stat().st_size
-        
+        total_size = sum(e.stat().st_size for e in parquet_files)
         for d in parquet_dirs:
-            for f in d.rglob("*.parquet"):
-                total_size += f.stat().st_size
+            total_size += sum(e.stat().st_size for e in _scan(d.path, ".parquet", recursive=True))
         
         stats['processed']['total_size_mb'] = total_size / (1024 * 1024)
         
         # Lister les fichiers
         all_files = parquet_files + parquet_dirs
-        stats['processed']['files'] = [f.name for f in all_files[:5]]
+        stats['processed']['files'] = [e.name for e in all_files[:5]]
     
     return stats
\ No newline at end of file
@@ -1,20 +1,98 @@
 """Module de transformation et nettoyage."""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 from typing import Callable, Optional
 from litellm import completion
 from dotenv import load_dotenv
 
+try:
+    import polars as pl
+except ImportError:  # dépendance optionnelle
+    pl = None
+
+from .ai_helper import LLM_CACHE_PATH, LLMCache
 from .models import Product
 
 load_dotenv()
 
+# Copy-on-write (par défaut à partir de pandas 3) : les copies superficielles suffisent.
+# Avant pandas 3, l'option globale n'est pas modifiée et les copies restent profondes
+COPY_ON_WRITE = int(pd.__version__.split(".")[0]) >= 3
+
+
+# Caractères retirés des adresses : tout sauf lettres (accentuées comprises), chiffres, espaces et ,.-
+ADDRESS_INVALID_CHARS = r"[^\p{L}\p{N}_\s,.-]"
+
+# Colonnes gardées en float64 : la précision float32 (~7 chiffres) ne suffit pas aux coordonnées
+FLOAT64_COLUMNS = ('latitude', 'longitude')
+
+# Seuils de la catégorie de sucres (g/100g)
+SUGAR_BINS = [-float('inf'), 5, 15, 30, float('inf')]
+SUGAR_LABELS = ['faible', 'modéré', 'élevé', 'très_élevé']
+# Bornes intérieures, triées et déjà typées pour np.searchsorted (pas de conversion à chaque appel)
+SUGAR_EDGES = np.array(SUGAR_BINS[1:-1], dtype=np.float64)
+
+# Nutri-Score : note -> libellé simplifié (même position dans les deux listes)
+NUTRISCORE_GRADES = ['a', 'b', 'c', 'd', 'e']
+NUTRISCORE_LABELS = ['excellent', 'bon', 'moyen', 'mauvais', 'très_mauvais']
+
+
+def _normalize_text(arr: pa.Array) -> pa.Array:
+    """
+    strip, NFKD, repli ASCII et minuscules en kernels Arrow (C++, sans objets Python).
+    
+    Après NFKD les accents sont des caractères combinants : les retirer replie en ASCII.
+    """
+    arr = pc.utf8_normalize(pc.utf8_trim_whitespace(arr), form="NFKD")
+    return pc.ascii_lower(pc.replace_substring_regex(arr, r"[^\x00-\x7F]", ""))
+
+
+def _outlier_keep(vals: np.ndarray, method: str, threshold: float) -> Optional[np.ndarray]:
+    """
+    Masque des lignes à garder (True), calculé sur une matrice float64 (NaN = manquant).
+    
+    Les colonnes entièrement vides ou sans dispersion sont ignorées ; les
+    valeurs manquantes sont conservées. None si aucune colonne n'est vérifiée.
+    """
+    vals = vals[:, ~np.isnan(vals).all(axis=0)]
+
+    keep = None
+    if vals.shape[1] > 0 and method == 'iqr':
+        q1, q3 = np.nanpercentile(vals, [25, 75], axis=0)
+        iqr = q3 - q1
+        checked = iqr > 0  # Évite division par zéro
+        lower = q1[checked] - threshold * iqr[checked]
+        upper = q3[checked] + threshold * iqr[checked]
+        vals = vals[:, checked]
+        keep = ((vals >= lower) & (vals <= upper)) | np.isnan(vals)
+
+    elif vals.shape[1] > 0 and method == 'zscore':
+        mean = np.nanmean(vals, axis=0)
+        std = np.nanstd(vals, axis=0, ddof=1)
+        checked = std > 0  # Évite division par zéro
+        vals = vals[:, checked]
+        keep = (np.abs((vals - mean[checked]) / std[checked]) < threshold) | np.isnan(vals)
+
+    if keep is None or keep.shape[1] == 0:
+        return None
+    return keep.all(axis=1)
+
 
 class DataTransformer:
     """Transforme et nettoie les données."""
 
-    def __init__(self, df: pd.DataFrame, verbose: bool = True):
-        self.df = df.copy()
+    def __init__(self, df: pd.DataFrame, verbose: bool = True, defensive_copy: bool = False):
+        # Un DataFrame polars est converti une seule fois, à l'entrée (via Arrow)
+        if pl is not None and isinstance(df, pl.DataFrame):
+            df = df.to_pandas()
+        # Copie superficielle : avec copy-on-write, les données ne sont dupliquées
+        # qu'à la première écriture et l'appelant ne voit jamais les modifications
+        self.df = df.copy(deep=defensive_copy or not COPY_ON_WRITE)
         self.transformations_applied = []
         self.verbose = verbose
 
@@ -61,42 +139,136 @@ class DataTransformer:
             numeric_strategy: 'median', 'mean', 'zero', or None
             text_strategy: valeur de remplacement pour texte
             categorical_strategy: valeur de remplacement pour catégories
+                (colonnes 'category'), ou 'mode' pour la valeur la plus fréquente
         
         Returns:
             self (pour chaînage)
         """
-        # Colonnes numériques
         num_cols = self.df.select_dtypes(include=[np.number]).columns
-        for col in num_cols:
-            null_count = self.df[col].isnull().sum()
-            if null_count > 0:
-                if numeric_strategy == 'median':
-                    fill_value = self.df[col].median()
-                elif numeric_strategy == 'mean':
-                    fill_value = self.df[col].mean()
-                elif numeric_strategy == 'zero':
-                    fill_value = 0
-                else:
-                    fill_value = None
-
-                if fill_value is not None:
-                    self.df[col] = self.df[col].fillna(fill_value)
-                    self.transformations_applied.append(
-                        f"{col}: {null_count} nulls → {fill_value:.2f}"
-                    )
+        text_cols = self.df.select_dtypes(include=['object', 'string']).columns
+        cat_cols = self.df.select_dtypes(include=['category']).columns
 
-        # Colonnes texte
-        text_cols = self.df.select_dtypes(include=['object']).columns
-        for col in text_cols:
-            null_count = self.df[col].isnull().sum()
-            if null_count > 0:
-                self.df[col] = self.df[col].fillna(text_strategy)
-                self.transformations_applied.append(
-                    f"{col}: {null_count} nulls → '{text_strategy}'"
+        # Nulls des seules colonnes traitées, en une passe : les colonnes complètes sont ignorées ensuite
+        null_counts = self.df[num_cols.append(text_cols).append(cat_cols)].isna().sum()
+
+        # Colonnes numériques
+        num_nulls = null_counts[num_cols]
+        num_nulls = num_nulls[num_nulls > 0]
+        if not num_nulls.empty:
+            cols = num_nulls.index
+            match numeric_strategy:
+                case 'median':
+                    fill_values = self._column_medians(cols)
+                case 'mean':
+                    # Une moyenne par colonne incomplète, en un seul appel
+                    fill_values = self.df[cols].mean()
+                case 'zero':
+                    fill_values = pd.Series(0, index=cols)
+                case _:
+                    fill_values = None
+
+            if fill_values is not None:
+                self._fill_numeric(fill_values)
+                self.transformations_applied.extend(
+                    f"{col}: {null_count} nulls → {fill_values[col]:.2f}"
+                    for col, null_count in num_nulls.items()
                 )
 
+        # Colonnes texte
+        self._fill_text(null_counts[text_cols], text_strategy)
+
+        # Colonnes catégorielles
+        self._fill_categorical(null_counts[cat_cols], categorical_strategy)
+
         return self
 
+    def _column_medians(self, cols: pd.Index) -> pd.Series:
+        """
+        Médiane de chaque colonne (valeurs manquantes ignorées).
+        
+        Les colonnes float NumPy passent par np.nanmedian (sélection par
+        partition en C) sur le tableau de chaque colonne : une colonne copiée
+        à la fois plutôt que toute la matrice. Les autres passent par pandas.
+        """
+        float_cols = [
+            col for col in cols
+            if isinstance(self.df[col].dtype, np.dtype) and self.df[col].dtype.kind == 'f'
+        ]
+        medians = pd.Series(
+            [np.nanmedian(self.df[col].to_numpy()) for col in float_cols],
+            index=float_cols,
+            dtype=np.float64
+        )
+        others = cols.difference(float_cols, sort=False)
+        if len(others):
+            medians = pd.concat([medians, self.df[others].median()])
+        return medians[cols]
+
+    def _fill_numeric(self, fill_values: pd.Series):
+        """
+        Remplit les colonnes numériques incomplètes, une valeur par colonne.
+        
+        Les colonnes float NumPy sont remplies par np.where sur leur tableau
+        (pas d'alignement d'index) et remplacées une à une : au plus une
+        colonne en double à la fois, là où un assign() groupé garderait toutes
+        les anciennes et nouvelles colonnes en mémoire. Les autres (entiers
+        nullables, Arrow...) passent par fillna.
+        """
+        others = []
+        for col, value in fill_values.items():
+            dtype = self.df[col].dtype
+            if isinstance(dtype, np.dtype) and dtype.kind == 'f':
+                arr = self.df[col].to_numpy()
+                # Valeur convertie au type de la colonne : un float32 reste float32
+                self.df[col] = np.where(np.isnan(arr), dtype.type(value), arr)
+            else:
+                others.append(col)
+
+        if others:
+            self.df[others] = self.df[others].fillna(fill_values[others])
+
+    def _fill_categorical(self, cat_nulls: pd.Series, categorical_strategy: str):
+        """Remplit les colonnes catégorielles incomplètes (valeur fixe ou mode)."""
+        cat_nulls = cat_nulls[cat_nulls > 0]
+        if cat_nulls.empty:
+            return
+
+        cols = cat_nulls.index
+        if categorical_strategy == 'mode':
+            # Un seul mode() pour toutes les colonnes (première ligne : valeur la plus fréquente)
+            modes = self.df[cols].mode(dropna=True)
+            # Colonnes entièrement vides : pas de mode, laissées telles quelles
+            fill_values = modes.iloc[0].dropna() if len(modes) else pd.Series(dtype=object)
+            cols = fill_values.index
+            cat_nulls = cat_nulls[cols]
+            if cols.empty:
+                return
+        else:
+            # La valeur de remplacement doit faire partie des catégories
+            self.df = self.df.assign(**{
+                col: self.df[col].cat.add_categories([categorical_strategy])
+                for col in cols
+                if categorical_strategy not in self.df[col].cat.categories
+            })
+            fill_values = pd.Series(categorical_strategy, index=cols)
+
+        self.df[cols] = self.df[cols].fillna(fill_values)
+        self.transformations_applied.extend(
+            f"{col}: {null_count} nulls → '{fill_values[col]}'"
+            for col, null_count in cat_nulls.items()
+        )
+
+    def _fill_text(self, text_nulls: pd.Series, text_strategy: str):
+        """Remplit les colonnes texte incomplètes (nombre de nulls par colonne donné)."""
+        text_nulls = text_nulls[text_nulls > 0]
+        if not text_nulls.empty:
+            cols = text_nulls.index
+            self.df[cols] = self.df[cols].fillna(text_strategy)
+            self.transformations_applied.extend(
+                f"{col}: {null_count} nulls → '{text_strategy}'"
+                for col, null_count in text_nulls.items()
+            )
+
     def normalize_text_columns(
         self,
         columns: Optional[list[str]] = None
@@ -111,19 +283,19 @@ class DataTransformer:
             self (pour chaînage)
         """
         if columns is None:
-            columns = self.df.select_dtypes(include=['object']).columns.tolist()
-
-        for col in columns:
-            if col in self.df.columns:
-                self.df[col] = (
-                    self.df[col]
-                    .astype(str)
-                    .str.strip()
-                    .str.normalize('NFKD')  # Normalise les caractères spéciaux
-                    .str.encode('ascii', errors='ignore')
-                    .str.decode('ascii')
-                    .str.lower()
-                )
+            columns = self.df.select_dtypes(include=['object', 'string']).columns.tolist()
+
+        present = [col for col in columns if col in self.df.columns]
+        if present:
+            arrays = [pa.array(self.df[col].astype("string"), type=pa.string()) for col in present]
+            # Les kernels Arrow libèrent le GIL : une colonne par thread
+            with ThreadPoolExecutor(max_workers=min(len(present), os.cpu_count() or 1)) as pool:
+                normalized = pool.map(_normalize_text, arrays)
+                # Un seul assign() pour toutes les colonnes
+                self.df = self.df.assign(**{
+                    col: pd.arrays.ArrowExtensionArray(arr)
+                    for col, arr in zip(present, normalized)
+                })
 
         self.transformations_applied.append(f"Normalisation texte: {len(columns)} colonnes")
         return self
@@ -148,18 +320,20 @@ class DataTransformer:
 
         initial_count = self.df[address_col].notna().sum()
 
-        # Nettoyage basique
-        self.df[address_col] = (
-            self.df[address_col]
-            .astype(str)
-            .str.strip()
-            .str.replace(r'\s+', ' ', regex=True)  # Espaces multiples
-            .str.replace(r'[^\w\s,.-]', '', regex=True)  # Caractères spéciaux
+        # Nettoyage basique en kernels Arrow (regex RE2, sans retour arrière)
+        arr = pa.array(self.df[address_col].astype("string"), type=pa.string())
+        arr = pc.replace_substring_regex(arr, ADDRESS_INVALID_CHARS, "")  # Caractères spéciaux
+        # Espaces en bord retirés, espaces multiples réduits à un seul : découpage et
+        # jointure UTF-8 (plus rapide qu'une seconde regex)
+        arr = pc.binary_join(pc.utf8_split_whitespace(pc.utf8_trim_whitespace(arr)), " ")
+
+        # Filtrer les adresses trop courtes (null), dans la même expression
+        arr = pc.if_else(
+            pc.greater_equal(pc.utf8_length(arr), min_length),
+            arr,
+            pa.scalar(None, type=pa.string())
         )
-
-        # Filtrer les adresses trop courtes
-        mask = self.df[address_col].str.len() >= min_length
-        self.df.loc[~mask, address_col] = None
+        self.df[address_col] = pd.arrays.ArrowExtensionArray(arr)
 
         cleaned_count = self.df[address_col].notna().sum()
         removed = initial_count - cleaned_count
@@ -178,7 +352,7 @@ class DataTransformer:
         threshold: float = 1.5
     ) -> 'DataTransformer':
         """
-        Filtre les outliers.
+        Filtre les outliers (seuils calculés une fois par colonne, valeurs manquantes conservées).
         
         Args:
             columns: Colonnes à vérifier
@@ -190,30 +364,14 @@ class DataTransformer:
         """
         initial = len(self.df)
 
-        for col in columns:
-            if col not in self.df.columns:
-                continue
-
-            if method == 'iqr' and self.df[col].notna().sum() > 0:
-                Q1 = self.df[col].quantile(0.25)
-                Q3 = self.df[col].quantile(0.75)
-                IQR = Q3 - Q1
+        columns = [col for col in columns if col in self.df.columns]
+        # Une matrice float64 (nulls -> NaN)
+        vals = self.df[columns].to_numpy(dtype=np.float64, na_value=np.nan)
 
-                if IQR > 0:  # Évite division par zéro
-                    lower = Q1 - threshold * IQR
-                    upper = Q3 + threshold * IQR
-                    self.df = self.df[
-                        (self.df[col] >= lower) & (self.df[col] <= upper)
-                    ]
-
-            elif method == 'zscore' and self.df[col].notna().sum() > 0:
-                mean = self.df[col].mean()
-                std = self.df[col].std()
-
-                if std > 0:  # Évite division par zéro
-                    self.df = self.df[
-                        np.abs((self.df[col] - mean) / std) < threshold
-                    ]
+        # Un seul masque pour toutes les colonnes : une seule copie du DataFrame
+        keep = _outlier_keep(vals, method, threshold)
+        if keep is not None:
+            self.df = self.df.loc[keep]
 
         removed = initial - len(self.df)
         if removed > 0:
@@ -223,28 +381,126 @@ class DataTransformer:
 
         return self
     
+    def clean_default(
+        self,
+        outlier_columns: Optional[list[str]] = None,
+        numeric_strategy: str = 'median',
+        text_strategy: str = 'inconnu',
+        categorical_strategy: str = 'unknown',
+        text_columns: Optional[list[str]] = None,
+        address_col: str = 'stores',
+        min_address_length: int = 5,
+        threshold: float = 1.5
+    ) -> 'DataTransformer':
+        """
+        Nettoyage standard en un appel.
+        
+        Même résultat que remove_duplicates → handle_missing_values →
+        clean_address_column → normalize_text_columns → filter_outliers (IQR)
+        → add_derived_columns, mais les colonnes numériques ne sont lues
+        qu'une fois : valeurs de remplissage et seuils IQR sont calculés sur
+        la même matrice NumPy.
+        
+        Args:
+            outlier_columns: Colonnes numériques à filtrer (IQR)
+            numeric_strategy: 'median', 'mean', 'zero', or None
+            text_strategy: valeur de remplacement pour texte
+            categorical_strategy: valeur de remplacement pour catégories, ou 'mode'
+            text_columns: Colonnes texte à normaliser (défaut : toutes)
+            address_col: Colonne contenant les adresses
+            min_address_length: Longueur minimale pour une adresse valide
+            threshold: Seuil IQR
+        
+        Returns:
+            self (pour chaînage)
+        """
+        self.remove_duplicates()
+
+        num_cols = self.df.select_dtypes(include=[np.number]).columns
+        text_cols = self.df.select_dtypes(include=['object', 'string']).columns
+
+        # Une seule matrice float64 (nulls -> NaN) pour le remplissage et les outliers
+        vals = self.df[num_cols].to_numpy(dtype=np.float64, na_value=np.nan)
+        missing = np.isnan(vals)
+        null_counts = missing.sum(axis=0)
+        # Colonnes incomplètes, entièrement vides comprises (comme handle_missing_values :
+        # 'zero' les remplit, médiane et moyenne y restent NaN)
+        dirty = null_counts > 0
+
+        if dirty.any():
+            match numeric_strategy:
+                case 'median':
+                    fill = np.nanmedian(vals[:, dirty], axis=0)
+                case 'mean':
+                    fill = np.nanmean(vals[:, dirty], axis=0)
+                case 'zero':
+                    fill = np.zeros(dirty.sum())
+                case _:
+                    fill = None
+
+            if fill is not None:
+                cols = num_cols[dirty]
+                self._fill_numeric(pd.Series(fill, index=cols))
+                self.transformations_applied.extend(
+                    f"{col}: {null_count} nulls → {value:.2f}"
+                    for col, null_count, value in zip(cols, null_counts[dirty], fill)
+                )
+                # La matrice reçoit les mêmes valeurs que le DataFrame (nouveau tableau :
+                # avec copy-on-write, to_numpy() peut renvoyer une vue en lecture seule)
+                row_fill = np.full(len(num_cols), np.nan)
+                row_fill[dirty] = fill
+                vals = np.where(missing & dirty, row_fill, vals)
+
+        self._fill_text(self.df[text_cols].isna().sum(), text_strategy)
+        cat_cols = self.df.select_dtypes(include=['category']).columns
+        self._fill_categorical(self.df[cat_cols].isna().sum(), categorical_strategy)
+
+        # Ni l'un ni l'autre ne retire de lignes : la matrice reste alignée
+        self.clean_address_column(address_col, min_length=min_address_length)
+        self.normalize_text_columns(text_columns)
+
+        if outlier_columns:
+            initial = len(self.df)
+            positions = num_cols.get_indexer([col for col in outlier_columns if col in num_cols])
+            keep = _outlier_keep(vals[:, positions], 'iqr', threshold)
+            if keep is not None:
+                self.df = self.df.loc[keep]
+
+            removed = initial - len(self.df)
+            if removed > 0:
+                self.transformations_applied.append(f"Outliers filtrés (iqr): {removed}")
+
+        return self.add_derived_columns()
+
     def add_derived_columns(self) -> 'DataTransformer':
         """
         Ajoute des colonnes dérivées.
         
+        Les colonnes sont préparées dans un dictionnaire puis ajoutées par un
+        seul assign() : le DataFrame n'est reconstruit qu'une fois.
+        
         Returns:
             self (pour chaînage)
         """
+        new_cols = {}
+
         # Catégorie de sucres - VÉRIFIER LE TYPE D'ABORD
         if 'sugars_100g' in self.df.columns:
             try:
+                sugars = self.df['sugars_100g']
                 # Convertir en numérique si nécessaire
-                if not pd.api.types.is_numeric_dtype(self.df['sugars_100g']):
-                    self.df['sugars_100g'] = pd.to_numeric(self.df['sugars_100g'], errors='coerce')
+                if not pd.api.types.is_numeric_dtype(sugars):
+                    sugars = new_cols['sugars_100g'] = pd.to_numeric(sugars, errors='coerce')
                 
                 # Créer les catégories uniquement si nous avons des données numériques
-                if pd.api.types.is_numeric_dtype(self.df['sugars_100g']):
-                    bins = [-float('inf'), 5, 15, 30, float('inf')]
-                    labels = ['faible', 'modéré', 'élevé', 'très_élevé']
-                    self.df['sugar_category'] = pd.cut(
-                        self.df['sugars_100g'],
-                        bins=bins,
-                        labels=labels
+                if pd.api.types.is_numeric_dtype(sugars):
+                    # Intervalles (a, b] comme pd.cut : recherche dichotomique sur les bornes
+                    # intérieures, directement en codes de catégorie (NaN et -inf hors intervalles)
+                    vals = sugars.to_numpy(dtype=np.float64, na_value=np.nan)
+                    codes = np.searchsorted(SUGAR_EDGES, vals, side='left')
+                    codes[~(vals > SUGAR_BINS[0])] = -1
+                    new_cols['sugar_category'] = pd.Categorical.from_codes(
+                        codes, categories=SUGAR_LABELS, ordered=True
                     )
                     self.transformations_applied.append("Ajout: sugar_category")
                     
@@ -256,23 +512,23 @@ class DataTransformer:
         # Catégorie nutritionnelle simplifiée
         if 'nutriscore_grade' in self.df.columns:
             try:
-                # Nettoyer les valeurs
-                self.df['nutriscore_grade'] = (
-                    self.df['nutriscore_grade']
-                    .astype(str)
-                    .str.lower()
-                    .str.strip()
-                )
+                # Catégorielle : le nettoyage ne porte que sur les quelques valeurs distinctes
+                grades = self.df['nutriscore_grade'].astype('category')
+                codes = grades.cat.codes.to_numpy()
+                cleaned = grades.cat.categories.astype(str).str.lower().str.strip()
                 
-                mapping = {
-                    'a': 'excellent',
-                    'b': 'bon',
-                    'c': 'moyen',
-                    'd': 'mauvais',
-                    'e': 'très_mauvais'
-                }
+                # Valeurs nettoyées distinctes ('A' et ' a' fusionnent), puis réindexation des codes
+                # (le -1 ajouté en fin de table garde les nulls à -1)
+                categories = cleaned.unique()
+                grade_codes = np.append(categories.get_indexer(cleaned), -1)[codes]
+                new_cols['nutriscore_grade'] = pd.Categorical.from_codes(grade_codes, categories=categories)
                 
-                self.df['nutriscore_simple'] = self.df['nutriscore_grade'].map(mapping)
+                # Libellés : correspondance calculée sur les catégories, appliquée par indexation NumPy
+                label_codes = pd.Index(NUTRISCORE_GRADES).get_indexer(categories)
+                new_cols['nutriscore_simple'] = pd.Categorical.from_codes(
+                    np.append(label_codes, -1)[grade_codes],
+                    categories=NUTRISCORE_LABELS
+                )
                 self.transformations_applied.append("Ajout: nutriscore_simple")
                 
             except Exception as e:
@@ -282,14 +538,13 @@ class DataTransformer:
         # Flag géocodé
         if 'geocoding_score' in self.df.columns:
             try:
+                scores = self.df['geocoding_score']
                 # Convertir en numérique si nécessaire
-                if not pd.api.types.is_numeric_dtype(self.df['geocoding_score']):
-                    self.df['geocoding_score'] = pd.to_numeric(
-                        self.df['geocoding_score'], 
-                        errors='coerce'
-                    )
+                if not pd.api.types.is_numeric_dtype(scores):
+                    scores = new_cols['geocoding_score'] = pd.to_numeric(scores, errors='coerce')
                 
-                self.df['is_geocoded'] = self.df['geocoding_score'] >= 0.5
+                # Tableau np.bool_ (1 octet/ligne) quel que soit le type de la colonne ; nulls -> False
+                new_cols['is_geocoded'] = scores.to_numpy(dtype=np.float64, na_value=np.nan) >= 0.5
                 self.transformations_applied.append("Ajout: is_geocoded")
                 
             except Exception as e:
@@ -299,16 +554,20 @@ class DataTransformer:
         # Adresse valide (basique)
         if 'stores' in self.df.columns:
             try:
-                self.df['has_valid_store'] = (
-                    self.df['stores'].notna() &
-                    (self.df['stores'].astype(str).str.len() >= 10)
-                )
+                stores = self.df['stores']
+                store_len = stores.astype('string').str.len()
+                new_cols['has_valid_store'] = (
+                    stores.notna() & (store_len >= 10)
+                ).fillna(False).astype(bool)
                 self.transformations_applied.append("Ajout: has_valid_store")
                 
             except Exception as e:
                 if self.verbose:
                     print(f"⚠️ Impossible d'ajouter has_valid_store: {e}")
         
+        if new_cols:
+            self.df = self.df.assign(**new_cols)
+
         return self
     # def add_derived_columns(self) -> 'DataTransformer':
     #     """
@@ -354,6 +613,61 @@ class DataTransformer:
 
     #     return self
 
+    def downcast_floats(self, exclude: tuple = FLOAT64_COLUMNS) -> 'DataTransformer':
+        """
+        Convertit les colonnes float64 en float32.
+        
+        Les valeurs nutritionnelles n'ont qu'une ou deux décimales : float32
+        divise par deux la taille des colonnes en mémoire et sur disque.
+        
+        Args:
+            exclude: Colonnes à garder en float64
+        
+        Returns:
+            self (pour chaînage)
+        """
+        float_cols = [
+            col for col in self.df.select_dtypes(include=['float64']).columns
+            if col not in exclude
+        ]
+
+        if float_cols:
+            self.df = self.df.astype(dict.fromkeys(float_cols, 'float32'))
+            self.transformations_applied.append(f"Float32: {len(float_cols)} colonnes")
+
+        return self
+
+    def compact_dtypes(self, max_ratio: float = 0.5) -> 'DataTransformer':
+        """
+        Convertit en 'category' les colonnes texte à faible cardinalité.
+        
+        Des codes entiers et un dictionnaire des valeurs distinctes remplacent
+        une chaîne par ligne : moins de mémoire, et les opérations texte ou
+        groupby ne portent plus que sur les valeurs distinctes.
+        
+        Args:
+            max_ratio: Ratio valeurs distinctes / lignes en dessous duquel convertir
+        
+        Returns:
+            self (pour chaînage)
+        """
+        if self.df.empty:
+            return self
+
+        text_cols = [
+            col for col, dtype in self.df.dtypes.items()
+            if pd.api.types.is_string_dtype(dtype) and not isinstance(dtype, pd.CategoricalDtype)
+        ]
+        # Un seul nunique() pour toutes les colonnes texte
+        ratios = self.df[text_cols].nunique() / len(self.df)
+        cat_cols = ratios.index[ratios < max_ratio].tolist()
+
+        if cat_cols:
+            self.df = self.df.astype(dict.fromkeys(cat_cols, 'category'))
+            self.transformations_applied.append(f"Catégorielles: {len(cat_cols)} colonnes")
+
+        return self
+
     def get_ai_transformation_suggestions(self) -> str:
         """
         Demande à l'IA des transformations supplémentaires.
@@ -373,32 +687,48 @@ class DataTransformer:
         {self.df.head(3).to_string()}
         """
 
-        try:
-            response = completion(
-                model= "ollama/mistral",#"gemini/gemini-2.0-flash-exp",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "Tu es un expert en data engineering. "
-                            "Génère du code Python pandas exécutable pour "
-                            "améliorer un dataset. Sois concret et précis."
-                        )
-                    },
-                    {
-                        "role": "user",
-                        "content": (
-                            f"{context}\n\n"
-                            "Quelles transformations pandas supplémentaires "
-                            "recommandes-tu pour ce dataset ? "
-                            "Génère uniquement du code Python exécutable, "
-                            "sans explications."
-                        )
-                    }
-                ]
-            )
+        payload = {
+            "model": "ollama/mistral",#"gemini/gemini-2.0-flash-exp",
+            "messages": [
+                {
+                    "role": "system",
+                    "content": (
+                        "Tu es un expert en data engineering. "
+                        "Génère du code Python pandas exécutable pour "
+                        "améliorer un dataset. Sois concret et précis."
+                    )
+                },
+                {
+                    "role": "user",
+                    "content": (
+                        f"{context}\n\n"
+                        "Quelles transformations pandas supplémentaires "
+                        "recommandes-tu pour ce dataset ? "
+                        "Génère uniquement du code Python exécutable, "
+                        "sans explications."
+                    )
+                }
+            ],
+            # Réponse déterministe : un même schéma peut être servi depuis le cache
+            "temperature": 0,
+        }
 
-            return response.choices[0].message.content
+        try:
+            # Même cache disque que les recommandations qualité : pas d'appel si le prompt est connu
+            cache = LLMCache(LLM_CACHE_PATH)
+            key = LLMCache.cache_key(payload)
+            try:
+                cached = cache.get(key)
+                if cached is not None:
+                    return cached
+
+                response = completion(**payload)
+                suggestions = response.choices[0].message.content
+                if suggestions:
+                    cache.set(key, suggestions)
+                return suggestions
+            finally:
+                cache.close()
 
         except Exception as e:
             return f"# Erreur lors de la requête IA: {e}"
@@ -429,7 +759,9 @@ class DataTransformer:
         Returns:
             DataFrame nettoyé
         """
-        return self.df.copy()
+        # Objet distinct mais données partagées (O(1)) : copy-on-write ne copie
+        # une colonne qu'au moment où l'appelant la modifie (copie profonde avant pandas 3)
+        return self.df.copy(deep=not COPY_ON_WRITE)
 
     def get_summary(self) -> str:
         """
@@ -1,35 +1,16 @@
 #!/usr/bin/env python3
 """Test du module de qualité."""
-import pandas as pd
+import itertools
 import numpy as np
 from pipeline.quality import QualityAnalyzer
+from tests.synthetic import build_synthetic_products
 
-# Créer un dataset de test réaliste
-np.random.seed(42)
-n_rows = 100
-
-test_data = {
-    'code': [f'PROD_{i:04d}' for i in range(n_rows)] + ['PROD_0000'],  # Un doublon
-    'product_name': [f'Product {i}' if i % 10 != 0 else None for i in range(n_rows + 1)],
-    'brands': ['Brand A' if i % 3 == 0 else 'Brand B' if i % 3 == 1 else 'Brand C' for i in range(n_rows + 1)],
-    'categories': ['chocolats' if i % 2 == 0 else 'biscuits' for i in range(n_rows + 1)],
-    'nutriscore_grade': np.random.choice(['A', 'B', 'C', 'D', 'E', None], n_rows + 1, p=[0.2, 0.2, 0.2, 0.15, 0.15, 0.1]),
-    'energy_100g': np.random.normal(500, 100, n_rows + 1),
-    'sugars_100g': np.random.normal(30, 15, n_rows + 1),
-    'stores': [f'Store {i}' if i % 5 != 0 else None for i in range(n_rows + 1)],
-    'geocoding_score': np.random.uniform(0, 1, n_rows + 1),
-}
-
-# Ajouter quelques outliers
-test_data['energy_100g'][10] = 2000  # Outlier
-test_data['sugars_100g'][20] = -5    # Valeur négative
-
-# Créer le DataFrame
-df = pd.DataFrame(test_data)
+# Dataset de test réaliste (outliers et une ligne dupliquée), partagé avec les tests
+df = build_synthetic_products(100)
 print("📊 Dataset de test créé:")
 print(f"   - Lignes: {len(df)}")
 print(f"   - Colonnes: {len(df.columns)}")
-print(f"   - Valeurs nulles: {df.isnull().sum().sum()}")
+print(f"   - Valeurs nulles: {np.count_nonzero(df.isna().to_numpy())}")
 
 # Analyser la qualité
 print("\n🔍 Analyse de qualité...")
@@ -56,6 +37,5 @@ print(f"\n✅ Rapport généré: {report_path}")
 # Afficher un extrait du rapport
 print("\n📋 Extrait du rapport:")
 with open(report_path, 'r', encoding='utf-8') as f:
-    lines = f.readlines()[:20]
-    for line in lines:
+    for line in itertools.islice(f, 20):
         print(line.rstrip())
\ No newline at end of file
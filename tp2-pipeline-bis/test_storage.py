@@ -2,6 +2,7 @@
 """Test du module de stockage."""
 import pandas as pd
 import numpy as np
+import pyarrow as pa
 from pipeline.storage import (
     save_raw_json,
     save_parquet,
@@ -23,20 +24,24 @@ json_path = save_raw_json(test_data, "test_data")
 print(f"   ✅ Sauvegardé: {json_path}")
 
 # 2. Créer un DataFrame
+rng = np.random.default_rng(42)
+ids = np.arange(20).astype(str)
 df = pd.DataFrame({
-    "code": [f"P{i:03d}" for i in range(20)],
-    "name": [f"Product {i}" for i in range(20)],
-    "category": ["chocolats" if i % 2 == 0 else "biscuits" for i in range(20)],
-    "price": np.random.uniform(1, 100, 20),
-    "quantity": np.random.randint(1, 100, 20),
+    "code": np.char.add("P", np.char.zfill(ids, 3)),
+    "name": np.char.add("Product ", ids),
+    "category": np.where(np.arange(20) % 2 == 0, "chocolats", "biscuits"),
+    "price": rng.uniform(1, 100, 20),
+    "quantity": rng.integers(1, 100, 20),
 })
 
 print("\n2. Test sauvegarde Parquet simple")
-parquet_path = save_parquet(df, "test_products")
+# Conversion Arrow faite une fois, partagée par les deux écritures
+table = pa.Table.from_pandas(df, preserve_index=False)
+parquet_path = save_parquet(table, "test_products")
 print(f"   ✅ Sauvegardé: {parquet_path}")
 
 print("\n3. Test sauvegarde Parquet partitionné")
-parquet_partitioned = save_parquet(df, "test_partitioned", partition_by="category")
+parquet_partitioned = save_parquet(table, "test_partitioned", partition_by="category")
 print(f"   ✅ Sauvegardé dossier: {parquet_partitioned}")
 
 print("\n4. Test chargement Parquet")
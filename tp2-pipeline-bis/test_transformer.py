@@ -23,32 +23,27 @@ df = pd.DataFrame(test_data)
 print("📊 Dataset initial:")
 print(df)
 print(f"\nShape: {df.shape}")
-print(f"Valeurs nulles totales: {df.isnull().sum().sum()}")
+print(f"Valeurs nulles totales: {np.count_nonzero(df.isna().to_numpy())}")
 
 # Appliquer les transformations
 print("\n🔧 Application des transformations...")
 transformer = DataTransformer(df)
-df_clean = (
-    transformer
-    .remove_duplicates(['code'])
-    .handle_missing_values(
-        numeric_strategy='median',
-        text_strategy='inconnu',
-        categorical_strategy='inconnu'
-    )
-    .clean_address_column('stores', min_length=5)
-    .normalize_text_columns(['product_name', 'brands', 'stores'])
-    .filter_outliers(['sugars_100g'], method='iqr', threshold=1.5)
-    .add_derived_columns()
-    .get_result()
-)
+# Nettoyage standard fusionné (doublons, nulls, adresses, texte, outliers, dérivées)
+df_clean = transformer.clean_default(
+    ['sugars_100g'],
+    numeric_strategy='median',
+    text_strategy='inconnu',
+    text_columns=['product_name', 'brands', 'stores'],
+    min_address_length=5,
+    threshold=1.5
+).get_result()
 
 print("\n" + transformer.get_summary())
 
 print("\n✅ Dataset nettoyé:")
 print(df_clean)
 print(f"\nShape finale: {df_clean.shape}")
-print(f"Valeurs nulles totales: {df_clean.isnull().sum().sum()}")
+print(f"Valeurs nulles totales: {np.count_nonzero(df_clean.isna().to_numpy())}")
 
 # Tester les suggestions IA (optionnel)
 print("\n🤖 Suggestions IA (preview):")
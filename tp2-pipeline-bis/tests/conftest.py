@@ -0,0 +1,10 @@
+"""Fixtures partagées entre les modules de test."""
+import pytest
+
+from tests.synthetic import build_synthetic_products
+
+
+@pytest.fixture(scope="session")
+def synthetic_products_df():
+    """Dataset produits synthétique, construit une seule fois par session."""
+    return build_synthetic_products()
@@ -0,0 +1,58 @@
+"""Dataset produits synthétique partagé par les tests et les scripts de test."""
+import numpy as np
+import pandas as pd
+
+# Jeux de données déjà construits, par (n_rows, duplicate, outliers)
+_CACHE: dict[tuple[int, bool, bool], pd.DataFrame] = {}
+
+
+def build_synthetic_products(n_rows: int = 100, duplicate: bool = True, outliers: bool = True) -> pd.DataFrame:
+    """
+    Construit le dataset produits synthétique (graine 42) des scripts de test.
+
+    Le résultat est mis en cache au niveau du module : les appels suivants
+    renvoient le même DataFrame sans refaire de tirages aléatoires.
+
+    Args:
+        n_rows: Nombre de produits distincts
+        duplicate: Ajouter une copie de la première ligne (doublon)
+        outliers: Poser une énergie aberrante (ligne 10) et un sucre négatif (ligne 20)
+    """
+    key = (n_rows, duplicate, outliers)
+    if key in _CACHE:
+        return _CACHE[key]
+
+    rng = np.random.default_rng(42)
+    idx = np.arange(n_rows)
+    ids = idx.astype(str)
+
+    # Colonnes construites par NumPy (boucles en C, pas de compréhensions Python)
+    product_name = np.char.add('Product ', ids).astype(object)
+    product_name[idx % 10 == 0] = None
+    stores = np.char.add('Store ', ids).astype(object)
+    stores[idx % 5 == 0] = None
+    normals = rng.standard_normal((n_rows, 2))  # Énergie et sucres en un seul tirage
+    energy = normals[:, 0] * 100 + 500
+    sugars = normals[:, 1] * 15 + 30
+
+    # Quelques valeurs aberrantes, posées sur les tableaux avant construction
+    if outliers:
+        energy[10] = 2000
+        sugars[20] = -5
+
+    df = pd.DataFrame({
+        'code': np.char.add('PROD_', np.char.zfill(ids, 4)),
+        'product_name': product_name,
+        'brands': np.array(['Brand A', 'Brand B', 'Brand C'])[idx % 3],
+        'categories': np.where(idx % 2 == 0, 'chocolats', 'biscuits'),
+        'nutriscore_grade': rng.choice(['A', 'B', 'C', 'D', 'E', None], n_rows, p=[0.2, 0.2, 0.2, 0.15, 0.15, 0.1]),
+        'energy_100g': energy,
+        'sugars_100g': sugars,
+        'stores': stores,
+        'geocoding_score': rng.random(n_rows),
+    })
+    if duplicate:
+        df = pd.concat([df, df.iloc[[0]]], ignore_index=True)
+
+    _CACHE[key] = df
+    return df
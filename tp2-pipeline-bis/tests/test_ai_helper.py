@@ -0,0 +1,214 @@
+"""Tests pour le helper IA."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from pipeline.ai_helper import AIHelper, LLMCache, _get_llm_loop, _get_router
+
+
+def run_on_llm_loop(coro):
+    """Exécute une coroutine sur la boucle dédiée aux appels LLM, comme get_recommendations."""
+    return asyncio.run_coroutine_threadsafe(coro, _get_llm_loop()).result()
+
+
+class TestLLMCache:
+    """Tests pour LLMCache."""
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        """Cache SQLite temporaire."""
+        cache = LLMCache(tmp_path / "llm_cache.sqlite")
+        yield cache
+        cache.close()
+
+    def test_cache_key_is_stable(self):
+        """Test que la clé ne dépend pas de l'ordre des paramètres."""
+        key1 = LLMCache.cache_key({"model": "groq", "context": "abc"})
+        key2 = LLMCache.cache_key({"context": "abc", "model": "groq"})
+
+        assert key1 == key2
+        assert key1 != LLMCache.cache_key({"model": "groq", "context": "abd"})
+
+    def test_get_set(self, cache):
+        """Test l'écriture puis la relecture d'une réponse."""
+        assert cache.get("key") is None
+
+        cache.set("key", "réponse")
+        assert cache.get("key") == "réponse"
+
+    def test_expired_entry(self, cache):
+        """Test qu'une entrée expirée n'est pas retournée."""
+        cache.set("key", "réponse")
+        cache.ttl_seconds = -1
+
+        assert cache.get("key") is None
+
+
+class TestAIHelper:
+    """Tests pour AIHelper."""
+
+    @pytest.fixture
+    def helper(self, tmp_path):
+        """AIHelper avec un fournisseur factice et un cache temporaire."""
+        providers = {
+            'groq': {'name': 'Groq', 'model': 'groq/test', 'api_key': 'x', 'type': 'cloud'},
+            'gemini': {'name': 'Gemini', 'model': 'gemini/test', 'api_key': 'y', 'type': 'cloud'},
+        }
+        with patch.object(AIHelper, '_detect_available_providers', return_value=providers), \
+                patch('pipeline.ai_helper.LLM_CACHE_PATH', tmp_path / "llm_cache.sqlite"):
+            helper = AIHelper(verbose=False)
+        yield helper
+        helper.close()
+
+    def test_available(self, helper):
+        """Test la disponibilité selon les fournisseurs détectés."""
+        assert helper.available
+        
+        helper.available_providers = {}
+        assert not helper.available
+        assert helper.get_recommendations("contexte") is None
+
+    def test_get_recommendations_uses_cache(self, helper):
+        """Test qu'un contexte identique ne rappelle pas le fournisseur."""
+        with patch.object(AIHelper, '_call_provider_async', new=AsyncMock(return_value="- conseil")) as mock_call:
+            first = helper.get_recommendations("contexte")
+            calls = mock_call.call_count
+            second = helper.get_recommendations("contexte")
+
+        assert first == second == "- conseil"
+        assert mock_call.call_count == calls
+
+    def test_fastest_provider_wins(self, helper):
+        """Test que la réponse la plus rapide l'emporte et que l'autre est annulée."""
+        cancelled = []
+
+        async def fake_call(router, provider_id, config, context, max_tokens):
+            if provider_id == 'groq':
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.append(provider_id)
+                    raise
+            return f"réponse {provider_id}"
+
+        with patch.object(AIHelper, '_call_provider_async', side_effect=fake_call):
+            result = helper.get_recommendations("contexte")
+
+        assert result == "réponse gemini"
+        assert cancelled == ['groq']
+
+    def test_get_recommendations_inside_running_loop(self, helper):
+        """Test l'appel synchrone depuis une boucle déjà active (Jupyter, appelants async)."""
+        async def caller():
+            return helper.get_recommendations("contexte")
+
+        with patch.object(AIHelper, '_call_provider_async', new=AsyncMock(return_value="- conseil")) as mock_call:
+            first = asyncio.run(caller())
+            second = helper.get_recommendations("autre contexte")
+
+        assert first == second == "- conseil"
+        assert mock_call.await_count >= 2
+
+    def test_race_timeout_is_global(self, helper):
+        """Test que le délai de course ne repart pas à zéro après l'échec d'un fournisseur."""
+        cancelled = []
+
+        async def fake_call(router, provider_id, config, context, max_tokens):
+            if provider_id == 'groq':
+                await asyncio.sleep(0.15)
+                raise Exception("API Error")
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(provider_id)
+                raise
+
+        real_wait = asyncio.wait
+        with patch('pipeline.ai_helper.RACE_TIMEOUT_SECONDS', 0.5), \
+                patch.object(AIHelper, '_call_provider_async', side_effect=fake_call), \
+                patch('pipeline.ai_helper.asyncio.wait', side_effect=real_wait) as mock_wait:
+            result = helper.get_recommendations("contexte")
+
+        assert result is None
+        assert cancelled == ['gemini']
+        # Deuxième attente : seulement le temps restant avant l'échéance (horloge de la boucle)
+        first, second = (call.kwargs['timeout'] for call in mock_wait.call_args_list)
+        assert first <= 0.5
+        assert second <= 0.5 - 0.1
+
+    def test_all_providers_fail(self, helper):
+        """Test le retour None quand tous les fournisseurs échouent."""
+        with patch.object(AIHelper, '_call_provider_async', new=AsyncMock(side_effect=Exception("API Error"))):
+            assert helper.get_recommendations("contexte") is None
+
+    def test_router_fallbacks(self):
+        """Test que le Router bascule sur les fournisseurs hors course."""
+        providers = [
+            ('groq', {'model': 'groq/test', 'api_key': 'x', 'type': 'cloud'}),
+            ('gemini', {'model': 'gemini/test', 'api_key': 'y', 'type': 'cloud'}),
+            ('openai', {'model': 'openai/gpt-test', 'api_key': 'z', 'type': 'cloud'}),
+        ]
+
+        router = _get_router(providers)
+
+        assert router.fallbacks == [{'groq': ['openai']}]
+        assert _get_router(providers) is router
+
+    def test_streaming_chunks_are_joined(self, helper):
+        """Test l'accumulation des morceaux d'une réponse en streaming."""
+        def chunk(text):
+            return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+        async def stream():
+            for text in ["- conseil", None, " 1", "\n"]:
+                yield chunk(text)
+
+        router = SimpleNamespace(acompletion=AsyncMock(return_value=stream()))
+        config = {'name': 'Groq', 'model': 'groq/test'}
+
+        result = run_on_llm_loop(helper._call_provider_async(router, 'groq', config, "contexte", 100))
+
+        assert result == "- conseil 1"
+        assert router.acompletion.call_args.kwargs['stream'] is True
+
+    def test_inflight_limit(self, helper):
+        """Test que le nombre d'appels simultanés est borné par LLM_INFLIGHT_LIMIT."""
+        active = []
+        peak = []
+
+        async def acompletion(**params):
+            active.append(1)
+            peak.append(len(active))
+            await asyncio.sleep(0.01)
+            active.pop()
+
+            async def stream():
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content="ok"))])
+            return stream()
+
+        router = SimpleNamespace(acompletion=acompletion)
+        config = {'name': 'Groq', 'model': 'groq/test'}
+
+        async def run_all():
+            return await asyncio.gather(*(
+                helper._call_provider_async(router, 'groq', config, "contexte", 100)
+                for _ in range(6)
+            ))
+
+        # Sémaphore recréé avec la limite du test (restauré ensuite)
+        with patch('pipeline.ai_helper.LLM_INFLIGHT_LIMIT', 2), \
+                patch('pipeline.ai_helper._llm_semaphore', None):
+            results = run_on_llm_loop(run_all())
+
+        assert results == ["ok"] * 6
+        assert max(peak) == 2
+
+    def test_providers_raced_in_detection_order(self, helper):
+        """Test que les fournisseurs sont mis en concurrence dans l'ordre de détection."""
+        with patch.object(AIHelper, '_race_providers', new=AsyncMock(return_value=None)) as mock_race:
+            helper.get_recommendations("contexte")
+
+        group = mock_race.call_args.args[1]
+        assert [provider_id for provider_id, _ in group] == ['groq', 'gemini']
@@ -1,13 +1,27 @@
 """Tests pour le module d'enrichissement."""
+import asyncio
+
+import pandas as pd
 import pytest
-from unittest.mock import Mock, patch
-from pipeline.enricher import DataEnricher
+from unittest.mock import AsyncMock, Mock, patch
+from pipeline.enricher import DataEnricher, GeocodingTable, PersistentGeocodingCache
 from pipeline.models import GeocodingResult
 
 
+def _geo(**fields) -> GeocodingResult:
+    """Résultat de géocodage de test, construit sans validation Pydantic."""
+    return GeocodingResult.model_construct(**fields)
+
+
 class TestDataEnricher:
     """Tests pour DataEnricher."""
     
+    @pytest.fixture(autouse=True)
+    def tmp_geocoding_cache(self, tmp_path):
+        """Cache disque de géocodage temporaire."""
+        with patch('pipeline.enricher.GEOCODING_CACHE_PATH', tmp_path / "geocoding_cache.sqlite"):
+            yield
+    
     @pytest.fixture
     def sample_products(self):
         """Produits de test."""
@@ -31,9 +45,7 @@ class TestDataEnricher:
         
         # Devrait extraire 3 adresses uniques (Carrefour Paris, Auchan, Leclerc Toulouse)
         assert len(addresses) == 3
-        assert "Carrefour Paris" in addresses
-        assert "Leclerc Toulouse" in addresses
-        assert "Auchan" in addresses
+        assert set(addresses) == {"Carrefour Paris", "Leclerc Toulouse", "Auchan"}
     
     def test_extract_addresses_empty(self):
         """Test extraction avec produits sans adresses."""
@@ -43,19 +55,26 @@ class TestDataEnricher:
         
         assert addresses == []
     
+    def test_extract_addresses_trims_and_filters(self):
+        """Test le nettoyage des segments (espaces, segments trop courts)."""
+        products = [{"stores": "  Lidl  ,abc, ,Super U Nantes,"}]
+        enricher = DataEnricher()
+        
+        assert enricher.extract_addresses(products) == ["Lidl", "Super U Nantes"]
+    
     def test_build_geocoding_cache(self):
         """Test construction du cache de géocodage."""
         enricher = DataEnricher()
         
         # Mock le fetcher pour éviter les appels API
-        mock_result = GeocodingResult(
+        mock_result = _geo(
             original_address="Paris",
             score=0.9,
             latitude=48.8566,
             longitude=2.3522
         )
         
-        with patch.object(enricher.geocoder, 'fetch_all') as mock_fetch:
+        with patch.object(enricher.geocoder, 'fetch_all_async', new=AsyncMock()) as mock_fetch:
             mock_fetch.return_value = [mock_result]
             
             addresses = ["Paris"]
@@ -65,13 +84,26 @@ class TestDataEnricher:
             assert "Paris" in cache
             assert cache["Paris"].score == 0.9
     
+    def test_build_geocoding_cache_inside_running_loop(self):
+        """Test l'appel synchrone depuis une boucle déjà active (Jupyter, appelants async)."""
+        enricher = DataEnricher()
+        result = _geo(original_address="Paris", score=0.9, latitude=48.8566, longitude=2.3522)
+        
+        async def caller():
+            return enricher.build_geocoding_cache(["Paris"], verbose=False)
+        
+        with patch.object(enricher.geocoder, 'fetch_all_async', new=AsyncMock(return_value=[result])):
+            cache = asyncio.run(caller())
+        
+        assert cache["Paris"].score == 0.9
+    
     def test_enrich_products(self, sample_products):
         """Test l'enrichissement des produits."""
         enricher = DataEnricher()
         
         # Créer un cache mock
         geo_cache = {
-            "Carrefour Paris": GeocodingResult(
+            "Carrefour Paris": _geo(
                 original_address="Carrefour Paris",
                 label="Carrefour Paris Store",
                 score=0.8,
@@ -80,7 +112,7 @@ class TestDataEnricher:
                 city="Paris",
                 postal_code="75015"
             ),
-            "Leclerc Toulouse": GeocodingResult(
+            "Leclerc Toulouse": _geo(
                 original_address="Leclerc Toulouse",
                 label="Leclerc Toulouse Store",
                 score=0.4,  # Score bas
@@ -114,4 +146,113 @@ class TestDataEnricher:
         assert isinstance(stats, dict)
         assert "total_processed" in stats
         assert "success_rate" in stats
-        assert "geocoder_stats" in stats
\ No newline at end of file
+        assert "geocoder_stats" in stats    
+    def test_enrich_products_stats_and_types(self):
+        """Test les statistiques et la conservation des types après la jointure."""
+        enricher = DataEnricher()
+        geo_cache = {
+            "Carrefour Paris": _geo(
+                original_address="Carrefour Paris", score=0.8, latitude=48.8, longitude=2.3
+            ),
+            "Leclerc": _geo(original_address="Leclerc", score=0.2),
+        }
+        products = [
+            {"code": "001", "stores": "Carrefour Paris, Auchan", "nutriscore_score": 3},
+            {"code": "002", "stores": "Leclerc"},
+            {"code": "003", "stores": "Inconnu"},
+            {"code": "004", "stores": None},
+        ]
+        
+        enriched = enricher.enrich_products(products, geo_cache)
+        
+        assert enriched[0]["latitude"] == 48.8
+        assert enriched[0]["nutriscore_score"] == 3
+        assert isinstance(enriched[0]["nutriscore_score"], int)
+        assert "nutriscore_score" not in enriched[1]
+        assert enriched[1]["latitude"] is None
+        # Produits sans résultat : renvoyés tels quels (copies)
+        assert enriched[2] == products[2] and enriched[2] is not products[2]
+        assert enriched[3] == products[3]
+        assert enricher.enrichment_stats["successfully_enriched"] == 1
+        assert enricher.enrichment_stats["failed_enrichment"] == 2
+    
+    def test_geocoding_table_lookup(self):
+        """Test la recherche vectorisée dans le cache en colonnes."""
+        table = GeocodingTable.from_cache({
+            "Paris": _geo(original_address="Paris", label="Paris", score=0.9, latitude=48.8, longitude=2.3),
+            "Nulle part": _geo(original_address="Nulle part", score=0.1),
+        })
+        
+        geo, positions = table.lookup(pd.Series(["Nulle part", "Lyon", "Paris"], dtype="string"))
+        
+        assert list(positions) == [1, -1, 0]
+        assert geo["latitude"].iloc[2] == 48.8
+        assert geo["latitude"].isna().iloc[:2].all()
+        assert list(table.is_valid) == [True, False]
+
+    def test_enrich_dataframe(self):
+        """Test l'enrichissement en colonnes sans modifier le DataFrame d'origine."""
+        df = pd.DataFrame({
+            "code": ["1", "2", "3"],
+            "stores": ["Paris, Lyon", None, "Inconnu"],
+        })
+        geo_cache = {
+            "Paris": _geo(original_address="Paris", label="Paris", score=0.9, latitude=48.8, longitude=2.3),
+        }
+
+        enricher = DataEnricher()
+        enriched = enricher.enrich_dataframe(df, geo_cache)
+
+        assert "latitude" not in df.columns
+        assert enriched["latitude"].iloc[0] == 48.8
+        assert enriched["latitude"].isna().iloc[1:].all()
+        assert enriched["store_address"].iloc[0] == "Paris"
+        assert enriched["store_address"].iloc[2] is None
+        assert enricher.enrichment_stats["successfully_enriched"] == 1
+        assert enricher.enrichment_stats["failed_enrichment"] == 1
+
+    def test_build_geocoding_cache_uses_disk_cache(self):
+        """Test qu'une adresse déjà géocodée n'est pas redemandée à l'API."""
+        result = _geo(
+            original_address="Paris", score=0.9, latitude=48.8566, longitude=2.3522
+        )
+        
+        with DataEnricher() as enricher:
+            with patch.object(enricher.geocoder, 'fetch_all_async', new=AsyncMock(return_value=[result])):
+                enricher.build_geocoding_cache(["Paris"])
+        
+        with DataEnricher() as enricher:
+            with patch.object(enricher.geocoder, 'fetch_all_async', new=AsyncMock()) as mock_fetch:
+                cache = enricher.build_geocoding_cache(["Paris", "  paris "])
+        
+        mock_fetch.assert_not_called()
+        assert cache["Paris"].latitude == 48.8566
+        assert cache["  paris "].original_address == "  paris "
+
+
+class TestPersistentGeocodingCache:
+    """Tests pour PersistentGeocodingCache."""
+    
+    @pytest.fixture
+    def cache(self, tmp_path):
+        """Cache SQLite temporaire."""
+        cache = PersistentGeocodingCache(tmp_path / "geo.sqlite")
+        yield cache
+        cache.close()
+    
+    def test_get_many_chunks(self, cache):
+        """Test la relecture de plus d'adresses qu'un lot de paramètres SQL."""
+        addresses = [f"Adresse {i}" for i in range(1200)]
+        cache.set_many([_geo(original_address=a, score=0.7, latitude=1.0) for a in addresses])
+        
+        found = cache.get_many(addresses + ["Inconnue"])
+        
+        assert len(found) == 1200
+        assert "Inconnue" not in found
+    
+    def test_expired_entry(self, cache):
+        """Test qu'une entrée expirée n'est pas retournée."""
+        cache.set_many([_geo(original_address="Paris", score=0.9, latitude=48.8)])
+        cache.ttl_seconds = -1
+        
+        assert cache.get_many(["Paris"]) == {}
@@ -17,8 +17,13 @@
 #     # ... keep the rest of this class as is
 
 """Tests pour les fetchers."""
+import asyncio
+from collections import namedtuple
+
+import httpx
 import pytest
 import pandas as pd
+from tenacity import wait_none
 from unittest.mock import Mock, patch
 
 from pipeline.fetchers.openfoodfacts import OpenFoodFactsFetcher
@@ -26,6 +31,9 @@ from pipeline.fetchers.adresse import AdresseFetcher
 from pipeline.fetchers.base import BaseFetcher
 from pipeline.config import OPENFOODFACTS_CONFIG, ADRESSE_CONFIG
 
+# Résultat de géocodage minimal pour les tests par lot (accès aux attributs sans Mock)
+_Geo = namedtuple('Geo', 'score is_valid')
+
 
 class TestBaseFetcher:
     """Tests pour BaseFetcher."""
@@ -51,20 +59,47 @@ class TestBaseFetcher:
     #     fetcher = BaseFetcher(OPENFOODFACTS_CONFIG)
     #     fetcher._rate_limit()
     #     mock_sleep.assert_called_once_with(OPENFOODFACTS_CONFIG.rate_limit)
+    
+    def test_config_is_immutable(self):
+        """Test que la configuration partagée ne peut pas être modifiée."""
+        with pytest.raises(AttributeError):
+            OPENFOODFACTS_CONFIG.timeout = 1
+        with pytest.raises(TypeError):
+            OPENFOODFACTS_CONFIG.headers["User-Agent"] = "autre"
+        assert ADRESSE_CONFIG.headers == {}
+
+
+@pytest.fixture
+def patched_make_request(monkeypatch):
+    """Remplace BaseFetcher._make_request par un Mock (aucun appel réseau)."""
+    mock = Mock()
+    monkeypatch.setattr(BaseFetcher, "_make_request", mock)
+    return mock
 
 
 class TestOpenFoodFactsFetcher:
     """Tests pour OpenFoodFactsFetcher."""
     
-    def test_init(self):
+    @pytest.fixture(scope="class")
+    @classmethod
+    def shared_fetcher(cls):
+        """Instance unique pour toute la classe."""
+        return OpenFoodFactsFetcher()
+    
+    @pytest.fixture
+    def off_fetcher(self, shared_fetcher):
+        """Fetcher partagé, statistiques remises à zéro après chaque test."""
+        initial_stats = dict(shared_fetcher.stats)
+        yield shared_fetcher
+        shared_fetcher.stats = initial_stats
+    
+    def test_init(self, off_fetcher):
         """Test l'initialisation."""
-        fetcher = OpenFoodFactsFetcher()
-        assert fetcher.config == OPENFOODFACTS_CONFIG
-        assert "code" in fetcher.fields
-        assert "product_name" in fetcher.fields
+        assert off_fetcher.config == OPENFOODFACTS_CONFIG
+        assert "code" in off_fetcher.fields
+        assert "product_name" in off_fetcher.fields
     
-    @patch('pipeline.fetchers.openfoodfacts.BaseFetcher._make_request')
-    def test_fetch_batch_success(self, mock_make_request):
+    def test_fetch_batch_success(self, patched_make_request, off_fetcher):
         """Test fetch_batch avec succès."""
         # Mock response
         mock_response = {
@@ -73,44 +108,38 @@ class TestOpenFoodFactsFetcher:
                 {"code": "456", "product_name": "Another Product"}
             ]
         }
-        mock_make_request.return_value = mock_response
+        patched_make_request.return_value = mock_response
         
-        fetcher = OpenFoodFactsFetcher()
-        products = fetcher.fetch_batch("chocolats", page=1, page_size=2)
+        products = off_fetcher.fetch_batch("chocolats", page=1, page_size=2)
         
         assert isinstance(products, list)
         assert len(products) == 2
         assert products[0]["code"] == "123"
-        mock_make_request.assert_called_once()
+        patched_make_request.assert_called_once()
     
-    @patch('pipeline.fetchers.openfoodfacts.BaseFetcher._make_request')
-    def test_fetch_batch_empty(self, mock_make_request):
+    def test_fetch_batch_empty(self, patched_make_request, off_fetcher):
         """Test fetch_batch avec réponse vide."""
-        mock_make_request.return_value = {"products": []}
+        patched_make_request.return_value = {"products": []}
         
-        fetcher = OpenFoodFactsFetcher()
-        products = fetcher.fetch_batch("chocolats", page=1, page_size=2)
+        products = off_fetcher.fetch_batch("chocolats", page=1, page_size=2)
         
         assert products == []
     
-    @patch('pipeline.fetchers.openfoodfacts.BaseFetcher._make_request')
-    def test_fetch_batch_error(self, mock_make_request):
+    def test_fetch_batch_error(self, patched_make_request, off_fetcher):
         """Test fetch_batch avec erreur."""
-        mock_make_request.side_effect = Exception("API Error")
+        patched_make_request.side_effect = Exception("API Error")
         
-        fetcher = OpenFoodFactsFetcher()
-        products = fetcher.fetch_batch("chocolats", page=1, page_size=2)
+        products = off_fetcher.fetch_batch("chocolats", page=1, page_size=2)
         
         assert products == []
-        assert fetcher.stats["requests_failed"] == 1
+        assert off_fetcher.stats["requests_failed"] == 1
     
-    def test_fetch_all_generator(self):
+    def test_fetch_all_generator(self, off_fetcher):
         """Test que fetch_all retourne un générateur."""
-        fetcher = OpenFoodFactsFetcher()
         # Mock fetch_batch pour éviter les appels API réels
-        with patch.object(fetcher, 'fetch_batch') as mock_fetch:
+        with patch.object(off_fetcher, 'fetch_batch') as mock_fetch:
             mock_fetch.return_value = []
-            generator = fetcher.fetch_all("chocolats", max_items=5, verbose=False)
+            generator = off_fetcher.fetch_all("chocolats", max_items=5, verbose=False)
             
             # Vérifier que c'est un générateur
             import types
@@ -124,13 +153,24 @@ class TestOpenFoodFactsFetcher:
 class TestAdresseFetcher:
     """Tests pour AdresseFetcher."""
     
-    def test_init(self):
+    @pytest.fixture(scope="class")
+    @classmethod
+    def shared_fetcher(cls):
+        """Instance unique pour toute la classe."""
+        return AdresseFetcher()
+    
+    @pytest.fixture
+    def adresse_fetcher(self, shared_fetcher):
+        """Fetcher partagé, statistiques remises à zéro après chaque test."""
+        initial_stats = dict(shared_fetcher.stats)
+        yield shared_fetcher
+        shared_fetcher.stats = initial_stats
+    
+    def test_init(self, adresse_fetcher):
         """Test l'initialisation."""
-        fetcher = AdresseFetcher()
-        assert fetcher.config == ADRESSE_CONFIG
+        assert adresse_fetcher.config == ADRESSE_CONFIG
     
-    @patch('pipeline.fetchers.adresse.BaseFetcher._make_request')
-    def test_geocode_single_success(self, mock_make_request):
+    def test_geocode_single_success(self, patched_make_request, adresse_fetcher):
         """Test géocodage d'une adresse valide."""
         mock_response = {
             "features": [{
@@ -145,10 +185,9 @@ class TestAdresseFetcher:
                 }
             }]
         }
-        mock_make_request.return_value = mock_response
+        patched_make_request.return_value = mock_response
         
-        fetcher = AdresseFetcher()
-        result = fetcher.geocode_single("20 avenue de ségur Paris")
+        result = adresse_fetcher.geocode_single("20 avenue de ségur Paris")
         
         assert result.original_address == "20 avenue de ségur Paris"
         assert result.score == 0.9
@@ -156,35 +195,60 @@ class TestAdresseFetcher:
         assert result.longitude == 2.308
         assert result.is_valid is True
     
-    @patch('pipeline.fetchers.adresse.BaseFetcher._make_request')
-    def test_geocode_single_no_features(self, mock_make_request):
+    def test_geocode_single_no_features(self, patched_make_request, adresse_fetcher):
         """Test géocodage d'une adresse non trouvée."""
-        mock_make_request.return_value = {"features": []}
+        patched_make_request.return_value = {"features": []}
         
-        fetcher = AdresseFetcher()
-        result = fetcher.geocode_single("Adresse inexistante")
+        result = adresse_fetcher.geocode_single("Adresse inexistante")
         
         assert result.score == 0.0
         assert result.is_valid is False
     
-    def test_geocode_empty_address(self):
+    def test_geocode_empty_address(self, adresse_fetcher):
         """Test géocodage d'une adresse vide."""
-        fetcher = AdresseFetcher()
-        result = fetcher.geocode_single("")
+        result = adresse_fetcher.geocode_single("")
         
         assert result.score == 0.0
         assert result.original_address == ""
     
-    def test_fetch_batch(self):
+    def test_fetch_batch(self, adresse_fetcher):
         """Test géocodage par lot."""
-        fetcher = AdresseFetcher()
-        
         # Mock geocode_single pour éviter les appels API
-        with patch.object(fetcher, 'geocode_single') as mock_geocode:
-            mock_geocode.return_value = Mock(score=0.8, is_valid=True)
+        with patch.object(adresse_fetcher, 'geocode_single') as mock_geocode:
+            mock_geocode.return_value = _Geo(0.8, True)
             
             addresses = ["Paris", "Lyon", "Marseille"]
-            results = fetcher.fetch_batch(addresses)
+            results = adresse_fetcher.fetch_batch(addresses)
             
             assert len(results) == 3
-            assert mock_geocode.call_count == 3
\ No newline at end of file
+            assert mock_geocode.call_count == 3
+    
+    def test_fetch_all_async(self, adresse_fetcher):
+        """Test le géocodage concurrent (ordre conservé, échecs isolés)."""
+        def handler(request):
+            query = request.url.params["q"]
+            if query == "Erreur":
+                return httpx.Response(404)
+            if query == "Lyon":
+                return httpx.Response(200, json={"features": []})
+            return httpx.Response(200, json={"features": [{
+                "properties": {"label": query, "score": 0.9, "city": query},
+                "geometry": {"coordinates": [2.35, 48.85]},
+            }]})
+        
+        def mock_client(max_connections):
+            return httpx.AsyncClient(
+                base_url=ADRESSE_CONFIG.base_url, transport=httpx.MockTransport(handler)
+            )
+        
+        # Pas d'attente entre les tentatives du retry
+        with patch.object(adresse_fetcher, '_async_client', side_effect=mock_client), \
+                patch.object(BaseFetcher._make_request_async.retry, 'wait', wait_none()):
+            results = asyncio.run(adresse_fetcher.fetch_all_async(["Paris", "Lyon", "Erreur", ""], verbose=False))
+        
+        assert [r.original_address for r in results] == ["Paris", "Lyon", "Erreur", ""]
+        assert results[0].is_valid
+        assert results[0].latitude == 48.85
+        assert not results[1].is_valid
+        assert adresse_fetcher.stats["requests_failed"] == 1
+        assert adresse_fetcher.stats["items_fetched"] == 1
@@ -0,0 +1,166 @@
+"""Tests pour l'orchestrateur du pipeline."""
+import asyncio
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from unittest.mock import MagicMock, patch
+
+from pipeline.main import MAX_GEOCODED_ADDRESSES, PipelineOrchestrator, logger
+from pipeline.models import GeocodingResult
+
+
+class TestLog:
+    """Tests pour la journalisation de l'orchestrateur."""
+    
+    def test_log_prefix_and_level(self):
+        """Test le préfixe et le niveau transmis au logger."""
+        with patch.object(logger, 'log') as mock_log:
+            PipelineOrchestrator(verbose=True).log("attention", "WARNING")
+        
+        level, _, message = mock_log.call_args.args
+        assert level == logging.WARNING
+        assert message == "attention"
+        assert mock_log.call_args.kwargs["extra"] == {"prefix": "⚠️"}
+    
+    def test_log_without_prefix(self, capsys):
+        """Test qu'un message émis sans préfixe est formaté sans erreur de journalisation."""
+        PipelineOrchestrator(verbose=False)
+        handler = logger.handlers[0]
+        stream = io.StringIO()
+        previous = handler.setStream(stream)
+        try:
+            logger.info("message direct")
+            logging.getLogger(logger.name + ".enfant").warning("message enfant")
+        finally:
+            handler.setStream(previous)
+        
+        assert "Logging error" not in capsys.readouterr().err
+        assert "📝 [" in stream.getvalue() and "message direct" in stream.getvalue()
+        assert "message enfant" in stream.getvalue()
+    
+    def test_quiet_does_not_log(self):
+        """Test qu'aucun message n'est émis en mode silencieux."""
+        with patch.object(logger, 'log') as mock_log:
+            PipelineOrchestrator(verbose=False).log("message")
+        
+        mock_log.assert_not_called()
+
+
+class TestFooter:
+    """Tests pour le pied de page du pipeline."""
+    
+    def test_footer_duration_over_a_day(self):
+        """Test que la durée inclut les jours et les fractions de seconde."""
+        orchestrator = PipelineOrchestrator(verbose=False)
+        orchestrator.stats.update(category="chocolats", start_time=datetime.now() - timedelta(days=1, seconds=5.5))
+        
+        orchestrator._print_footer()
+        
+        assert orchestrator.stats["duration_seconds"] == pytest.approx(86405.5, abs=1)
+
+
+class TestPipelinedStages:
+    """Tests pour l'acquisition et le géocodage en producteur/consommateur."""
+    
+    @pytest.fixture
+    def products(self):
+        """120 produits répartis sur 60 magasins."""
+        return [
+            {"code": f"{i:04d}", "stores": f"Magasin {i % 60}"}
+            for i in range(120)
+        ]
+    
+    @pytest.fixture(autouse=True)
+    def isolated(self, tmp_path):
+        """Pas d'écriture disque ni d'appel réseau."""
+        with patch('pipeline.enricher.GEOCODING_CACHE_PATH', tmp_path / "geo.sqlite"), \
+                patch('pipeline.main.save_raw_json', return_value=Path("raw.json")):
+            yield
+    
+    def test_stages_overlap(self, products):
+        """Test que tous les produits sont récupérés et enrichis."""
+        geocoded = []
+        
+        async def fake_geocode(self, addresses, verbose=True, max_concurrency=10):
+            geocoded.extend(addresses)
+            return [
+                GeocodingResult(original_address=a, score=0.9, latitude=48.0, longitude=2.0)
+                for a in addresses
+            ]
+        
+        orchestrator = PipelineOrchestrator(verbose=False)
+        with patch('pipeline.main.OpenFoodFactsFetcher.fetch_all', return_value=iter(products)), \
+                patch('pipeline.fetchers.adresse.AdresseFetcher.fetch_all_async', new=fake_geocode):
+            enriched = orchestrator._stages_1_2_pipelined("chocolats", 120)
+        
+        assert len(enriched) == 120
+        assert len(geocoded) == len(set(geocoded)) == MAX_GEOCODED_ADDRESSES
+        assert enriched["latitude"].iloc[0] == 48.0
+        assert enriched["latitude"].isna().sum() == 20  # Magasins 50 à 59 hors quota
+        assert orchestrator.stats["stages"]["acquisition"]["products_fetched"] == 120
+        assert orchestrator.stats["stages"]["enrichment"]["total_processed"] == 120
+    
+    def test_single_event_loop(self, products, capsys):
+        """Test que toutes les pages sont géocodées sur la même boucle, sans affichage par page."""
+        loops = []
+        
+        async def fake_geocode(self, addresses, verbose=True, max_concurrency=10):
+            loops.append(asyncio.get_running_loop())
+            return [GeocodingResult(original_address=a, score=0.9) for a in addresses]
+        
+        orchestrator = PipelineOrchestrator(verbose=False)
+        with patch('pipeline.main.MAX_GEOCODED_ADDRESSES', 100), \
+                patch('pipeline.main.OpenFoodFactsFetcher.fetch_all', return_value=iter(products)), \
+                patch('pipeline.fetchers.adresse.AdresseFetcher.fetch_all_async', new=fake_geocode):
+            orchestrator._stages_1_2_pipelined("chocolats", 120)
+        
+        assert len(loops) == 2  # Pages 1 et 2 ; la 3e n'apporte aucune nouvelle adresse
+        assert loops[0] is loops[1]
+        assert "Géocodage de" not in capsys.readouterr().out
+    
+    def test_geocoding_error_does_not_block(self, products):
+        """Test qu'une erreur de géocodage remonte sans bloquer le producteur."""
+        async def failing_geocode(self, addresses, verbose=True, max_concurrency=10):
+            raise RuntimeError("API indisponible")
+        
+        orchestrator = PipelineOrchestrator(verbose=False)
+        with patch('pipeline.main.PIPELINE_QUEUE_SIZE', 1), \
+                patch('pipeline.main.OpenFoodFactsFetcher.fetch_all', return_value=iter(products * 5)), \
+                patch('pipeline.fetchers.adresse.AdresseFetcher.fetch_all_async', new=failing_geocode):
+            with pytest.raises(RuntimeError, match="API indisponible"):
+                orchestrator._stages_1_2_pipelined("chocolats", 600)
+
+
+class TestConcurrentIO:
+    """Tests pour l'écriture du JSON brut en arrière-plan."""
+    
+    def test_raw_json_recorded_at_storage(self, tmp_path):
+        """Test que le JSON brut écrit en parallèle est relevé à l'étape 5."""
+        orchestrator = PipelineOrchestrator(verbose=False)
+        fetcher = MagicMock()
+        df = pd.DataFrame({"code": ["001"]})
+        
+        with ThreadPoolExecutor(max_workers=1) as pool, \
+                patch('pipeline.main.save_raw_json', return_value=tmp_path / "raw.json"), \
+                patch('pipeline.main.save_parquet', return_value=tmp_path / "out.parquet"):
+            orchestrator._io_pool = pool
+            orchestrator._record_acquisition(fetcher, [{"code": "001"}], "chocolats")
+            assert "raw_json_path" not in orchestrator.stats["stages"]["acquisition"]
+            
+            orchestrator._stage_5_storage(df, "chocolats", None)
+        
+        assert orchestrator.stats["stages"]["acquisition"]["raw_json_path"] == str(tmp_path / "raw.json")
+    
+    def test_sequential_io(self, tmp_path):
+        """Test l'écriture synchrone sans pool d'entrées/sorties."""
+        orchestrator = PipelineOrchestrator(verbose=False, concurrent_io=False)
+        
+        with patch('pipeline.main.save_raw_json', return_value=tmp_path / "raw.json"):
+            orchestrator._record_acquisition(MagicMock(), [{"code": "001"}], "chocolats")
+        
+        assert orchestrator.stats["stages"]["acquisition"]["raw_json_path"] == str(tmp_path / "raw.json")
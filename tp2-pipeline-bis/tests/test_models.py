@@ -25,11 +25,11 @@ class TestProductModel:
         assert product.nutriscore_grade == "a"  # Converti en minuscule
         assert isinstance(product.fetched_at, datetime)
     
-    def test_nutriscore_validation_valid(self):
+    @pytest.mark.parametrize("grade", ['A', 'B', 'C', 'D', 'E', 'a', 'b', 'c', 'd', 'e'])
+    def test_nutriscore_validation_valid(self, grade):
         """Test validation des notes NutriScore valides."""
-        for grade in ['A', 'B', 'C', 'D', 'E', 'a', 'b', 'c', 'd', 'e']:
-            product = Product(code="123", nutriscore_grade=grade)
-            assert product.nutriscore_grade == grade.lower()
+        product = Product(code="123", nutriscore_grade=grade)
+        assert product.nutriscore_grade == grade.lower()
     
     def test_nutriscore_validation_invalid(self):
         """Test validation des notes NutriScore invalides."""
@@ -144,34 +144,21 @@ class TestQualityMetricsModel:
         assert metrics.completeness_score == 0.85
         assert metrics.quality_grade == "B"
     
-    def test_is_acceptable_property(self):
+    @pytest.mark.parametrize("grade,acceptable", [
+        ('A', True), ('B', True), ('C', True),  # Notes acceptables
+        ('D', False), ('F', False),             # Notes inacceptables
+    ])
+    def test_is_acceptable_property(self, grade, acceptable):
         """Test de la propriété is_acceptable."""
-        # Notes acceptables
-        for grade in ['A', 'B', 'C']:
-            metrics = QualityMetrics(
-                total_records=100,
-                valid_records=100,
-                completeness_score=1.0,
-                duplicates_count=0,
-                duplicates_pct=0.0,
-                geocoding_success_rate=100.0,
-                avg_geocoding_score=1.0,
-                null_counts={},
-                quality_grade=grade
-            )
-            assert metrics.is_acceptable is True
-        
-        # Notes inacceptables
-        for grade in ['D', 'F']:
-            metrics = QualityMetrics(
-                total_records=100,
-                valid_records=100,
-                completeness_score=1.0,
-                duplicates_count=0,
-                duplicates_pct=0.0,
-                geocoding_success_rate=100.0,
-                avg_geocoding_score=1.0,
-                null_counts={},
-                quality_grade=grade
-            )
-            assert metrics.is_acceptable is False
\ No newline at end of file
+        metrics = QualityMetrics(
+            total_records=100,
+            valid_records=100,
+            completeness_score=1.0,
+            duplicates_count=0,
+            duplicates_pct=0.0,
+            geocoding_success_rate=100.0,
+            avg_geocoding_score=1.0,
+            null_counts={},
+            quality_grade=grade
+        )
+        assert metrics.is_acceptable is acceptable
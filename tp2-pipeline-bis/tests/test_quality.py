@@ -0,0 +1,241 @@
+"""Tests pour le module de qualité."""
+import re
+import pandas as pd
+import pytest
+from unittest.mock import patch
+
+from pipeline.quality import QualityAnalyzer, analyze_partitions, weighted_completeness
+
+
+class TestQualityAnalyzer:
+    """Tests pour QualityAnalyzer."""
+    
+    @pytest.fixture
+    def sample_df(self):
+        """DataFrame de test avec valeurs manquantes et doublons."""
+        return pd.DataFrame({
+            'code': ['001', '002', '002', '004'],
+            'product_name': ['Chocolat', None, 'Biscuit', None],
+            'sugars_100g': [45.0, None, 20.0, 10.0],
+        })
+    
+    def test_completeness(self, sample_df):
+        """Test le score de complétude."""
+        analyzer = QualityAnalyzer(sample_df)
+        
+        assert analyzer.calculate_completeness() == pytest.approx(9 / 12)
+    
+    def test_completeness_arrow(self, sample_df):
+        """Test la complétude sur des colonnes Arrow (compteur de nulls natif)."""
+        df = sample_df.convert_dtypes(dtype_backend='pyarrow')
+        analyzer = QualityAnalyzer(df)
+        
+        assert analyzer.calculate_completeness() == pytest.approx(9 / 12)
+    
+    def test_completeness_empty(self):
+        """Test la complétude d'un DataFrame vide."""
+        assert QualityAnalyzer(pd.DataFrame()).calculate_completeness() == 0.0
+    
+    def test_null_counts(self, sample_df):
+        """Test le décompte des nulls par colonne."""
+        null_counts = QualityAnalyzer(sample_df).calculate_null_counts()
+        
+        assert null_counts['product_name'] == {'count': 2, 'pct': 50.0}
+        assert null_counts['code'] == {'count': 0, 'pct': 0.0}
+    
+    def test_count_duplicates(self, sample_df):
+        """Test le décompte des doublons (colonne d'ID détectée ou explicite)."""
+        analyzer = QualityAnalyzer(sample_df)
+        
+        assert analyzer.count_duplicates() == (1, 25.0)
+        assert analyzer.count_duplicates(['code', 'product_name']) == (0, 0.0)
+    
+    def test_metrics_computed_once(self, sample_df):
+        """Test que les métriques de base ne sont calculées qu'une fois."""
+        analyzer = QualityAnalyzer(sample_df)
+        first = analyzer._compute_all_metrics()
+        
+        analyzer.calculate_completeness()
+        analyzer.calculate_null_counts()
+        
+        assert analyzer._compute_all_metrics() is first
+    
+    def test_analyze(self, sample_df):
+        """Test l'analyse complète."""
+        metrics = QualityAnalyzer(sample_df).analyze()
+        
+        assert metrics.total_records == 4
+        assert metrics.valid_records == 3
+        assert metrics.duplicates_count == 1
+        assert metrics.completeness_score == 0.75
+    
+    def test_analyze_is_memoized(self, sample_df):
+        """Test que analyze() ne refait pas l'analyse."""
+        analyzer = QualityAnalyzer(sample_df)
+        metrics = analyzer.analyze()
+        
+        assert analyzer.analyze() is metrics
+    
+    def test_standard_recommendations(self, sample_df):
+        """Test les recommandations standards (colonnes trop incomplètes)."""
+        analyzer = QualityAnalyzer(sample_df)
+        
+        recommendations = analyzer._generate_standard_recommendations()
+        
+        assert "**Colonne 'product_name'** : 50.0%" in recommendations
+        assert "**Supprimer les doublons**" in recommendations
+
+    def test_standard_recommendations_keep_sparsest_columns(self):
+        """Test que seules les colonnes les plus vides sont retenues dans le top 5."""
+        df = pd.DataFrame({f"col_{i}": [None] * i + [1] * (10 - i) for i in range(10)})
+        df.insert(0, 'code', [str(i) for i in range(10)])
+        analyzer = QualityAnalyzer(df)
+
+        recommendations = analyzer._generate_standard_recommendations()
+
+        assert recommendations.count("**Colonne") == 5 - 1  # La complétude occupe une place
+        assert recommendations.index("'col_9'") < recommendations.index("'col_6'")
+        assert "'col_5'" not in recommendations
+
+    def test_ai_context_skipped_without_provider(self, sample_df):
+        """Test que le contexte IA n'est pas construit sans fournisseur disponible."""
+        analyzer = QualityAnalyzer(sample_df)
+        
+        with patch('pipeline.quality.AIHelper') as mock_helper, \
+                patch.object(QualityAnalyzer, '_build_ai_context') as mock_context:
+            mock_helper.return_value.__enter__.return_value.available = False
+            recommendations = analyzer.generate_ai_recommendations()
+        
+        mock_context.assert_not_called()
+        assert recommendations.startswith("## Recommandations pour améliorer")
+
+    def test_count_duplicates_multi_columns(self):
+        """Test les doublons sur plusieurs colonnes (nulls compris)."""
+        df = pd.DataFrame({
+            'code': ['001', '001', '001', '002'],
+            'store': ['Lidl', 'Lidl', None, None],
+        })
+        analyzer = QualityAnalyzer(df)
+        
+        assert analyzer.count_duplicates(['code', 'store']) == (1, 25.0)
+        assert analyzer.count_duplicates(['code']) == (2, 50.0)
+    
+    def test_count_duplicates_single_row(self):
+        """Test qu'une seule ligne ne peut pas contenir de doublon."""
+        assert QualityAnalyzer(pd.DataFrame({'code': ['001']})).count_duplicates() == (0, 0.0)
+    
+    def test_reassign_df_resets_metrics(self, sample_df):
+        """Test qu'un nouveau DataFrame invalide les métriques mémorisées."""
+        analyzer = QualityAnalyzer(sample_df)
+        analyzer.analyze()
+        
+        analyzer.df = sample_df.assign(geocoding_score=0.9)
+        
+        assert analyzer.metrics is None
+        assert analyzer.calculate_geocoding_stats() == (100.0, 0.9)
+    
+    def test_geocoding_stats_with_nulls(self, sample_df):
+        """Test les stats de géocodage avec nulls (NumPy et Arrow)."""
+        df = sample_df.assign(geocoding_score=[0.9, None, 0.3, 0.7])
+        
+        for frame in (df, df.convert_dtypes(dtype_backend='pyarrow')):
+            success_rate, avg_score = QualityAnalyzer(frame).calculate_geocoding_stats()
+            assert success_rate == 50.0
+            assert avg_score == pytest.approx(0.8)
+    
+    @pytest.mark.parametrize("completeness,dup_pct,geo_rate,expected", [
+        (1.0, 0.0, 100.0, 'A'),
+        (0.9, 3.0, 100.0, 'B'),
+        (0.5, 8.0, 100.0, 'C'),
+        (0.5, 8.0, 50.0, 'D'),
+        (0.1, 20.0, 0.0, 'F'),
+    ])
+    def test_determine_quality_grade(self, sample_df, completeness, dup_pct, geo_rate, expected):
+        """Test le barème de notation (avec géocodage)."""
+        analyzer = QualityAnalyzer(sample_df.assign(geocoding_score=0.9))
+        
+        assert analyzer.determine_quality_grade(completeness, dup_pct, geo_rate) == expected
+    
+    def test_grade_without_geocoding(self, sample_df):
+        """Test l'absence de pénalité sans colonne de géocodage."""
+        analyzer = QualityAnalyzer(sample_df)
+        
+        assert analyzer.determine_quality_grade(1.0, 0.0, 0.0) == 'A'
+    
+    def test_generate_report(self, sample_df, tmp_path):
+        """Test la génération du rapport Markdown (sans IA)."""
+        analyzer = QualityAnalyzer(sample_df)
+        
+        with patch('pipeline.quality.REPORTS_DIR', tmp_path):
+            report_path = analyzer.generate_report("test_report", include_ai=False)
+        
+        report = report_path.read_text(encoding='utf-8')
+        assert report_path.parent == tmp_path
+        assert "| product_name | 2 | 50.0% | 🔴 Haute |\n| sugars_100g | 1 | 25.0% | 🟡 Moyenne |" in report
+        assert "| code | 0 | 0.0% | 🟢 Basse |\n\n\n---" in report
+        assert "| Score de complétude | 75.0% | ≥ 70% | ✅ |" in report
+        assert "| Taux de doublons | 25.0% | ≤ 5% | ⚠️ |" in report
+    
+    def test_generate_report_write_error(self, sample_df, tmp_path):
+        """Test qu'une erreur d'écriture du rapport remonte à l'appelant."""
+        analyzer = QualityAnalyzer(sample_df)
+        
+        with patch('pipeline.quality.REPORTS_DIR', tmp_path), \
+                patch('pathlib.Path.write_text', side_effect=OSError("disque plein")):
+            with pytest.raises(OSError, match="disque plein"):
+                analyzer.generate_report("test_report", include_ai=False)
+    
+    def test_report_uses_single_timestamp(self, sample_df, tmp_path):
+        """Test que l'en-tête, le pied de page et le nom du fichier partagent la même date."""
+        analyzer = QualityAnalyzer(sample_df)
+        
+        with patch('pipeline.quality.REPORTS_DIR', tmp_path):
+            report_path = analyzer.generate_report("test_report", include_ai=False)
+        
+        report = report_path.read_text(encoding='utf-8')
+        generated_at = re.search(r"\*\*Généré le\*\* : (.+)", report).group(1)
+        assert f"*Date : {generated_at}*" in report
+        assert report_path.stem == "test_report_" + re.sub(r"[-:]", "", generated_at).replace(" ", "_")
+    
+    def test_analyze_partitions(self, sample_df):
+        """Test l'analyse parallèle par partition et la complétude pondérée."""
+        df = sample_df.assign(categories=['chocolats', 'biscuits', 'biscuits', 'chocolats'])
+        
+        with patch('pipeline.quality.PARALLEL_PARTITIONS_MIN_ROWS', 0):
+            partitions = analyze_partitions(df, 'categories', max_workers=2)
+        
+        assert set(partitions) == {'chocolats', 'biscuits'}
+        assert partitions['biscuits'].duplicates_count == 1
+        assert partitions['chocolats'].duplicates_count == 0
+        assert weighted_completeness(partitions) == pytest.approx(
+            QualityAnalyzer(df).calculate_completeness(), abs=1e-3
+        )
+
+    
+    def test_analyze_partitions_small_in_process(self, sample_df):
+        """Test qu'un petit DataFrame est analysé sans lancer de processus."""
+        df = sample_df.assign(categories=['chocolats', 'biscuits', 'biscuits', 'chocolats'])
+        
+        with patch('pipeline.quality.ProcessPoolExecutor', side_effect=AssertionError("pool")):
+            partitions = analyze_partitions(df, 'categories')
+        
+        assert partitions['biscuits'].duplicates_count == 1
+        assert partitions['chocolats'].total_records == 2
+
+
+class TestSyntheticDataset:
+    """Analyse de bout en bout sur le dataset synthétique partagé."""
+    
+    def test_quality(self, synthetic_products_df, tmp_path):
+        """Test l'analyse et le rapport sur le dataset synthétique (sans IA)."""
+        analyzer = QualityAnalyzer(synthetic_products_df)
+        metrics = analyzer.analyze()
+        
+        assert metrics.total_records == 101
+        assert metrics.duplicates_count == 1
+        assert 0 < metrics.completeness_score < 1
+        
+        with patch('pipeline.quality.REPORTS_DIR', tmp_path):
+            report_path = analyzer.generate_report("test_quality", include_ai=False)
+        
+        assert f"**Score final** : {metrics.quality_grade}" in report_path.read_text(encoding='utf-8')
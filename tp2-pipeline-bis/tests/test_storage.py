@@ -0,0 +1,171 @@
+"""Tests pour le module de stockage."""
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from unittest.mock import patch
+
+from pipeline import storage
+from pipeline.storage import get_latest_parquet, get_storage_stats, load_parquet, save_parquet, save_raw_json
+
+
+def as_arrow(df: pd.DataFrame) -> pd.DataFrame:
+    """DataFrame attendu au rechargement : mêmes valeurs, colonnes pd.ArrowDtype."""
+    return pa.Table.from_pandas(df, preserve_index=False).to_pandas(types_mapper=pd.ArrowDtype)
+
+
+class TestSaveRawJson:
+    """Tests pour save_raw_json."""
+    
+    @pytest.mark.parametrize("use_orjson", [True, False])
+    def test_roundtrip(self, tmp_path, use_orjson):
+        """Test l'écriture JSON (orjson ou json standard) puis la relecture."""
+        data = [
+            {"code": "001", "product_name": "Crème brûlée", "fetched_at": datetime(2024, 1, 2, 3, 4, 5)},
+            {"code": "002", "product_name": None, "stores": ["Lidl", "Carrefour"]},
+        ]
+        orjson = storage.orjson if use_orjson else None
+        if use_orjson and orjson is None:
+            pytest.skip("orjson non installé")
+        
+        with patch('pipeline.storage.RAW_DIR', tmp_path), patch('pipeline.storage.orjson', orjson):
+            filepath = save_raw_json(data, "test")
+        
+        loaded = json.loads(filepath.read_text(encoding="utf-8"))
+        assert loaded[0]["product_name"] == "Crème brûlée"
+        assert loaded[0]["fetched_at"].startswith("2024-01-02")
+        assert loaded[1]["stores"] == ["Lidl", "Carrefour"]
+
+
+class TestSaveParquet:
+    """Tests pour save_parquet."""
+    
+    @pytest.fixture
+    def processed_dir(self, tmp_path):
+        """Dossier de sortie temporaire."""
+        with patch('pipeline.storage.PROCESSED_DIR', tmp_path):
+            yield tmp_path
+    
+    @pytest.fixture
+    def sample_df(self):
+        """DataFrame de test."""
+        return pd.DataFrame({
+            'code': ['001', '002', '003', '004', '005'],
+            'product_name': ['Chocolat', None, 'Biscuit', 'Bonbon', None],
+            'sugars_100g': [45.0, None, 20.0, 60.0, 5.0],
+            'nova_group': [4, 3, 4, 4, 1],
+        })
+    
+    def test_roundtrip(self, processed_dir, sample_df):
+        """Test l'écriture puis la relecture à l'identique."""
+        filepath = save_parquet(sample_df, "test")
+        
+        assert filepath.parent == processed_dir
+        pd.testing.assert_frame_equal(load_parquet(filepath), as_arrow(sample_df))
+    
+    def test_row_groups(self, processed_dir, sample_df):
+        """Test le découpage en groupes de lignes écrits en flux."""
+        with patch.object(storage, 'ROW_GROUP_SIZE', 2):
+            filepath = save_parquet(sample_df, "test")
+        
+        assert pq.ParquetFile(filepath).num_row_groups == 3
+        pd.testing.assert_frame_equal(load_parquet(filepath), as_arrow(sample_df))
+    
+    def test_empty_dataframe(self, processed_dir, sample_df):
+        """Test qu'un DataFrame vide produit un fichier lisible avec son schéma."""
+        filepath = save_parquet(sample_df.iloc[:0], "test")
+        
+        assert list(load_parquet(filepath).columns) == list(sample_df.columns)
+    
+    def test_partitioned(self, processed_dir, sample_df):
+        """Test l'écriture partitionnée (une partition Hive par valeur)."""
+        output_dir = save_parquet(sample_df, "test", partition_by='nova_group')
+        
+        assert sorted(d.name for d in output_dir.iterdir()) == ['nova_group=1', 'nova_group=3', 'nova_group=4']
+        loaded = load_parquet(output_dir).sort_values('code', ignore_index=True)
+        pd.testing.assert_frame_equal(loaded.drop(columns='nova_group'), as_arrow(sample_df.drop(columns='nova_group')))
+        assert loaded['nova_group'].astype(int).tolist() == sample_df['nova_group'].tolist()
+    
+    def test_arrow_table_input(self, processed_dir, sample_df):
+        """Test qu'une Table Arrow convertie une fois sert aux deux écritures."""
+        table = pa.Table.from_pandas(sample_df, preserve_index=False)
+        
+        with patch.object(storage, 'ROW_GROUP_SIZE', 2):
+            filepath = save_parquet(table, "test")
+        output_dir = save_parquet(table, "test_part", partition_by='nova_group')
+        
+        assert pq.ParquetFile(filepath).num_row_groups == 3
+        pd.testing.assert_frame_equal(load_parquet(filepath), as_arrow(sample_df))
+        assert sorted(d.name for d in output_dir.iterdir()) == ['nova_group=1', 'nova_group=3', 'nova_group=4']
+    
+    def test_zstd_by_default(self, processed_dir, sample_df):
+        """Test la compression zstd par défaut."""
+        filepath = save_parquet(sample_df, "test")
+        
+        assert pq.ParquetFile(filepath).metadata.row_group(0).column(0).compression == 'ZSTD'
+    
+    def test_layout_bounds_row_groups(self, sample_df):
+        """Test la taille automatique des groupes de lignes (bornée) et les dictionnaires."""
+        row_group_size, use_dictionary = storage._parquet_layout(sample_df)
+        
+        assert row_group_size == storage.MAX_ROW_GROUP_SIZE  # Lignes minuscules
+        assert use_dictionary
+    
+    def test_layout_wide_frame_without_dictionary(self):
+        """Test que les DataFrames très larges désactivent les dictionnaires."""
+        wide_df = pd.DataFrame({f"col_{i}": [1.0] for i in range(storage.WIDE_FRAME_COLUMNS + 1)})
+        
+        assert storage._parquet_layout(wide_df)[1] is False
+    
+    def test_float_columns_byte_stream_split(self, processed_dir):
+        """Test l'encodage BYTE_STREAM_SPLIT des flottants (les autres colonnes gardent leurs dictionnaires)."""
+        df = pd.DataFrame({'code': ['001', '002'], 'sugars_100g': [45.0, 20.5]})
+        filepath = save_parquet(df, "test")
+        
+        row_group = pq.ParquetFile(filepath).metadata.row_group(0)
+        assert 'BYTE_STREAM_SPLIT' in row_group.column(1).encodings
+        assert 'RLE_DICTIONARY' in row_group.column(0).encodings
+
+
+class TestGetLatestParquet:
+    """Tests pour get_latest_parquet."""
+    
+    def test_latest_by_mtime(self, tmp_path):
+        """Test le choix du fichier le plus récent parmi ceux qui correspondent."""
+        for i, name in enumerate(["chocolats_1.parquet", "chocolats_2.parquet", "biscuits_3.parquet"]):
+            (tmp_path / name).write_bytes(b"x")
+            os.utime(tmp_path / name, (1_000 + i, 1_000 + i))
+        os.utime(tmp_path / "chocolats_1.parquet", (5_000, 5_000))
+        
+        with patch('pipeline.storage.PROCESSED_DIR', tmp_path):
+            assert get_latest_parquet("chocolats_*.parquet") == tmp_path / "chocolats_1.parquet"
+            assert get_latest_parquet("boissons_*.parquet") is None
+        
+        with patch('pipeline.storage.PROCESSED_DIR', tmp_path / "absent"):
+            assert get_latest_parquet("*.parquet") is None
+
+
+class TestStorageStats:
+    """Tests pour get_storage_stats."""
+    
+    def test_counts_files_and_partitions(self, tmp_path):
+        """Test le décompte des fichiers simples et des dossiers partitionnés."""
+        raw_dir, processed_dir = tmp_path / "raw", tmp_path / "processed"
+        (processed_dir / "dataset" / "nova_group=4").mkdir(parents=True)
+        raw_dir.mkdir()
+        (raw_dir / "a_raw.json").write_bytes(b"x" * 1024)
+        (raw_dir / "notes.txt").write_bytes(b"x")
+        (processed_dir / "a.parquet").write_bytes(b"x" * 2048)
+        (processed_dir / "dataset" / "nova_group=4" / "part-0.parquet").write_bytes(b"x" * 1024)
+        
+        with patch('pipeline.storage.RAW_DIR', raw_dir), patch('pipeline.storage.PROCESSED_DIR', processed_dir):
+            stats = get_storage_stats()
+        
+        assert stats['raw']['count'] == 1
+        assert stats['raw']['files'] == ["a_raw.json"]
+        assert stats['processed']['count'] == 2
+        assert stats['processed']['total_size_mb'] == pytest.approx(3072 / (1024 * 1024))
@@ -1,8 +1,60 @@
 """Tests pour le transformer."""
+import tracemalloc
+
 import pytest
 import pandas as pd
 import numpy as np
-from pipeline.transformer import DataTransformer
+import pyarrow as pa
+import pyarrow.compute as pc
+from unittest.mock import MagicMock, patch
+from pipeline.transformer import COPY_ON_WRITE, SUGAR_BINS, SUGAR_EDGES, SUGAR_LABELS, DataTransformer
+
+
+# DataFrame de test, construit une seule fois et gardé en Table Arrow : chaque test
+# en réhydrate une copie à partir de buffers typés (pas d'inférence de types par colonne).
+# Colonnes déjà typées à la construction : chaînes Arrow (nulls natifs), float64 NumPy (NaN)
+SAMPLE_TABLE = pa.table({
+    'code': pa.array(['001', '002', '003', '001', '005'], type=pa.large_string()),
+    'product_name': pa.array(['  Chocolat Noir  ', None, 'Chocolat Au Lait', 'Chocolat Noir', 'Chocolat Blanc'], type=pa.large_string()),
+    'brands': pa.array(['Lindt', 'Lindt', 'Milka', 'Lindt', None], type=pa.large_string()),
+    'categories': pa.array(['chocolats'] * 5, type=pa.large_string()),
+    'nutriscore_grade': pa.array(['A', 'B', 'C', 'A', None], type=pa.large_string()),
+    'energy_100g': pa.array(np.array([500.0, np.nan, 450.0, 500.0, 600.0], dtype=np.float64), from_pandas=True),
+    'sugars_100g': np.array([40.0, 35.0, 50.0, 40.0, 100.0], dtype=np.float64),
+    'stores': pa.array(['Carrefour Paris', '  Leclerc Toulouse  ', None, 'Carrefour Paris', 'Super U'], type=pa.large_string()),
+    'geocoding_score': np.array([0.85, 0.45, 0.92, 0.85, 0.1], dtype=np.float64),
+})
+
+
+# Cas simples (une transformation sur le DataFrame de test) : (méthode, kwargs, vérification du résultat)
+TRANSFORM_CASES = [
+    pytest.param(
+        'remove_duplicates', {'subset': ['code']},
+        lambda r: len(r) == 4 and list(r['code']) == ['001', '002', '003', '005'],
+        id='remove_duplicates',
+    ),
+    pytest.param(
+        'handle_missing_values', {'text_strategy': 'unknown'},
+        lambda r: r.loc[1, 'product_name'] == 'unknown' and r.loc[4, 'brands'] == 'unknown',
+        id='missing_values_text',
+    ),
+    pytest.param(
+        'clean_address_column', {'address_col': 'stores', 'min_length': 5},
+        # Espaces multiples supprimés, adresse None inchangée
+        lambda r: 'Leclerc Toulouse' in r['stores'].values and pd.isna(r.loc[2, 'stores']),
+        id='clean_address',
+    ),
+    pytest.param(
+        'add_derived_columns', {},
+        lambda r: (
+            list(r['nutriscore_simple'][:4]) == ['excellent', 'bon', 'moyen', 'excellent']
+            and pd.isna(r.loc[4, 'nutriscore_simple'])
+            and list(r['has_valid_store']) == [True, True, False, True, False]
+            and list(r['sugar_category'][:3]) == ['très_élevé', 'très_élevé', 'très_élevé']
+        ),
+        id='derived_columns_values',
+    ),
+]
 
 
 class TestDataTransformer:
@@ -10,18 +62,16 @@ class TestDataTransformer:
     
     @pytest.fixture
     def sample_df(self):
-        """DataFrame de test."""
-        return pd.DataFrame({
-            'code': ['001', '002', '003', '001', '005'],
-            'product_name': ['  Chocolat Noir  ', None, 'Chocolat Au Lait', 'Chocolat Noir', 'Chocolat Blanc'],
-            'brands': ['Lindt', 'Lindt', 'Milka', 'Lindt', None],
-            'categories': ['chocolats', 'chocolats', 'chocolats', 'chocolats', 'chocolats'],
-            'nutriscore_grade': ['A', 'B', 'C', 'A', None],
-            'energy_100g': [500.0, None, 450.0, 500.0, 600.0],
-            'sugars_100g': [40.0, 35.0, 50.0, 40.0, 100.0],
-            'stores': ['Carrefour Paris', '  Leclerc Toulouse  ', None, 'Carrefour Paris', 'Super U'],
-            'geocoding_score': [0.85, 0.45, 0.92, 0.85, 0.1]
-        })
+        """DataFrame de test (nouveau à chaque test : les tests peuvent le modifier)."""
+        return SAMPLE_TABLE.to_pandas()
+    
+    @pytest.fixture(params=["pandas", "polars"])
+    def backend_df(self, request):
+        """DataFrame de test pour chaque backend d'entrée (polars : ignoré s'il n'est pas installé)."""
+        if request.param == "polars":
+            pl = pytest.importorskip("polars")
+            return pl.from_arrow(SAMPLE_TABLE)
+        return SAMPLE_TABLE.to_pandas()
     
     def test_init(self):
         """Test l'initialisation."""
@@ -31,52 +81,182 @@ class TestDataTransformer:
         assert transformer.verbose is True
         assert transformer.transformations_applied == []
     
-    def test_remove_duplicates(self, sample_df):
+    @pytest.mark.parametrize("verbose", [True, False])
+    def test_verbose_logs(self, sample_df, capsys, verbose):
+        """Test que les avertissements ne sont affichés qu'en mode verbeux."""
+        with patch('pipeline.transformer.np.searchsorted', side_effect=ValueError("bins")):
+            result = DataTransformer(sample_df, verbose=verbose).add_derived_columns().get_result()
+        
+        assert 'sugar_category' not in result.columns
+        out = capsys.readouterr().out
+        if verbose:
+            assert "Impossible d'ajouter sugar_category: bins" in out
+        else:
+            assert out == ''
+    
+    def test_init_does_not_modify_input(self, sample_df):
+        """Test que les transformations ne modifient pas le DataFrame source (sans copie défensive)."""
+        original = sample_df.copy()
+        DataTransformer(sample_df, verbose=False).handle_missing_values().normalize_text_columns()
+        
+        pd.testing.assert_frame_equal(sample_df, original)
+    
+    def test_remove_duplicates(self, backend_df):
         """Test la suppression des doublons."""
-        transformer = DataTransformer(sample_df)
+        transformer = DataTransformer(backend_df, verbose=False)
         result = transformer.remove_duplicates(['code']).get_result()
         
         assert len(result) == 4  # Un doublon supprimé
         assert result['code'].nunique() == 4
         assert 'Doublons supprimés' in transformer.transformations_applied[0]
     
-    def test_handle_missing_values_median(self, sample_df):
-        """Test le remplacement par la médiane."""
+    @pytest.mark.parametrize("op, kwargs, assertion", TRANSFORM_CASES)
+    def test_transform(self, sample_df, op, kwargs, assertion):
+        """Test une transformation simple sur le DataFrame de test."""
         transformer = DataTransformer(sample_df, verbose=False)
+        result = getattr(transformer, op)(**kwargs).get_result()
+        
+        assert assertion(result)
+    
+    def test_remove_duplicates_string_key_large(self):
+        """Test la déduplication sur une clé texte (1M lignes, forte duplication, nulls) : identique à drop_duplicates."""
+        rng = np.random.default_rng(0)
+        codes = pd.Series(rng.integers(0, 1000, 1_000_000).astype(str)).where(lambda c: c != '7')
+        df = pd.DataFrame({'code': codes, 'value': np.arange(1_000_000)})
+        
+        result = DataTransformer(df, verbose=False).remove_duplicates(['code']).get_result()
+        
+        pd.testing.assert_frame_equal(result, df.drop_duplicates(subset=['code'], keep='first'))
+    
+    def test_handle_missing_values_median(self, backend_df):
+        """Test le remplacement par la médiane."""
+        transformer = DataTransformer(backend_df, verbose=False)
         result = transformer.handle_missing_values(numeric_strategy='median').get_result()
         
         # Vérifier que energy_100g n'a plus de nulls
-        assert result['energy_100g'].isnull().sum() == 0
+        assert not result['energy_100g'].isna().to_numpy().any()
         # La médiane devrait être 500.0
         assert result.loc[1, 'energy_100g'] == 500.0
     
-    def test_handle_missing_values_text(self, sample_df):
-        """Test le remplacement des valeurs texte manquantes."""
+    def test_handle_missing_values_median_wide(self):
+        """Test le remplissage par la médiane sur un DataFrame large (10k x 50)."""
+        rng = np.random.default_rng(0)
+        values = rng.random((10_000, 50))
+        values[rng.random(values.shape) < 0.1] = np.nan
+        df = pd.DataFrame(values, columns=[f"col_{i}" for i in range(50)])
+        df['col_0'] = df['col_0'].astype('float32')
+        
+        result = DataTransformer(df, verbose=False).handle_missing_values().get_result()
+        
+        assert not result.isna().to_numpy().any()
+        assert result['col_0'].dtype == 'float32'
+        pd.testing.assert_frame_equal(result, df.fillna(df.median()))
+    
+    def test_handle_missing_values_memory(self):
+        """Test que le pic mémoire du remplissage reste sous 3x la taille du DataFrame (500k lignes)."""
+        rng = np.random.default_rng(0)
+        values = rng.random((500_000, 4))
+        values[rng.random(values.shape) < 0.1] = np.nan
+        df = pd.DataFrame(values, columns=['energy_100g', 'sugars_100g', 'fat_100g', 'salt_100g'])
+        transformer = DataTransformer(df, verbose=False)
+        
+        tracemalloc.start()
+        try:
+            transformer.handle_missing_values(numeric_strategy='median')
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        
+        assert not transformer.df.isna().to_numpy().any()
+        assert peak < 3 * df.memory_usage(deep=True).sum()
+    
+    @pytest.mark.parametrize("reference", [
+        lambda arr: pd.Series(arr).median(),
+        lambda arr: np.nanmedian(arr),
+    ], ids=["pandas", "numpy"])
+    def test_handle_missing_values_median_large(self, reference):
+        """Test la médiane sur 1M lignes : identique aux médianes pandas et NumPy."""
+        rng = np.random.default_rng(0)
+        arr = rng.normal(30, 15, 1_000_000)
+        arr[rng.random(arr.size) < 0.05] = np.nan
+        df = pd.DataFrame({'sugars_100g': arr, 'nova_group': pd.array([1, None] * 500_000, dtype='Int64')})
+        
+        result = DataTransformer(df, verbose=False).handle_missing_values().get_result()
+        
+        expected = np.where(np.isnan(arr), reference(arr), arr)
+        np.testing.assert_array_equal(result['sugars_100g'].to_numpy(), expected)
+        assert (result['nova_group'] == 1).all()  # Entier nullable : médiane pandas
+    
+    @pytest.mark.parametrize("strategy,expected", [('mode', 'A'), ('inconnu', 'inconnu')])
+    def test_handle_missing_values_categorical(self, sample_df, strategy, expected):
+        """Test le remplissage des colonnes catégorielles (mode ou valeur fixe)."""
+        df = sample_df.astype({'nutriscore_grade': 'category'})
+        transformer = DataTransformer(df, verbose=False)
+        result = transformer.handle_missing_values(categorical_strategy=strategy).get_result()
+        
+        assert result['nutriscore_grade'].dtype == 'category'
+        assert result.loc[4, 'nutriscore_grade'] == expected
+        assert f"nutriscore_grade: 1 nulls → '{expected}'" in transformer.transformations_applied
+    
+    def test_handle_missing_values_categorical_all_null(self):
+        """Test le mode sur des colonnes catégorielles entièrement vides : ignorées, sans journal."""
+        df = pd.DataFrame({
+            'c': pd.Categorical([None] * 3, categories=['x', 'y']),
+            'd': pd.Categorical(['x', None, 'x'], categories=['x', 'y']),
+        })
+        transformer = DataTransformer(df[['c']], verbose=False)
+        result = transformer.handle_missing_values(categorical_strategy='mode').get_result()
+        
+        assert result['c'].isna().all()
+        assert transformer.transformations_applied == []
+        
+        transformer = DataTransformer(df, verbose=False)
+        result = transformer.handle_missing_values(categorical_strategy='mode').get_result()
+        
+        assert result['c'].isna().all()
+        assert list(result['d']) == ['x', 'x', 'x']
+        assert transformer.transformations_applied == ["d: 1 nulls → 'x'"]
+    
+    def test_handle_missing_values_log(self, sample_df):
+        """Test le journal des remplacements (uniquement les colonnes incomplètes)."""
         transformer = DataTransformer(sample_df, verbose=False)
-        result = transformer.handle_missing_values(text_strategy='unknown').get_result()
+        result = transformer.handle_missing_values(numeric_strategy='zero').get_result()
         
-        # Vérifier que product_name a 'unknown' pour les nulls
-        assert result.loc[1, 'product_name'] == 'unknown'
-        assert result.loc[4, 'brands'] == 'unknown'
+        assert result.loc[1, 'energy_100g'] == 0
+        assert "energy_100g: 1 nulls → 0.00" in transformer.transformations_applied
+        assert "brands: 1 nulls → 'unknown'" in transformer.transformations_applied
+        assert not any(t.startswith('sugars_100g') for t in transformer.transformations_applied)
     
-    def test_normalize_text_columns(self, sample_df):
+    def test_normalize_text_columns(self, backend_df):
         """Test la normalisation du texte."""
-        transformer = DataTransformer(sample_df, verbose=False)
+        transformer = DataTransformer(backend_df, verbose=False)
         result = transformer.normalize_text_columns(['product_name', 'brands']).get_result()
         
         # Vérifier que les espaces sont supprimés et en minuscules
         assert 'chocolat noir' in result['product_name'].values
         assert 'lindt' in result['brands'].values
     
-    def test_clean_address_column(self, sample_df):
-        """Test le nettoyage des adresses."""
-        transformer = DataTransformer(sample_df, verbose=False)
-        result = transformer.clean_address_column('stores', min_length=5).get_result()
+    def test_normalize_text_is_vectorized(self):
+        """Test que la normalisation passe par les kernels Arrow (une fois par colonne), jamais par apply/map."""
+        df = pd.DataFrame({'product_name': ['  Chocolat Noir  '] * 10_000, 'brands': ['Lindt'] * 10_000})
+        
+        with patch('pipeline.transformer.pc.ascii_lower', wraps=pc.ascii_lower) as lower, \
+                patch.object(pd.Series, 'apply', side_effect=AssertionError("apply")), \
+                patch.object(pd.Series, 'map', side_effect=AssertionError("map")):
+            result = DataTransformer(df, verbose=False).normalize_text_columns().get_result()
+        
+        assert lower.call_count == 2
+        assert (result['product_name'] == 'chocolat noir').all()
+    
+    def test_normalize_text_ascii_folding(self):
+        """Test le repli ASCII des accents et la conservation des nulls."""
+        df = pd.DataFrame({'product_name': ['  Crème Brûlée ', None, 'ÉLEVÉ']}, index=[3, 5, 7])
+        transformer = DataTransformer(df, verbose=False)
+        result = transformer.normalize_text_columns(['product_name']).get_result()
         
-        # Vérifier que les espaces multiples sont supprimés
-        assert 'Leclerc Toulouse' in result['stores'].values
-        # L'adresse None devrait être inchangée
-        assert pd.isna(result.loc[2, 'stores'])
+        assert result.loc[3, 'product_name'] == 'creme brulee'
+        assert result.loc[7, 'product_name'] == 'eleve'
+        assert pd.isna(result.loc[5, 'product_name'])
     
     # def test_add_derived_columns(self, sample_df):
     #     """Test l'ajout de colonnes dérivées."""
@@ -93,10 +273,34 @@ class TestDataTransformer:
     #     assert result.loc[0, 'is_geocoded'] is True  # score 0.85 > 0.5
     #     assert result.loc[4, 'is_geocoded'] is False  # score 0.1 < 0.5
     
-    def test_filter_outliers_iqr(self, sample_df):
+    def test_clean_address_whitespace_kernels(self):
+        """Test la réduction des espaces par kernels Arrow (une seule regex) sur 100k adresses."""
+        stores = pd.Series(['  Leclerc \t  Toulouse  ', 'Super U \n  Nantes', None, '   '] * 25_000)
+        df = pd.DataFrame({'stores': stores})
+        
+        with patch('pipeline.transformer.pc.replace_substring_regex', wraps=pc.replace_substring_regex) as regex:
+            result = DataTransformer(df, verbose=False).clean_address_column('stores').get_result()
+        
+        assert regex.call_count == 1  # Caractères spéciaux uniquement
+        assert result.loc[:1, 'stores'].tolist() == ['Leclerc Toulouse', 'Super U Nantes']
+        assert result['stores'].isna().sum() == 50_000
+    
+    def test_clean_address_special_chars(self):
+        """Test le retrait des caractères spéciaux (accents conservés) et des adresses trop courtes."""
+        df = pd.DataFrame({'stores': ['Carrefour *Évry*  !', 'U #1', None, 'Lidl,   Paris 15e.']}, index=[2, 4, 6, 8])
+        transformer = DataTransformer(df, verbose=False)
+        result = transformer.clean_address_column('stores', min_length=5).get_result()
+        
+        assert result.loc[2, 'stores'] == 'Carrefour Évry'
+        assert pd.isna(result.loc[4, 'stores'])
+        assert pd.isna(result.loc[6, 'stores'])
+        assert result.loc[8, 'stores'] == 'Lidl, Paris 15e.'
+        assert transformer.transformations_applied == ["Adresses nettoyées: 1 invalidées (<5 chars)"]
+    
+    def test_filter_outliers_iqr(self, backend_df):
         """Test le filtrage des outliers avec IQR."""
-        transformer = DataTransformer(sample_df, verbose=False)
-        initial_len = len(sample_df)
+        transformer = DataTransformer(backend_df, verbose=False)
+        initial_len = len(backend_df)
         
         result = transformer.filter_outliers(['sugars_100g'], method='iqr').get_result()
         
@@ -104,9 +308,41 @@ class TestDataTransformer:
         assert len(result) < initial_len
         assert 100 not in result['sugars_100g'].values
     
-    def test_chaining(self, sample_df):
+    def test_filter_outliers_iqr_matches_quantile_mask(self):
+        """Test le filtrage IQR sur 1000 x 20 colonnes contre le masque NumPy de référence."""
+        rng = np.random.default_rng(0)
+        arr = rng.standard_t(3, size=(1000, 20))  # Queues épaisses : des outliers dans chaque colonne
+        df = pd.DataFrame(arr, columns=[f"col_{i}" for i in range(20)])
+        
+        result = DataTransformer(df, verbose=False).filter_outliers(list(df.columns), method='iqr').get_result()
+        
+        q1, q3 = np.quantile(arr, [0.25, 0.75], axis=0)
+        iqr = q3 - q1
+        expected = ((arr >= q1 - 1.5 * iqr) & (arr <= q3 + 1.5 * iqr)).all(axis=1)
+        assert 0 < expected.sum() < len(arr)
+        assert list(result.index) == list(np.flatnonzero(expected))
+    
+    def test_filter_outliers_multiple_columns(self):
+        """Test le filtrage sur plusieurs colonnes (IQR et z-score), nulls conservés."""
+        df = pd.DataFrame({
+            'sugars_100g': [10.0, 11.0, 12.0, 13.0, 14.0, 90.0, None],
+            'fat_100g': [5.0, 6.0, 70.0, 7.0, 8.0, 6.0, 5.0],
+            'salt_100g': [1.0] * 7,  # IQR nul : ignorée
+        })
+        
+        result = DataTransformer(df, verbose=False).filter_outliers(
+            ['sugars_100g', 'fat_100g', 'salt_100g', 'absente'], method='iqr'
+        ).get_result()
+        assert list(result.index) == [0, 1, 3, 4, 6]
+        
+        result = DataTransformer(df, verbose=False).filter_outliers(
+            ['sugars_100g'], method='zscore', threshold=2.0
+        ).get_result()
+        assert list(result.index) == [0, 1, 2, 3, 4, 6]
+    
+    def test_chaining(self, backend_df):
         """Test le chaînage des transformations."""
-        transformer = DataTransformer(sample_df, verbose=False)
+        transformer = DataTransformer(backend_df, verbose=False)
         result = (
             transformer
             .remove_duplicates(['code'])
@@ -118,6 +354,51 @@ class TestDataTransformer:
         assert len(transformer.transformations_applied) >= 3
         assert 'Doublons supprimés' in transformer.transformations_applied[0]
     
+    def test_clean_default_matches_chain(self, sample_df):
+        """Test que le nettoyage fusionné donne le même résultat que la chaîne d'étapes."""
+        chained = DataTransformer(sample_df, verbose=False)
+        expected = (
+            chained
+            .remove_duplicates()
+            .handle_missing_values(numeric_strategy='median', text_strategy='inconnu')
+            .clean_address_column('stores', min_length=5)
+            .normalize_text_columns(['product_name', 'brands', 'stores'])
+            .filter_outliers(['sugars_100g', 'energy_100g'], method='iqr')
+            .add_derived_columns()
+            .get_result()
+        )
+        
+        fused = DataTransformer(sample_df, verbose=False)
+        result = fused.clean_default(
+            ['sugars_100g', 'energy_100g'], text_columns=['product_name', 'brands', 'stores']
+        ).get_result()
+        
+        pd.testing.assert_frame_equal(result, expected)
+        assert fused.transformations_applied == chained.transformations_applied
+    
+    @pytest.mark.filterwarnings("ignore::RuntimeWarning")  # Médiane/moyenne d'une colonne vide
+    @pytest.mark.parametrize("strategy", ['median', 'mean', 'zero'])
+    def test_clean_default_all_null_column(self, strategy):
+        """Test que clean_default traite une colonne entièrement vide comme handle_missing_values."""
+        df = pd.DataFrame({'code': ['001', '002', '003'], 'a': [np.nan] * 3, 'b': [1.0, np.nan, 3.0]})
+        chained = DataTransformer(df, verbose=False)
+        expected = (
+            chained
+            .remove_duplicates()
+            .handle_missing_values(numeric_strategy=strategy, text_strategy='inconnu')
+            .normalize_text_columns()
+            .add_derived_columns()
+            .get_result()
+        )
+        
+        fused = DataTransformer(df, verbose=False)
+        result = fused.clean_default(numeric_strategy=strategy).get_result()
+        
+        pd.testing.assert_frame_equal(result, expected)
+        assert fused.transformations_applied == chained.transformations_applied
+        if strategy == 'zero':
+            assert (result['a'] == 0).all()
+    
     def test_get_summary(self, sample_df):
         """Test le résumé des transformations."""
         transformer = DataTransformer(sample_df, verbose=False)
@@ -151,10 +432,68 @@ class TestDataTransformer:
         # Vérifier les valeurs - utiliser bool() pour numpy boolean
         assert bool(result.loc[0, 'is_geocoded']) == True  # score 0.85 > 0.5
         assert bool(result.loc[4, 'is_geocoded']) == False  # score 0.1 < 0.5
+        assert result['is_geocoded'].dtype == np.bool_
+        assert result['is_geocoded'].nbytes == len(result)
+    
+    def test_sugar_category_codes_large(self):
+        """Test les codes de sugar_category sur 1M lignes : ceux de np.searchsorted."""
+        rng = np.random.default_rng(0)
+        sugars = rng.uniform(-10, 60, 1_000_000)
+        sugars[:4] = [5.0, 15.0, 30.0, np.nan]  # Bornes incluses à droite, null
+        df = pd.DataFrame({'sugars_100g': sugars})
+        
+        result = DataTransformer(df, verbose=False).add_derived_columns().get_result()
+        
+        expected = np.searchsorted(SUGAR_EDGES, sugars, side='left')
+        expected[np.isnan(sugars)] = -1
+        np.testing.assert_array_equal(result['sugar_category'].cat.codes.to_numpy(), expected)
+        assert result['sugar_category'][:3].tolist() == ['faible', 'modéré', 'élevé']
+    
+    def test_fused_pipeline(self, sample_df):
+        """Test que toutes les colonnes dérivées sont écrites en une seule passe (un seul assign)."""
+        with patch.object(pd.DataFrame, 'assign', autospec=True, side_effect=pd.DataFrame.assign) as assign:
+            result = DataTransformer(sample_df, verbose=False).add_derived_columns().get_result()
+        
+        assign.assert_called_once()
+        assert {'sugar_category', 'nutriscore_simple', 'is_geocoded', 'has_valid_store'} <= set(assign.call_args.kwargs)
+        assert {'sugar_category', 'nutriscore_simple', 'is_geocoded', 'has_valid_store'} <= set(result.columns)
+    
+    def test_is_geocoded_nullable_scores(self):
+        """Test is_geocoded en np.bool_ pour des scores Arrow avec nulls (null -> False)."""
+        df = pd.DataFrame({'geocoding_score': pd.array([0.9, None, 0.2], dtype='double[pyarrow]')})
+        result = DataTransformer(df, verbose=False).add_derived_columns().get_result()
+        
+        assert result['is_geocoded'].dtype == np.bool_
+        assert result['is_geocoded'].tolist() == [True, False, False]
+    
+    def test_derived_columns_large(self):
+        """Test sugar_category et is_geocoded sur 100k lignes : identiques aux références."""
+        rng = np.random.default_rng(0)
+        sugars = rng.uniform(0, 60, 100_000)
+        sugars[:4] = [5.0, 15.0, 30.0, np.nan]  # Bornes incluses à droite, null
+        df = pd.DataFrame({'sugars_100g': sugars, 'geocoding_score': rng.random(100_000)})
+        
+        result = DataTransformer(df, verbose=False).add_derived_columns().get_result()
+        
+        def naive_category(x):
+            for label, upper in zip(SUGAR_LABELS, SUGAR_BINS[1:]):
+                if x <= upper:
+                    return label
+            return None
+        
+        expected = df['sugars_100g'].apply(naive_category)
+        
+        pd.testing.assert_series_equal(
+            result['sugar_category'],
+            pd.cut(df['sugars_100g'], bins=SUGAR_BINS, labels=SUGAR_LABELS),
+            check_names=False
+        )
+        assert (result['sugar_category'].astype(object) == expected).sum() == len(df) - 1
+        assert (result['is_geocoded'] == (df['geocoding_score'] >= 0.5)).all()
     
     def test_get_result_is_copy(self, sample_df):
         """Test que get_result retourne une copie."""
-        transformer = DataTransformer(sample_df)
+        transformer = DataTransformer(sample_df, verbose=False)
         result1 = transformer.get_result()
         result2 = transformer.get_result()
         
@@ -162,11 +501,71 @@ class TestDataTransformer:
         assert result1 is not result2
         assert result1.equals(result2)  # Mêmes données au début
         
+        # Copy-on-write : les données sont partagées tant que rien n'est modifié
+        assert np.shares_memory(result1['energy_100g'].to_numpy(), result2['energy_100g'].to_numpy()) == COPY_ON_WRITE
+        
         # Modifier result1
         result1.loc[0, 'code'] = '999'
+        result1.loc[0, 'energy_100g'] = 0.0
         
-        # Vérifier que result2 est inchangé
+        # Vérifier que result2 est inchangé (la colonne modifiée a été copiée à l'écriture)
         assert result2.loc[0, 'code'] == '001'
+        assert result2.loc[0, 'energy_100g'] == 500.0
+        assert not np.shares_memory(result1['energy_100g'].to_numpy(), result2['energy_100g'].to_numpy())
         
         # Vérifier que le DataFrame interne n'est pas modifié
-        assert transformer.df.loc[0, 'code'] == '001'
\ No newline at end of file
+        assert transformer.df.loc[0, 'code'] == '001'
+    
+    def test_compact_dtypes(self):
+        """Test la conversion en catégories des colonnes texte peu variées (et le gain mémoire)."""
+        df = pd.DataFrame({
+            'code': [f"{i:04d}" for i in range(100)],
+            'brands': ['Lindt', 'Milka', None, 'Lindt'] * 25,
+            'nutriscore_grade': ['a', 'b', 'c', 'd', 'e'] * 20,
+            'sugars_100g': np.arange(100, dtype=float),
+        })
+        transformer = DataTransformer(df, verbose=False)
+        result = transformer.compact_dtypes().get_result()
+        
+        assert result['brands'].dtype == 'category'
+        assert result['nutriscore_grade'].dtype == 'category'
+        assert result['code'].dtype == df['code'].dtype  # Identifiant : une valeur par ligne
+        assert result['sugars_100g'].dtype == 'float64'
+        assert result.memory_usage(deep=True).sum() < df.memory_usage(deep=True).sum()
+        assert pd.isna(result.loc[2, 'brands'])
+        assert transformer.transformations_applied == ["Catégorielles: 2 colonnes"]
+    
+    def test_ai_suggestions_cached(self, sample_df, tmp_path):
+        """Test que les suggestions IA sont servies depuis le cache pour un même prompt."""
+        response = MagicMock()
+        response.choices[0].message.content = "df = df.dropna()"
+        transformer = DataTransformer(sample_df, verbose=False)
+        
+        with patch('pipeline.transformer.LLM_CACHE_PATH', tmp_path / "llm.sqlite"), \
+                patch('pipeline.transformer.completion', return_value=response) as mock_completion:
+            first = transformer.get_ai_transformation_suggestions()
+            second = transformer.get_ai_transformation_suggestions()
+        
+        assert first == second == "df = df.dropna()"
+        mock_completion.assert_called_once()
+        assert mock_completion.call_args.kwargs["temperature"] == 0
+    
+    def test_nutriscore_categorical(self):
+        """Test le nettoyage catégoriel du Nutri-Score (variantes fusionnées, nulls conservés)."""
+        df = pd.DataFrame({'nutriscore_grade': ['A', ' a', 'z', None, 'e']})
+        result = DataTransformer(df, verbose=False).add_derived_columns().get_result()
+        
+        assert isinstance(result['nutriscore_grade'].dtype, pd.CategoricalDtype)
+        assert list(result['nutriscore_grade'].cat.categories) == ['a', 'e', 'z']
+        assert list(result['nutriscore_simple'].astype(object).fillna('-')) == [
+            'excellent', 'excellent', '-', '-', 'très_mauvais'
+        ]
+    
+    def test_downcast_floats(self, sample_df):
+        """Test la conversion float32 (coordonnées gardées en float64)."""
+        df = sample_df.assign(latitude=48.8566)
+        result = DataTransformer(df, verbose=False).downcast_floats().get_result()
+        
+        assert result['sugars_100g'].dtype == np.float32
+        assert result['geocoding_score'].dtype == np.float32
+        assert result['latitude'].dtype == np.float64